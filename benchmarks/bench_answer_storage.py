@@ -0,0 +1,114 @@
+"""
+Benchmark the two answer layouts of ANSWER_STORAGE (see utils/scoring.py).
+
+For each layout, a fresh schema gets the same submissions through
+routes.participant.store_submission from concurrent submitters, then:
+- write throughput and latency of storing them,
+- on-disk size of submissions + submission_answers, indexes included
+  (pg_total_relation_size on PostgreSQL, dbstat on SQLite),
+- latency of reading one submission's answers back (as load_answers does).
+
+    python -m benchmarks.bench_answer_storage --questions 50 --submissions 2000
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import make_engine, seed, StatementCounter, percentiles, timed, OPTION_KEYS
+from models.question import Question
+from routes.participant import load_answer_rows, load_packed_answers, store_submission
+
+LAYOUTS = ("rows", "packed")
+TABLES = ("submissions", "submission_answers")
+
+
+def table_bytes(engine) -> int:
+    """
+    Bytes used by TABLES and their indexes.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"VACUUM ANALYZE {', '.join(TABLES)}"))
+            # Partitioned tables (migration 0007) are summed over their partitions
+            return sum(
+                conn.execute(text("""
+                    SELECT COALESCE(
+                        (SELECT sum(pg_total_relation_size(relid)) FROM pg_partition_tree(CAST(:table AS regclass))),
+                        pg_total_relation_size(CAST(:table AS regclass))
+                    )
+                """), {"table": table}).scalar()
+                for table in TABLES
+            )
+        conn.execute(text("VACUUM"))
+        return conn.execute(text(f"""
+            SELECT sum(pgsize) FROM dbstat
+            WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name IN ({', '.join(f"'{t}'" for t in TABLES)}))
+        """)).scalar()
+
+
+def run(layout, args):
+    engine = make_engine()
+    ids = seed(engine, users=args.submitters + 1, quizzes=1, questions_per_quiz=args.questions)
+    SessionLocal = sessionmaker(bind=engine)
+    with SessionLocal() as db:
+        questions = db.query(Question.id, Question.correct_answer).order_by(Question.id).all()
+
+    rng = random.Random(7)  # Same submissions for every layout
+    jobs = []
+    for _ in range(args.submissions):
+        answers = [(question_id, rng.choice(OPTION_KEYS)) for question_id, _ in questions]
+        correct = [selected == answer for (_, selected), (_, answer) in zip(answers, questions)]
+        score = sum(correct) / len(questions) * 100 if questions else 0.0
+        jobs.append((rng.choice(ids["participant_ids"]), ids["quiz_ids"][0], score, answers, correct))
+
+    store = partial(store_submission, storage=layout)
+    samples = []
+    submission_ids = []
+
+    def submit(job):
+        start = time.perf_counter()
+        with SessionLocal() as db:
+            submission_ids.append(store(db, *job))
+        samples.append((time.perf_counter() - start) * 1000)
+
+    with StatementCounter(engine) as counter:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.submitters) as pool:
+            list(pool.map(submit, jobs))
+        elapsed = time.perf_counter() - started
+    writes = percentiles(samples)
+    size = table_bytes(engine)
+
+    # Read through the layout's own loader (load_answers tries the ANSWER_STORAGE layout first)
+    loader = load_packed_answers if layout == "packed" else load_answer_rows
+    sample = iter(rng.choices(submission_ids, k=args.reads))
+    with SessionLocal() as db:
+        reads = percentiles(timed(lambda: loader(db, next(sample)), args.reads))
+
+    print(
+        f"{layout:<7} throughput={len(jobs) / elapsed:8.1f}/s p50={writes['p50']:.1f}ms p99={writes['p99']:.1f}ms "
+        f"sql/submission={counter.count / len(jobs):.1f}  size={size / 1024 / 1024:.2f}MB "
+        f"({size / len(jobs):.0f} B/submission)  read p50={reads['p50']:.2f}ms"
+    )
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--submitters", type=int, default=8)
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=500, help="Results read back per layout")
+    args = parser.parse_args()
+
+    for layout in LAYOUTS:
+        run(layout, args)
+
+
+if __name__ == "__main__":
+    main()
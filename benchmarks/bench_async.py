@@ -0,0 +1,81 @@
+"""
+Load-test the sync (threadpool) and async session paths side by side.
+
+Each mode gets the same seeded database and the same workload: `--clients`
+concurrent clients each fetching their own result page `--requests` times
+through an in-process ASGI client. Reports throughput and latency
+percentiles per mode.
+
+    python -m benchmarks.bench_async --clients 1000 --requests 5
+
+The async mode needs the async driver for the benchmark database
+(aiosqlite for the default SQLite file, asyncpg for PostgreSQL).
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Request
+
+from benchmarks.common import make_engine, seed, make_app, percentiles
+from routes import participant
+from utils.security import get_current_participant
+
+
+def bench_user(request: Request) -> dict:
+    """
+    Stand-in for the JWT dependency: the participant ID comes from a header.
+    """
+    user_id = int(request.headers["X-Bench-User"])
+    return {"id": user_id, "username": f"user{user_id}", "role": "participant"}
+
+
+async def run_mode(engine, mode: str, submissions: list, clients: int, requests: int):
+    app = make_app(engine, [participant.router], mode=mode)
+    app.dependency_overrides[get_current_participant] = bench_user
+    samples = []
+    errors = 0
+
+    async def client_loop(client, user_id, quiz_id):
+        nonlocal errors
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get(f"/participant/result/{quiz_id}", headers={"X-Bench-User": str(user_id)})
+            samples.append((time.perf_counter() - start) * 1000)
+            errors += response.status_code != 200
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, *submissions[i % len(submissions)]) for i in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    stats = percentiles(samples)
+    print(
+        f"{mode:<6} clients={clients} requests={len(samples)} errors={errors} "
+        f"throughput={len(samples) / elapsed:8.1f} req/s "
+        f"p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms p99={stats['p99']:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--quizzes", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    engine = make_engine()
+    ids = seed(engine, users=args.users, quizzes=args.quizzes, questions_per_quiz=args.questions, submissions_per_user=1)
+    for mode in args.modes.split(","):
+        asyncio.run(run_mode(engine, mode, ids["submissions"], args.clients, args.requests))
+
+
+if __name__ == "__main__":
+    main()
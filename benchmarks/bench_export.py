@@ -0,0 +1,124 @@
+"""
+Benchmark GET /admin/export/submissions: rows per second and peak RSS per format.
+
+The database is seeded once; every export then runs in a fresh process so
+its peak RSS is not inflated by seeding or by the previous export. The
+response is consumed chunk by chunk straight from the ASGI app (the test
+clients buffer whole bodies). `--naive` adds the previous way of pulling
+results: load every row through the ORM, then render CSV.
+
+    python -m benchmarks.bench_export --users 2001 --per-user 50 --questions 20
+"""
+import argparse
+import asyncio
+import csv
+import io
+import multiprocessing
+import resource
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import BENCH_DATABASE_URL, BENCH_DB_MODE, make_engine, make_app, seed
+from routes import admin
+from utils.export import export_query, parquet_available, unpack_rows
+
+ADMIN = {"id": 1, "username": "user1", "role": "admin"}
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+async def consume(app, path: str, query: str) -> int:
+    """
+    Drive one GET through the ASGI app, discarding the body as it streams.
+    Returns the number of body bytes received.
+    """
+    received = 0
+    status = None
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # No disconnect: wait until the response is done
+
+    async def send(message):
+        nonlocal received, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    assert status == 200, status
+    return received
+
+
+def seed_database(args):
+    seed(
+        make_engine(), users=args.users, quizzes=args.quizzes,
+        questions_per_quiz=args.questions, submissions_per_user=args.per_user,
+    )
+
+
+def run_export(fmt: str, rows: int, results):
+    engine = create_engine(BENCH_DATABASE_URL)
+    app = make_app(engine, [admin.router], ADMIN, BENCH_DB_MODE)
+    if fmt == "parquet":
+        parquet_available()  # Import pyarrow before taking the baseline
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if fmt == "naive":
+        # Everything in memory first, then rendered in one piece
+        with sessionmaker(bind=engine)() as db:
+            all_rows = db.execute(export_query(ADMIN["id"])).all()
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(unpack_rows(all_rows))
+            size = len(buffer.getvalue().encode())
+    else:
+        size = asyncio.run(consume(app, "/admin/export/submissions", f"format={fmt}"))
+
+    elapsed = time.perf_counter() - start
+    results.put((fmt, rows / elapsed, size, peak_rss_mb() - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2001)
+    parser.add_argument("--quizzes", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--per-user", type=int, default=50, help="Submissions per participant")
+    parser.add_argument("--formats", default="csv,ndjson,parquet")
+    parser.add_argument("--naive", action="store_true", help="Also run the load-everything baseline")
+    args = parser.parse_args()
+
+    seeding = multiprocessing.Process(target=seed_database, args=(args,))
+    seeding.start()
+    seeding.join()
+    rows = (args.users - 1) * min(args.per_user, args.quizzes) * args.questions
+    print(f"{rows} answer rows ({BENCH_DB_MODE} mode)")
+
+    formats = args.formats.split(",") + (["naive"] if args.naive else [])
+    results = multiprocessing.Queue()
+    for fmt in formats:
+        worker = multiprocessing.Process(target=run_export, args=(fmt, rows, results))
+        worker.start()
+        fmt, rate, size, rss = results.get()
+        worker.join()
+        print(f"{fmt:<8} rows/s={rate:10.0f} size={size / 2**20:8.1f}MiB peak_rss_growth={rss:7.1f}MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark loading a question bank: one POST /admin/questions per question
+versus a single POST /admin/questions/import (JSON, NDJSON and CSV).
+
+    python -m benchmarks.bench_import --questions 500
+"""
+import argparse
+import csv
+import io
+import json
+import time
+
+from benchmarks.common import make_engine, seed, make_client, StatementCounter, OPTION_KEYS
+from routes import admin
+
+ADMIN = {"id": 1, "username": "user1", "role": "admin"}
+
+
+def question(quiz_id: int, n: int) -> dict:
+    return {
+        "quiz_id": quiz_id,
+        "statement": f"Imported question {n}",
+        "options": {key: f"Option {key}" for key in OPTION_KEYS},
+        "correct_answer": OPTION_KEYS[n % len(OPTION_KEYS)],
+    }
+
+
+def payload(fmt: str, questions: list) -> tuple:
+    if fmt == "json":
+        return json.dumps(questions).encode(), "application/json"
+    if fmt == "ndjson":
+        return "".join(json.dumps(q) + "\n" for q in questions).encode(), "application/x-ndjson"
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=["quiz_id", "statement", "options", "correct_answer"])
+    writer.writeheader()
+    writer.writerows({**q, "options": json.dumps(q["options"])} for q in questions)
+    return buffer.getvalue().encode(), "text/csv"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    ids = seed(engine, users=1, quizzes=4, questions_per_quiz=0)
+    client = make_client(engine, [admin.router], ADMIN)
+
+    quiz_id = ids["quiz_ids"][0]
+    questions = [question(quiz_id, n) for n in range(args.questions)]
+    with StatementCounter(engine) as counter:
+        start = time.perf_counter()
+        for q in questions:
+            assert client.post("/admin/questions", json=q).status_code == 200
+        elapsed = time.perf_counter() - start
+    print(f"{'one request per question':<26} {elapsed * 1000:9.1f}ms  requests={len(questions)}  sql={counter.count}")
+
+    for fmt, quiz_id in zip(("json", "ndjson", "csv"), ids["quiz_ids"][1:]):
+        body, content_type = payload(fmt, [question(quiz_id, n) for n in range(args.questions)])
+        with StatementCounter(engine) as counter:
+            start = time.perf_counter()
+            response = client.post("/admin/questions/import", content=body, headers={"Content-Type": content_type})
+            elapsed = time.perf_counter() - start
+        assert response.status_code == 200 and response.json()["imported"] == args.questions, response.text
+        print(f"{'import (' + fmt + ')':<26} {elapsed * 1000:9.1f}ms  requests=1  sql={counter.count}")
+
+
+if __name__ == "__main__":
+    main()
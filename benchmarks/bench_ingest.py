@@ -0,0 +1,116 @@
+"""
+Burst load test of POST /participant/submit: every participant submits at
+the same moment, as when an exam closes.
+
+Runs SUBMIT_MODE=direct (store inside the request) and SUBMIT_MODE=queue
+(acknowledge with a ticket, group-commit in the background writer), each in
+its own process, and reports acknowledgement latency, the time until every
+submission is stored, and the number of commits.
+
+    python -m benchmarks.bench_ingest --participants 2000 --questions 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi import Request
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import make_engine, seed, make_app, percentiles, OPTION_KEYS
+from models.question import Question
+from models.submission import Submission
+from routes import participant
+from utils.ingest import SUBMIT_MODE, submission_queue
+from utils.security import get_current_participant
+
+
+def bench_user(request: Request) -> dict:
+    # Each simulated participant sends its user ID in a header
+    user_id = int(request.headers["x-bench-user"])
+    return {"id": user_id, "username": f"user{user_id}", "role": "participant"}
+
+
+async def burst(app, engine, participant_ids, quiz_id, answers, concurrency):
+    commits = 0
+
+    def count_commit(*args):
+        nonlocal commits
+        commits += 1
+
+    event.listen(engine, "commit", count_commit)
+
+    if SUBMIT_MODE == "queue":
+        await submission_queue.start(sessionmaker(bind=engine, autoflush=False))
+
+    samples = []
+    statuses = {}
+    gate = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # Count errors as 500s
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def submit(user_id):
+            async with gate:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/participant/submit", json={"quiz_id": quiz_id, "answers": answers},
+                    headers={"X-Bench-User": str(user_id)},
+                )
+                samples.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(submit(user_id) for user_id in participant_ids))
+        acknowledged = time.perf_counter() - start
+        await submission_queue.stop()  # Wait for the writer to store everything (no-op in direct mode)
+        stored_after = time.perf_counter() - start
+
+    with engine.connect() as conn:
+        stored = conn.execute(select(func.count()).select_from(Submission)).scalar()
+    stats = percentiles(samples)
+    print(
+        f"{SUBMIT_MODE:<7} ack p50={stats['p50']:8.1f}ms p99={stats['p99']:8.1f}ms "
+        f"all_acked={acknowledged:6.2f}s all_stored={stored_after:6.2f}s "
+        f"stored={stored} commits={commits} statuses={statuses}"
+    )
+
+
+def run(args):
+    engine = make_engine()
+    ids = seed(engine, users=args.participants + 1, quizzes=1, questions_per_quiz=args.questions)
+    with sessionmaker(bind=engine)() as db:
+        question_ids = [q.id for q in db.query(Question).order_by(Question.id)]
+    answers = {question_id: OPTION_KEYS[i % len(OPTION_KEYS)] for i, question_id in enumerate(question_ids)}
+
+    app = make_app(engine, [participant.router])
+    app.dependency_overrides[get_current_participant] = bench_user
+    asyncio.run(burst(app, engine, ids["participant_ids"], ids["quiz_ids"][0], answers, args.concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=500, help="Requests in flight at once")
+    parser.add_argument("--single", action="store_true", help="Only run the SUBMIT_MODE of the environment")
+    args = parser.parse_args()
+
+    if args.single:
+        run(args)
+        return
+
+    # SUBMIT_MODE is read at import time: run each mode in a fresh interpreter
+    for mode in ("direct", "queue"):
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_ingest", "--single",
+             "--participants", str(args.participants), "--questions", str(args.questions),
+             "--concurrency", str(args.concurrency)],
+            env={**os.environ, "SUBMIT_MODE": mode}, check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark POST /auth/token throughput with bcrypt verification run in the
+threadpool (HASH_WORKERS=0, the previous behaviour) and in the process pool.
+
+Every seeded user shares one real bcrypt hash at BCRYPT_ROUNDS, so each
+login costs one full verification.
+
+    BCRYPT_ROUNDS=10 python -m benchmarks.bench_login --clients 64 --logins 512
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+from sqlalchemy import update
+
+from benchmarks.common import make_engine, seed, make_app, percentiles
+from models.user import User
+from routes import auth
+from utils.hashing import hashing_service, HASH_MAX_PENDING
+from utils.security import get_password_hash, BCRYPT_ROUNDS
+
+PASSWORD = "bench-password"
+
+
+async def run_mode(app, name: str, users: int, clients: int, logins: int):
+    samples = []
+    statuses = {}
+    queue = asyncio.Queue()
+    for i in range(logins):
+        queue.put_nowait(f"user{2 + i % (users - 1)}")
+
+    async def client_loop(client):
+        while not queue.empty():
+            username = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/auth/token", data={"username": username, "password": PASSWORD})
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    stats = percentiles(samples)
+    print(
+        f"{name:<12} logins={logins} statuses={statuses} throughput={statuses.get(200, 0) / elapsed:7.1f} logins/s "
+        f"p50={stats['p50']:.0f}ms p99={stats['p99']:.0f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--logins", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    seed(engine, users=args.users, quizzes=0, questions_per_quiz=0)
+    with engine.begin() as conn:
+        conn.execute(update(User).values(hashed_password=get_password_hash(PASSWORD)))
+    print(f"bcrypt rounds={BCRYPT_ROUNDS}")
+
+    app = make_app(engine, [auth.router])
+    max_pending = max(HASH_MAX_PENDING, args.clients)  # Measure throughput, not shedding
+    hashing_service.configure(workers=0, max_pending=max_pending)
+    asyncio.run(run_mode(app, "threadpool", args.users, args.clients, args.logins))
+    hashing_service.configure(workers=args.workers, max_pending=max_pending)
+    asyncio.run(run_mode(app, f"processes={args.workers}", args.users, args.clients, args.logins))
+    hashing_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
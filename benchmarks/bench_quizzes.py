@@ -0,0 +1,79 @@
+"""
+Benchmark GET /participant/quizzes against a seeded database.
+
+Compares the old per-quiz question loop (N+1 queries) with the paginated,
+selectinload-based endpoint and reports SQL statements per request and
+p50/p95/p99 latency.
+
+    python -m benchmarks.bench_quizzes --quizzes 5000 --questions 10
+"""
+import argparse
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import make_engine, seed, make_client, StatementCounter, timed, report
+from models.quiz import Quiz
+from models.question import Question
+from routes import participant
+
+
+def legacy_get_quizzes(db):
+    """
+    The previous implementation: one query for quizzes plus one per quiz.
+    """
+    quizzes = db.query(Quiz).all()
+    return [db.query(Question).filter(Question.quiz_id == quiz.id).all() for quiz in quizzes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quizzes", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    ids = seed(engine, users=2, quizzes=args.quizzes, questions_per_quiz=args.questions)
+    user = {"id": ids["participant_ids"][0], "username": "user2", "role": "participant"}
+    client = make_client(engine, [participant.router], current_user=user)
+
+    # Old behaviour: full catalogue with one question query per quiz
+    SessionLocal = sessionmaker(bind=engine)
+
+    def run_legacy():
+        with SessionLocal() as db:
+            legacy_get_quizzes(db)
+
+    legacy_runs = max(1, args.requests // 10)  # The legacy path is slow, sample it less
+    with StatementCounter(engine) as counter:
+        samples = timed(run_legacy, legacy_runs)
+    report("legacy full catalogue (N+1)", samples, counter.count, legacy_runs)
+
+    # New behaviour: first page, then walking the catalogue with the cursor
+    def first_page():
+        client.get("/participant/quizzes", params={"limit": args.limit}).raise_for_status()
+
+    with StatementCounter(engine) as counter:
+        samples = timed(first_page, args.requests)
+    report(f"first page (limit={args.limit})", samples, counter.count, args.requests)
+
+    pages = 0
+    after_id = None
+    with StatementCounter(engine) as counter:
+        def next_page():
+            nonlocal after_id, pages
+            params = {"limit": args.limit}
+            if after_id is not None:
+                params["after_id"] = after_id
+            response = client.get("/participant/quizzes", params=params)
+            response.raise_for_status()
+            after_id = response.headers.get("X-Next-After-Id")
+            pages += 1
+
+        samples = timed(next_page, -(-args.quizzes // args.limit))
+    report("keyset walk of full catalogue", samples, counter.count, pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark serializing a quiz listing page with nested questions (10k
+questions by default: 100 quizzes x 100 questions).
+
+Compares the ways a List[QuizOut] response can be rendered from the cached
+quiz snapshots, then measures GET /participant/quizzes end to end:
+- jsonable_encoder + json.dumps (JSONResponse without a response model)
+- Pydantic dump_python + orjson (ORJSONResponse)
+- TypeAdapter validate + dump_json (FastAPI's path for a response model)
+- snapshots rendered once and joined per page (what the listing serves)
+
+    python -m benchmarks.bench_serialization --quizzes 100 --questions 100
+"""
+import argparse
+import json
+import time
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from benchmarks.common import make_engine, seed, make_client, timed, report
+from routes import participant
+from schemas.quiz import QuizOut
+from utils.cache import quiz_cache, render_quizzes
+
+PARTICIPANT = {"id": 2, "username": "user2", "role": "participant"}
+
+QUIZ_LIST = TypeAdapter(List[QuizOut])
+
+
+def strategies():
+    return {
+        "jsonable_encoder + json": lambda page: json.dumps(
+            jsonable_encoder(QUIZ_LIST.validate_python(page, from_attributes=True))
+        ).encode(),
+        "dump_python + orjson": lambda page: orjson.dumps(
+            QUIZ_LIST.dump_python(QUIZ_LIST.validate_python(page, from_attributes=True), mode="json"),
+            option=orjson.OPT_NON_STR_KEYS,
+        ),
+        "TypeAdapter dump_json": lambda page: QUIZ_LIST.dump_json(
+            QUIZ_LIST.validate_python(page, from_attributes=True)
+        ),
+        "pre-rendered snapshots": render_quizzes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quizzes", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=100, help="Questions per quiz")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    seed(engine, users=2, quizzes=args.quizzes, questions_per_quiz=args.questions)
+    client = make_client(engine, [participant.router], PARTICIPANT)
+
+    # Snapshots exactly as the quiz cache holds them
+    quiz_cache.clear()
+    response = client.get("/participant/quizzes", params={"limit": args.quizzes})
+    assert response.status_code == 200, response.text
+    page = quiz_cache.pages.get((None, args.quizzes))
+    expected = json.loads(response.content)
+    print(f"page: {len(page)} quizzes, {sum(len(q.questions) for q in page)} questions, {len(response.content) / 1e6:.1f} MB")
+
+    for name, render in strategies().items():
+        assert json.loads(render(page)) == expected, name
+        report(name, timed(lambda: render(page), args.repeat))
+
+    # First render of every snapshot, paid once per cache (re)load
+    cold = [snapshot_quiz_copy(q) for q in page]
+    start = time.perf_counter()
+    render_quizzes(cold)
+    print(f"{'first render of the page':<32} {(time.perf_counter() - start) * 1000:9.1f}ms")
+
+    def get_page():
+        assert client.get("/participant/quizzes", params={"limit": args.quizzes}).status_code == 200
+
+    report("GET /participant/quizzes", timed(get_page, args.repeat))
+
+
+def snapshot_quiz_copy(snapshot):
+    # Fresh snapshot without the cached rendering
+    return type(snapshot)(**{field: getattr(snapshot, field) for field in snapshot.__dataclass_fields__})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark worker start-up.
+
+1. Import time of the app (`python -X importtime -c "import main"`) in fresh
+   interpreters: total, and the heaviest top-level packages by self time.
+2. Time from launch until GET /health/live answers, for the preforking
+   launcher (serve.py, imports once) and for `uvicorn --workers` (every
+   worker imports the app itself).
+
+Importing the app must not need a database, so this runs without one
+(DATABASE_URL points at a throwaway SQLite file).
+
+    python -m benchmarks.bench_startup --runs 5 --workers 4
+"""
+import argparse
+import os
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(env: dict) -> tuple:
+    """
+    Import `main` in a fresh interpreter; return (total seconds, self seconds per top-level package).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = int(match[1]), int(match[2]), len(match[3]), match[4]
+        packages[module.split(".")[0]] += self_us / 1e6
+        if indent == 1 and module == "main":
+            total = cumulative_us / 1e6
+    return total, packages
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_live(command: list, port: int, env: dict, timeout: float = 60) -> float:
+    """
+    Launch a server and return the seconds until GET /health/live answers 200.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health/live", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"{command[0]} exited with status {process.returncode}")
+            time.sleep(0.01)
+        raise TimeoutError(f"no response within {timeout}s")
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--top", type=int, default=12, help="Heaviest packages to list")
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": os.environ.get("BENCH_STARTUP_DATABASE_URL", "sqlite:///./bench_startup.db"),
+        "DB_MODE": "sync",
+        "DB_SCHEMA_CHECK": "off",
+    }
+
+    totals = []
+    packages = defaultdict(list)
+    for _ in range(args.runs):
+        total, per_package = import_times(env)
+        totals.append(total)
+        for name, seconds in per_package.items():
+            packages[name].append(seconds)
+    print(f"import main: median {statistics.median(totals) * 1000:.0f}ms (min {min(totals) * 1000:.0f}ms, {args.runs} runs)")
+    heaviest = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:args.top]
+    for name, samples in heaviest:
+        print(f"  {name:<24} {statistics.median(samples) * 1000:7.1f}ms")
+
+    launchers = {
+        f"serve.py --workers {args.workers}": lambda port: [
+            sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        f"uvicorn --workers {args.workers}": lambda port: [
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+    }
+    for name, command in launchers.items():
+        samples = []
+        for _ in range(args.runs):
+            port = free_port()
+            samples.append(time_to_live(command(port), port, env))
+        print(f"{name:<24} first response after median {statistics.median(samples) * 1000:.0f}ms (min {min(samples) * 1000:.0f}ms)")
+
+    if os.path.exists("bench_startup.db"):
+        os.remove("bench_startup.db")
+
+
+if __name__ == "__main__":
+    main()
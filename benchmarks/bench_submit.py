@@ -0,0 +1,90 @@
+"""
+Benchmark storing submissions of 100-question quizzes under concurrent submitters.
+
+Compares the previous write path (commit the submission, refresh it, add
+each answer, commit again) with routes.participant.store_submission (one
+transaction: INSERT ... RETURNING id plus one executemany for the answers).
+
+    python -m benchmarks.bench_submit --submitters 16 --submissions 400
+"""
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import make_engine, seed, StatementCounter, percentiles, OPTION_KEYS
+from models.question import Question
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from routes.participant import store_submission
+
+
+def legacy_store(db, user_id, quiz_id, score, answers):
+    """
+    The previous implementation: two transactions and one INSERT per answer.
+    """
+    new_submission = Submission(user_id=user_id, quiz_id=quiz_id, score=score)
+    db.add(new_submission)
+    db.commit()
+    db.refresh(new_submission)
+    for question_id, selected in answers:
+        db.add(SubmissionAnswer(
+            submission_id=new_submission.id, question_id=question_id, selected_answer=selected,
+            submitted_at=new_submission.submitted_at,
+        ))
+    db.commit()
+    return new_submission.id
+
+
+def run(name, store, engine, jobs, submitters):
+    SessionLocal = sessionmaker(bind=engine)
+    samples = []
+
+    def submit(job):
+        start = time.perf_counter()
+        with SessionLocal() as db:
+            store(db, *job)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    with StatementCounter(engine) as counter:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=submitters) as pool:
+            list(pool.map(submit, jobs))
+        elapsed = time.perf_counter() - started
+
+    stats = percentiles(samples)
+    print(
+        f"{name:<8} submissions={len(jobs)} throughput={len(jobs) / elapsed:8.1f}/s "
+        f"p50={stats['p50']:.1f}ms p99={stats['p99']:.1f}ms sql/submission={counter.count / len(jobs):.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--submitters", type=int, default=16)
+    parser.add_argument("--submissions", type=int, default=400)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    ids = seed(engine, users=args.submitters + 1, quizzes=1, questions_per_quiz=args.questions)
+    with sessionmaker(bind=engine)() as db:
+        question_ids = [q.id for q in db.query(Question).order_by(Question.id)]
+
+    rng = random.Random(7)
+    jobs = [
+        (
+            rng.choice(ids["participant_ids"]), ids["quiz_ids"][0], 50.0,
+            [(question_id, rng.choice(OPTION_KEYS)) for question_id in question_ids],
+        )
+        for _ in range(args.submissions)
+    ]
+
+    run("legacy", legacy_store, engine, jobs, args.submitters)
+    run("batched", store_submission, engine, jobs, args.submitters)
+
+
+if __name__ == "__main__":
+    main()
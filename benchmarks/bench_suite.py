@@ -0,0 +1,309 @@
+"""
+Load test of the whole API, comparable across commits.
+
+Seeds the benchmark database, then drives the real endpoints (real password
+login and JWTs, no dependency overrides) through an in-process ASGI client
+with `--concurrency` requests in flight. The scenarios run one after the other:
+
+- login:   POST /auth/token
+- browse:  GET /participant/quizzes (random keyset page)
+- submit:  POST /participant/submit (every question answered)
+- result:  GET /participant/result/{quiz_id}, GET /participant/leaderboard/{quiz_id}
+- admin:   create quiz, create/update/delete question, quiz stats, delete quiz
+
+Each endpoint gets its throughput, p50/p95/p99 latency, error count and SQL
+statements per request. SQL statements come from the request metrics
+middleware, so they are exact even with concurrent requests. `--json` saves
+the results together with the git commit; `--compare` diffs two saved runs:
+
+    python -m benchmarks.bench_suite --json before.json
+    git checkout my-branch
+    python -m benchmarks.bench_suite --json after.json
+    python -m benchmarks.bench_suite --compare before.json after.json
+
+Run against PostgreSQL with BENCH_DATABASE_URL (see benchmarks/docker-compose.yml);
+SQLite is the default for CI.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+# Measure capacity, not the per-user rate limits (set RATE_LIMIT_* to include them);
+# must happen before the routes import utils.ratelimit
+for name in ("RATE_LIMIT_LOGIN", "RATE_LIMIT_SUBMIT"):
+    os.environ.setdefault(name, "0")
+
+import httpx
+from sqlalchemy import update
+
+from benchmarks.common import BENCH_DB_MODE, OPTION_KEYS, make_app, make_engine, percentiles, seed
+from models.user import User
+from routes import admin, auth, participant
+from utils.hashing import hashing_service
+from utils.metrics import RequestMetrics, RequestMetricsMiddleware
+from utils.security import BCRYPT_ROUNDS, get_password_hash
+
+PASSWORD = "bench-password"
+SCENARIOS = ("login", "browse", "submit", "result", "admin")
+
+
+class Recorder:
+    """
+    Issues requests and keeps the client-side latency and status of each,
+    keyed by "METHOD /route/{template}".
+    """
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.samples = {}  # endpoint -> [milliseconds]
+        self.statuses = {}  # endpoint -> {status code: responses}
+        self.elapsed = {}  # endpoint -> wall time of the scenario that ran it
+
+    async def call(self, method: str, route: str, token: str = None, path: dict = None, **kwargs) -> httpx.Response:
+        endpoint = f"{method} {route}"
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        start = time.perf_counter()
+        response = await self.client.request(method, route.format(**(path or {})), headers=headers, **kwargs)
+        self.samples.setdefault(endpoint, []).append((time.perf_counter() - start) * 1000)
+        statuses = self.statuses.setdefault(endpoint, {})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return response
+
+
+async def run_scenario(recorder: Recorder, operations: int, concurrency: int, operation):
+    """
+    Run `operation(i)` for i in range(operations) with `concurrency` in flight,
+    and attribute the wall time to every endpoint it called.
+    """
+    before = set(recorder.samples)
+    counter = iter(range(operations))
+
+    async def worker():
+        for i in counter:
+            await operation(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    for endpoint in recorder.samples:
+        if endpoint not in before:
+            recorder.elapsed[endpoint] = elapsed
+
+
+async def run_suite(app, ids: dict, args) -> dict:
+    rng = random.Random(7)
+    quiz_ids = ids["quiz_ids"]
+    participants = ids["participant_ids"]
+    tokens = {}
+
+    def answers(quiz_id: int) -> dict:
+        # Seeded question IDs are consecutive per quiz
+        first = (quiz_id - 1) * args.questions + 1
+        return {str(question_id): rng.choice(OPTION_KEYS) for question_id in range(first, first + args.questions)}
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)  # Count errors as 500s
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        recorder = Recorder(client)
+
+        # Every participant logs in once (the admin too); later scenarios reuse the tokens.
+        # Shed logins (503) are retried after Retry-After, as a client would.
+        async def login(i):
+            user_id = ([ids["admin_id"]] + participants)[i]
+            while True:
+                response = await recorder.call("POST", "/auth/token", data={"username": f"user{user_id}", "password": PASSWORD})
+                if response.status_code != 503:
+                    break
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+            tokens[user_id] = response.json().get("access_token")
+
+        await run_scenario(recorder, len(participants) + 1, args.concurrency, login)
+        admin_token = tokens[ids["admin_id"]]
+
+        async def browse(i):
+            query = {"limit": args.page_size}
+            after_id = rng.choice([None] + quiz_ids)
+            if after_id is not None:
+                query["after_id"] = after_id
+            await recorder.call("GET", "/participant/quizzes", tokens[rng.choice(participants)], params=query)
+
+        async def submit(i):
+            quiz_id = rng.choice(quiz_ids)
+            await recorder.call(
+                "POST", "/participant/submit", tokens[participants[i % len(participants)]],
+                json={"quiz_id": quiz_id, "answers": answers(quiz_id)},
+            )
+
+        submissions = ids["submissions"]
+
+        async def result(i):
+            user_id, quiz_id = submissions[i % len(submissions)]
+            await recorder.call("GET", "/participant/result/{quiz_id}", tokens[user_id], path={"quiz_id": quiz_id})
+            await recorder.call("GET", "/participant/leaderboard/{quiz_id}", tokens[user_id], path={"quiz_id": quiz_id})
+
+        async def admin_crud(i):
+            quiz = (await recorder.call(
+                "POST", "/admin/quizzes", admin_token, json={"title": f"Bench quiz {i}", "description": "Created by the suite"},
+            )).json()
+            question = {
+                "quiz_id": quiz["id"], "statement": f"Bench question {i}",
+                "options": {key: f"Option {key}" for key in OPTION_KEYS}, "correct_answer": "A",
+            }
+            created = (await recorder.call("POST", "/admin/questions", admin_token, json=question)).json()
+            await recorder.call(
+                "PUT", "/admin/questions/{question_id}", admin_token,
+                path={"question_id": created["id"]}, json={**question, "correct_answer": "B"},
+            )
+            await recorder.call("DELETE", "/admin/questions/{question_id}", admin_token, path={"question_id": created["id"]})
+            await recorder.call("GET", "/admin/quizzes/{quiz_id}/stats", admin_token, path={"quiz_id": rng.choice(quiz_ids)})
+            await recorder.call("DELETE", "/admin/quizzes/{quiz_id}", admin_token, path={"quiz_id": quiz["id"]})
+
+        scenarios = {
+            "browse": (browse, args.requests),
+            "submit": (submit, args.requests),
+            "result": (result, args.requests if submissions else 0),
+            "admin": (admin_crud, max(args.requests // 10, 1)),
+        }
+        for name in args.scenarios.split(","):
+            if name in scenarios:
+                operation, operations = scenarios[name]
+                await run_scenario(recorder, operations, args.concurrency, operation)
+
+    return recorder
+
+
+def summarize(recorder: Recorder, metrics: RequestMetrics) -> dict:
+    results = {}
+    for endpoint, samples in recorder.samples.items():
+        method, route = endpoint.split(" ", 1)
+        route_metrics = metrics.routes.get((method, route))
+        stats = percentiles(samples)
+        statuses = recorder.statuses[endpoint]
+        results[endpoint] = {
+            "requests": len(samples),
+            "errors": sum(count for status, count in statuses.items() if not 200 <= status < 300),
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            "throughput": len(samples) / recorder.elapsed[endpoint] if recorder.elapsed.get(endpoint) else 0.0,
+            **{key: round(value, 3) for key, value in stats.items()},
+            "sql_per_request": (
+                round(route_metrics.statements.sum / route_metrics.statements.count, 2) if route_metrics else None
+            ),
+        }
+    return results
+
+
+def print_results(results: dict):
+    print(f"{'endpoint':<42} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>7}")
+    for endpoint, row in results.items():
+        sql = "-" if row["sql_per_request"] is None else f"{row['sql_per_request']:.1f}"
+        print(
+            f"{endpoint:<42} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8.1f} "
+            f"{row['p50']:>8.2f} {row['p95']:>8.2f} {row['p99']:>8.2f} {sql:>7}"
+        )
+
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def compare(before_path: str, after_path: str):
+    """
+    Print the change of every endpoint's latency, throughput and SQL count between two saved runs.
+    """
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    def label(run):
+        meta = run["meta"]
+        return f"{meta['commit'] or '?'}{'+dirty' if meta['dirty'] else ''} ({meta['database']}, {meta['db_mode']})"
+
+    def change(old, new):
+        if not old:
+            return "     n/a"
+        return f"{(new - old) / old * 100:+7.1f}%"
+
+    print(f"before: {label(before)}\nafter:  {label(after)}")
+    print(f"{'endpoint':<42} {'p50 ms':>27} {'p99 ms':>27} {'req/s':>8} {'sql/req':>12}")
+    for endpoint, new in after["endpoints"].items():
+        old = before["endpoints"].get(endpoint)
+        if old is None:
+            print(f"{endpoint:<42} (new)")
+            continue
+        sql = f"{old['sql_per_request']} -> {new['sql_per_request']}"
+        print(
+            f"{endpoint:<42} {old['p50']:>7.2f} -> {new['p50']:>7.2f} {change(old['p50'], new['p50'])} "
+            f"{old['p99']:>7.2f} -> {new['p99']:>7.2f} {change(old['p99'], new['p99'])} "
+            f"{change(old['throughput'], new['throughput'])} {sql:>12}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="Seeded users (the first one is the admin)")
+    parser.add_argument("--quizzes", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=20, help="Questions per quiz")
+    parser.add_argument("--submissions", type=int, default=2, help="Seeded submissions per participant")
+    parser.add_argument("--requests", type=int, default=1000, help="Operations per scenario (admin runs a tenth)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once")
+    parser.add_argument("--page-size", type=int, default=20, help="limit of GET /participant/quizzes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS[1:]), help="Scenarios after login, in order")
+    parser.add_argument("--json", help="Save the results (and the git commit) to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two saved runs and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    engine = make_engine()
+    ids = seed(
+        engine, users=args.users, quizzes=args.quizzes,
+        questions_per_quiz=args.questions, submissions_per_user=args.submissions,
+    )
+    # One real bcrypt hash shared by every user: each login costs one full verification
+    with engine.begin() as conn:
+        conn.execute(update(User).values(hashed_password=get_password_hash(PASSWORD)))
+
+    metrics = RequestMetrics()
+    app = make_app(engine, [auth.router, participant.router, admin.router])
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+
+    try:
+        recorder = asyncio.run(run_suite(app, ids, args))
+    finally:
+        hashing_service.shutdown()
+
+    results = summarize(recorder, metrics)
+    print_results(results)
+
+    if args.json:
+        run = {
+            "meta": {
+                **git_revision(),
+                "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "database": engine.url.get_backend_name(),
+                "db_mode": BENCH_DB_MODE,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "cpus": os.cpu_count(),
+                "args": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+            },
+            "endpoints": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
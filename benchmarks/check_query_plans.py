@@ -0,0 +1,90 @@
+"""
+Regression check: fail if a hot query plans a sequential scan.
+
+Seeds the benchmark database, then EXPLAINs the queries behind the
+participant endpoints and admin rescoring. On PostgreSQL sequential scans
+are disabled for the check (`enable_seqscan = off`), so a "Seq Scan" in
+the plan means no usable index exists, whatever the table sizes. On SQLite
+a bare "SCAN <table>" step is a full table scan.
+
+    python -m benchmarks.check_query_plans      # exit status 1 on a seq scan
+
+tests/test_query_plans.py runs the same check under pytest.
+"""
+import sys
+
+from sqlalchemy import select, text
+
+from benchmarks.common import make_engine, seed
+from models.question import Question
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+
+
+def hot_queries(quiz_id: int, user_id: int, submission_id: int) -> dict:
+    return {
+        "questions of quizzes (selectinload)": select(Question).where(Question.quiz_id.in_([quiz_id, quiz_id + 1])),
+        "latest attempt of a user": (
+            select(Submission.id, Submission.score)
+            .where(Submission.quiz_id == quiz_id, Submission.user_id == user_id)
+            .order_by(Submission.id.desc())
+            .limit(1)
+        ),
+        "answers of a submission with correct answers": (
+            select(SubmissionAnswer.question_id, SubmissionAnswer.selected_answer, Question.correct_answer)
+            .join(Question, Question.id == SubmissionAnswer.question_id)
+            .where(SubmissionAnswer.submission_id == submission_id)
+        ),
+        "submissions of a quiz (rescoring)": (
+            select(Submission.id).where(Submission.quiz_id == quiz_id, Submission.id > 0).order_by(Submission.id).limit(5000)
+        ),
+        "answers of a rescoring batch": (
+            select(SubmissionAnswer.submission_id, SubmissionAnswer.question_id, SubmissionAnswer.selected_answer)
+            .where(SubmissionAnswer.submission_id.in_([submission_id, submission_id + 1]))
+        ),
+    }
+
+
+def explain(conn, statement) -> list:
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "postgresql":
+        return [row[0] for row in conn.execute(text("EXPLAIN " + sql))]
+    return [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+
+
+def has_seq_scan(dialect: str, plan: list) -> bool:
+    if dialect == "postgresql":
+        return any("Seq Scan" in line for line in plan)
+    return any(line.startswith("SCAN ") and "USING" not in line for line in plan)
+
+
+def plans(engine, ids: dict) -> dict:
+    """
+    EXPLAIN output of every hot query against a seeded engine, by query name.
+    """
+    user_id, quiz_id = ids["submissions"][0]
+    with engine.connect() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+            conn.execute(text("SET enable_seqscan = off"))
+        return {name: explain(conn, statement) for name, statement in hot_queries(quiz_id, user_id, 1).items()}
+
+
+def seed_for_plans(engine) -> dict:
+    return seed(engine, users=50, quizzes=50, questions_per_quiz=20, submissions_per_user=5)
+
+
+def main() -> int:
+    engine = make_engine()
+    failures = 0
+    for name, plan in plans(engine, seed_for_plans(engine)).items():
+        failed = has_seq_scan(engine.dialect.name, plan)
+        failures += failed
+        print(f"{'FAIL' if failed else 'ok':<4} {name}")
+        if failed:
+            print("     " + "\n     ".join(plan))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
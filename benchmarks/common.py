@@ -0,0 +1,233 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against BENCH_DATABASE_URL (a local SQLite file by default,
+or any PostgreSQL URL) and drive the routers in-process through FastAPI's
+TestClient, so no running server is needed. Run them from the repo root:
+
+    python -m benchmarks.bench_quizzes
+"""
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+import models  # Registers every model on Base.metadata
+from database import Base, ThreadedSession, get_session
+from models.user import User, Role
+from models.quiz import Quiz
+from models.question import Question
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from utils.metrics import attach_sql_metrics
+from utils.security import get_current_admin, get_current_participant
+
+# Database used by the benchmarks (never the application database)
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+
+# Session mode used by the routers under benchmark ("sync" or "async", see database.DB_MODE)
+BENCH_DB_MODE = os.getenv("BENCH_DB_MODE", "sync")
+
+# Async drivers matching the sync benchmark URLs
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+OPTION_KEYS = ["A", "B", "C", "D"]  # Every seeded question gets four options
+
+
+def make_engine(url: str = BENCH_DATABASE_URL):
+    """
+    Create an engine for the benchmark database with a fresh schema.
+    """
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    attach_sql_metrics(engine)  # Per-request SQL counts when the metrics middleware is added
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def seed(engine, users: int = 10, quizzes: int = 100, questions_per_quiz: int = 10, submissions_per_user: int = 0) -> dict:
+    """
+    Bulk-insert users, quizzes, questions and optionally scored submissions.
+    - The first user is the admin who owns every quiz; the rest are participants.
+    - Each participant submits `submissions_per_user` distinct quizzes.
+    - Returns the generated IDs so benchmarks can build requests from them.
+    """
+    rng = random.Random(42)  # Fixed seed so runs are comparable
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {
+                "id": i + 1,
+                "username": f"user{i + 1}",
+                "hashed_password": "not-a-real-hash",
+                "role": Role.admin if i == 0 else Role.participant,
+            }
+            for i in range(users)
+        ])
+        conn.execute(insert(Quiz), [
+            {"id": i + 1, "title": f"Quiz {i + 1}", "description": "Seeded quiz", "created_by": 1}
+            for i in range(quizzes)
+        ])
+        question_rows = []
+        for quiz_id in range(1, quizzes + 1):
+            for n in range(questions_per_quiz):
+                question_rows.append({
+                    "id": len(question_rows) + 1,
+                    "quiz_id": quiz_id,
+                    "statement": f"Question {n + 1} of quiz {quiz_id}",
+                    "options": {key: f"Option {key}" for key in OPTION_KEYS},
+                    "correct_answer": rng.choice(OPTION_KEYS),
+                })
+        if question_rows:
+            conn.execute(insert(Question), question_rows)
+
+        submission_rows = []
+        answer_rows = []
+        seeded_at = datetime.utcnow()
+        for user_id in range(2, users + 1):
+            for quiz_id in rng.sample(range(1, quizzes + 1), min(submissions_per_user, quizzes)):
+                submission_id = len(submission_rows) + 1
+                first = (quiz_id - 1) * questions_per_quiz
+                correct = 0
+                for question in question_rows[first:first + questions_per_quiz]:
+                    selected = rng.choice(OPTION_KEYS)
+                    correct += selected == question["correct_answer"]
+                    answer_rows.append({
+                        "submission_id": submission_id,
+                        "question_id": question["id"],
+                        "selected_answer": selected,
+                        "submitted_at": seeded_at,
+                    })
+                submission_rows.append({
+                    "id": submission_id,
+                    "user_id": user_id,
+                    "quiz_id": quiz_id,
+                    "score": correct / questions_per_quiz * 100 if questions_per_quiz else 0.0,
+                    "submitted_at": seeded_at,
+                })
+        if submission_rows:
+            conn.execute(insert(Submission), submission_rows)
+        if answer_rows:
+            conn.execute(insert(SubmissionAnswer), answer_rows)
+
+        # Explicit IDs do not advance PostgreSQL sequences: move them past the seeded rows
+        if conn.dialect.name == "postgresql":
+            for table in ("users", "quizzes", "questions", "submissions", "submission_answers"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+                ))
+
+    return {
+        "admin_id": 1,
+        "participant_ids": list(range(2, users + 1)),
+        "quiz_ids": list(range(1, quizzes + 1)),
+        "submissions": [(row["user_id"], row["quiz_id"]) for row in submission_rows],
+    }
+
+
+def make_app(engine, routers, current_user: dict = None, mode: str = BENCH_DB_MODE) -> FastAPI:
+    """
+    Build an app with the given routers bound to the benchmark engine.
+    - `current_user` replaces the JWT dependencies so auth cost is left out.
+    - `mode` picks the sync (threadpool) or async session path of get_session.
+    """
+    app = FastAPI()
+    for router in routers:
+        app.include_router(router)
+
+    if mode == "async":
+        url = engine.url.set(drivername=ASYNC_DRIVERS[engine.url.get_backend_name()])
+        async_engine = create_async_engine(url)
+        attach_sql_metrics(async_engine.sync_engine)  # Per-request SQL counts when the metrics middleware is added
+        async_factory = async_sessionmaker(async_engine, autoflush=False)
+
+        async def override_get_session():
+            async with async_factory() as session:
+                yield session
+    else:
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        async def override_get_session():
+            db = session_factory()
+            try:
+                yield ThreadedSession(db)
+            finally:
+                db.close()
+
+    app.dependency_overrides[get_session] = override_get_session
+    if current_user is not None:
+        app.dependency_overrides[get_current_participant] = lambda: current_user
+        app.dependency_overrides[get_current_admin] = lambda: current_user
+    return app
+
+
+def make_client(engine, routers, current_user: dict = None, mode: str = BENCH_DB_MODE) -> TestClient:
+    """
+    In-process synchronous client for the app built by make_app.
+    The client is entered so every request runs on the same event loop
+    (pooled async connections are bound to the loop that opened them).
+    """
+    client = TestClient(make_app(engine, routers, current_user, mode))
+    client.__enter__()
+    return client
+
+
+class StatementCounter:
+    """
+    Context manager counting SQL statements sent to the database by an engine.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+
+def timed(fn, repeat: int) -> list:
+    """
+    Call `fn` `repeat` times and return the latency of each call in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentiles(samples: list) -> dict:
+    """
+    Summarize latency samples (milliseconds) as p50/p95/p99.
+    """
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def report(name: str, samples: list, statements: int = None, requests: int = None):
+    """
+    Print one benchmark line: latency percentiles and SQL statements per request.
+    """
+    stats = percentiles(samples)
+    line = f"{name:<32} p50={stats['p50']:8.2f}ms p95={stats['p95']:8.2f}ms p99={stats['p99']:8.2f}ms"
+    if statements is not None and requests:
+        line += f"  sql/request={statements / requests:.1f}"
+    print(line)
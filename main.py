@@ -1,21 +1,65 @@
 
-from fastapi import FastAPI  
-from database import engine, Base, SessionLocal, get_db  # Import database engine, base model, session, and dependency  
-from routes import auth, admin, participant  # Import API route modules  
-from models.user import User, Role  # Import user and role models  
-from utils.security import get_password_hash  # Import password hashing utility  
-from models.quiz import Quiz  # Import quiz model  
-from models.question import Question  # Import question model  
-from sqlalchemy.orm import Session  # Import SQLAlchemy session for database operations  
+from contextlib import asynccontextmanager  
+from fastapi import FastAPI, Response  
+from fastapi.concurrency import run_in_threadpool  
+from database import DB_SCHEMA_CHECK, check_schema  # Optional startup schema check  
+from routes import auth, admin, participant, health  # Import API route modules  
+from utils.hashing import hashing_service  # Password hashing worker processes  
+from utils.ingest import SUBMIT_MODE, submission_queue  # Background writer of queued submissions  
+from utils.replicas import replica_router  # Read replicas and their health checks  
+from utils.partitions import partition_maintainer  # Monthly partitions of the submission tables  
+from utils.ratelimit import ADMISSION_MAX_INFLIGHT, AdmissionController  # Global concurrency limit  
+from utils.metrics import METRICS_ENABLED, RequestMetricsMiddleware, request_metrics, render_pool_metrics  # Request metrics  
+
+# Startup and shutdown of each worker process. Importing this module never  
+# connects to the database; the optional schema check runs here instead  
+@asynccontextmanager  
+async def lifespan(app: FastAPI):  
+    if DB_SCHEMA_CHECK != "off":  
+        await run_in_threadpool(check_schema, DB_SCHEMA_CHECK == "strict")  
+    # Start the submission writer with the app (replaying its journal)  
+    if SUBMIT_MODE == "queue":  
+        await submission_queue.start()  
+    # Keep the coming months' partitions ready (PostgreSQL; one process, in the background)  
+    await partition_maintainer.start()  
+    # Health-check the read replicas (DATABASE_REPLICA_URLS) in the background  
+    await replica_router.start()  
+    app.state.ready = True  # Reported by GET /health/ready  
+    yield  
+    app.state.ready = False  
+    await replica_router.stop()  
+    await partition_maintainer.stop()  
+    # Drain the submission writer and stop the hashing worker processes  
+    await submission_queue.stop()  
+    hashing_service.shutdown()  
 
 # Initialize FastAPI app  
-app = FastAPI()  
+app = FastAPI(lifespan=lifespan)  
+app.state.ready = False  
+
+# Shed load with 503 once ADMISSION_MAX_INFLIGHT requests run and the wait queue is full,  
+# before requests pile up on the connection pool (added first: metrics still see the 503s)  
+if ADMISSION_MAX_INFLIGHT > 0:  
+    app.add_middleware(AdmissionController)  
+
+# Record latency, SQL statements, DB time and pool wait per route (and log slow requests)  
+if METRICS_ENABLED:  
+    app.add_middleware(RequestMetricsMiddleware)  
+
+    # Prometheus scrape endpoint (per worker process)  
+    @app.get("/metrics", include_in_schema=False)  
+    async def metrics():  
+        return Response(  
+            content=request_metrics.render() + render_pool_metrics(),  
+            media_type="text/plain; version=0.0.4",  
+        )  
 
-# Include authentication, admin, and participant routes  
+# Include authentication, admin, participant and health check routes  
 app.include_router(auth.router)  
 app.include_router(admin.router)  
 app.include_router(participant.router)  
+app.include_router(health.router)  
 
-# Create all tables in the database based on the defined SQLAlchemy models  
-Base.metadata.create_all(bind=engine)  
+# Tables are not created here: the schema is managed by Alembic migrations  
+# (run `alembic upgrade head` before starting the app)  
 
@@ -0,0 +1,52 @@
+# Alembic environment: runs migrations against the application database
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+import models  # Registers every model on Base.metadata
+from database import Base, SQLALCHEMY_DATABASE_URL
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# Allow overriding the URL, e.g. `alembic -x url=sqlite:///./bench.db upgrade head`
+url = context.get_x_argument(as_dictionary=True).get("url", SQLALCHEMY_DATABASE_URL)
+target_metadata = Base.metadata
+
+
+def include_object_for(dialect_name):
+    # Skip dialect-specific indexes (Index(...).ddl_if) when comparing other databases
+    def include_object(obj, name, type_, reflected, compare_to):
+        ddl_if = getattr(obj, "_ddl_if", None)
+        if type_ == "index" and ddl_if is not None and ddl_if.dialect not in (None, dialect_name):
+            return False
+        return True
+    return include_object
+
+
+def run_migrations_offline():
+    # Emit SQL to stdout instead of connecting (`alembic upgrade head --sql`)
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(url)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object_for(connection.dialect.name),
+            render_as_batch=connection.dialect.name == "sqlite",  # SQLite needs batch mode for ALTER
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
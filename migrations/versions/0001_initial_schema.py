@@ -0,0 +1,65 @@
+"""Initial schema (as created by Base.metadata.create_all before migrations)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Existing databases created by create_all or v1.sql already have these
+tables: mark them with `alembic stamp 0001` and then `alembic upgrade head`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("username", sa.String, unique=True, index=True),
+        sa.Column("hashed_password", sa.String),
+        sa.Column("role", sa.Enum("admin", "participant", name="role")),
+    )
+    op.create_table(
+        "quizzes",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("title", sa.String),
+        sa.Column("description", sa.String),
+        sa.Column("created_by", sa.Integer, sa.ForeignKey("users.id")),
+    )
+    op.create_table(
+        "questions",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("quiz_id", sa.Integer, sa.ForeignKey("quizzes.id")),
+        sa.Column("statement", sa.String),
+        sa.Column("options", sa.JSON),
+        sa.Column("correct_answer", sa.String),
+    )
+    op.create_table(
+        "submissions",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id")),
+        sa.Column("quiz_id", sa.Integer, sa.ForeignKey("quizzes.id")),
+        sa.Column("score", sa.Float),
+        sa.Column("submitted_at", sa.DateTime),
+    )
+    op.create_table(
+        "submission_answers",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("submission_id", sa.Integer, sa.ForeignKey("submissions.id")),
+        sa.Column("question_id", sa.Integer, sa.ForeignKey("questions.id")),
+        sa.Column("selected_answer", sa.String),
+    )
+
+
+def downgrade():
+    op.drop_table("submission_answers")
+    op.drop_table("submissions")
+    op.drop_table("questions")
+    op.drop_table("quizzes")
+    op.drop_table("users")
+    sa.Enum(name="role").drop(op.get_bind(), checkfirst=True)
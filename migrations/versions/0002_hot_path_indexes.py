@@ -0,0 +1,56 @@
+"""Indexes and NOT NULL constraints for the hot lookup paths
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+- questions.quiz_id: loading a quiz's questions
+- submissions(quiz_id, user_id, id): a user's latest attempt and per-quiz scans
+- submission_answers.submission_id: loading a submission's answers
+On PostgreSQL the indexes are built CONCURRENTLY so live tables stay writable.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Foreign keys on the hot paths are required (as in v1.sql)
+    with op.batch_alter_table("questions") as batch:
+        batch.alter_column("quiz_id", existing_type=sa.Integer, nullable=False)
+    with op.batch_alter_table("submissions") as batch:
+        batch.alter_column("user_id", existing_type=sa.Integer, nullable=False)
+        batch.alter_column("quiz_id", existing_type=sa.Integer, nullable=False)
+    with op.batch_alter_table("submission_answers") as batch:
+        batch.alter_column("submission_id", existing_type=sa.Integer, nullable=False)
+        batch.alter_column("question_id", existing_type=sa.Integer, nullable=False)
+
+    with op.get_context().autocommit_block():
+        op.create_index("ix_questions_quiz_id", "questions", ["quiz_id"], postgresql_concurrently=True)
+        op.create_index(
+            "ix_submissions_quiz_id_user_id", "submissions", ["quiz_id", "user_id", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_submission_answers_submission_id", "submission_answers", ["submission_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index("ix_submission_answers_submission_id", table_name="submission_answers")
+    op.drop_index("ix_submissions_quiz_id_user_id", table_name="submissions")
+    op.drop_index("ix_questions_quiz_id", table_name="questions")
+
+    with op.batch_alter_table("submission_answers") as batch:
+        batch.alter_column("question_id", existing_type=sa.Integer, nullable=True)
+        batch.alter_column("submission_id", existing_type=sa.Integer, nullable=True)
+    with op.batch_alter_table("submissions") as batch:
+        batch.alter_column("quiz_id", existing_type=sa.Integer, nullable=True)
+        batch.alter_column("user_id", existing_type=sa.Integer, nullable=True)
+    with op.batch_alter_table("questions") as batch:
+        batch.alter_column("quiz_id", existing_type=sa.Integer, nullable=True)
@@ -0,0 +1,41 @@
+"""Store questions.options as JSONB with a GIN index (PostgreSQL only)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Existing JSON values are converted in place (options::jsonb). Other
+databases keep the plain JSON column.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.alter_column(
+        "questions", "options",
+        type_=JSONB, existing_type=sa.JSON, postgresql_using="options::jsonb",
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_questions_options", "questions", ["options"],
+            postgresql_using="gin", postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_questions_options", table_name="questions")
+    op.alter_column(
+        "questions", "options",
+        type_=sa.JSON, existing_type=JSONB, postgresql_using="options::json",
+    )
@@ -0,0 +1,103 @@
+"""Aggregate tables for quiz statistics and leaderboards
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+- quiz_stats: submission count, participants and score sum per quiz
+- quiz_score_counts: submissions (and users' best scores) per quiz and score
+- question_stats: answered / correct counts per question
+- leaderboard_entries: best submission of each user per quiz
+The tables are backfilled from the existing submissions; afterwards every
+submit keeps them up to date (see utils/stats.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "quiz_stats",
+        sa.Column("quiz_id", sa.Integer, sa.ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("submissions", sa.Integer, nullable=False),
+        sa.Column("participants", sa.Integer, nullable=False),
+        sa.Column("score_sum", sa.Float, nullable=False),
+    )
+    op.create_table(
+        "quiz_score_counts",
+        sa.Column("quiz_id", sa.Integer, sa.ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("score", sa.Float, primary_key=True),
+        sa.Column("submissions", sa.Integer, nullable=False),
+        sa.Column("best", sa.Integer, nullable=False),
+    )
+    op.create_table(
+        "question_stats",
+        sa.Column("question_id", sa.Integer, sa.ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("quiz_id", sa.Integer, sa.ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("answered", sa.Integer, nullable=False),
+        sa.Column("correct", sa.Integer, nullable=False),
+    )
+    op.create_index("ix_question_stats_quiz_id", "question_stats", ["quiz_id"])
+    op.create_table(
+        "leaderboard_entries",
+        sa.Column("quiz_id", sa.Integer, sa.ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("best_score", sa.Float, nullable=False),
+        sa.Column("submission_id", sa.Integer, nullable=False),
+        sa.Column("achieved_at", sa.DateTime, nullable=False),
+    )
+    op.create_index(
+        "ix_leaderboard_entries_rank", "leaderboard_entries",
+        ["quiz_id", sa.text("best_score DESC"), "achieved_at"],
+    )
+
+    # Backfill from the existing submissions (same rules as rebuild_quiz_stats)
+    op.execute("""
+        INSERT INTO leaderboard_entries (quiz_id, user_id, best_score, submission_id, achieved_at)
+        SELECT quiz_id, user_id, score, id, submitted_at FROM (
+            SELECT quiz_id, user_id, score, id, submitted_at,
+                   row_number() OVER (PARTITION BY quiz_id, user_id ORDER BY score DESC, id) AS rank
+            FROM submissions WHERE score IS NOT NULL
+        ) ranked
+        WHERE rank = 1
+    """)
+    op.execute("""
+        INSERT INTO quiz_stats (quiz_id, submissions, participants, score_sum)
+        SELECT quiz_id, count(*), count(DISTINCT user_id), coalesce(sum(score), 0)
+        FROM submissions GROUP BY quiz_id
+    """)
+    op.execute("""
+        INSERT INTO quiz_score_counts (quiz_id, score, submissions, best)
+        SELECT s.quiz_id, s.score, s.submissions, coalesce(b.best, 0)
+        FROM (
+            SELECT quiz_id, score, count(*) AS submissions
+            FROM submissions WHERE score IS NOT NULL GROUP BY quiz_id, score
+        ) s
+        LEFT JOIN (
+            SELECT quiz_id, best_score, count(*) AS best
+            FROM leaderboard_entries GROUP BY quiz_id, best_score
+        ) b ON b.quiz_id = s.quiz_id AND b.best_score = s.score
+    """)
+    op.execute("""
+        INSERT INTO question_stats (question_id, quiz_id, answered, correct)
+        SELECT q.id, q.quiz_id, count(*),
+               sum(CASE WHEN a.selected_answer = q.correct_answer THEN 1 ELSE 0 END)
+        FROM questions q
+        JOIN submission_answers a ON a.question_id = q.id
+        JOIN submissions s ON s.id = a.submission_id AND s.quiz_id = q.quiz_id
+        GROUP BY q.id, q.quiz_id
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_leaderboard_entries_rank", table_name="leaderboard_entries")
+    op.drop_table("leaderboard_entries")
+    op.drop_index("ix_question_stats_quiz_id", table_name="question_stats")
+    op.drop_table("question_stats")
+    op.drop_table("quiz_score_counts")
+    op.drop_table("quiz_stats")
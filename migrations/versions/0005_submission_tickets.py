@@ -0,0 +1,32 @@
+"""Ingestion ticket of queued submissions
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+submissions.ticket identifies a submission accepted by the ingestion queue
+(SUBMIT_MODE=queue). The unique index serves the status endpoint and makes
+journal replay idempotent. On PostgreSQL it is built CONCURRENTLY.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("submissions", sa.Column("ticket", sa.String(32), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_submissions_ticket", "submissions", ["ticket"], unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index("ix_submissions_ticket", table_name="submissions")
+    with op.batch_alter_table("submissions") as batch:
+        batch.drop_column("ticket")
@@ -0,0 +1,53 @@
+"""Idempotency keys and attempt settings
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+- submissions.idempotency_key: Idempotency-Key header of the request, unique
+  per user so a retried submission is never stored twice (index built
+  CONCURRENTLY on PostgreSQL)
+- quizzes.max_attempts / quizzes.attempt_policy: submissions allowed per
+  participant and which attempt GET /participant/result reports
+- leaderboard_entries.attempts: submissions per user and quiz, backfilled
+  from the existing submissions
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("submissions", sa.Column("idempotency_key", sa.String(64), nullable=True))
+    op.add_column("quizzes", sa.Column("max_attempts", sa.Integer, nullable=True))
+    op.add_column("quizzes", sa.Column("attempt_policy", sa.String(16), nullable=False, server_default="latest"))
+    op.add_column("leaderboard_entries", sa.Column("attempts", sa.Integer, nullable=False, server_default="1"))
+
+    op.execute("""
+        UPDATE leaderboard_entries SET attempts = (
+            SELECT count(*) FROM submissions
+            WHERE submissions.quiz_id = leaderboard_entries.quiz_id
+              AND submissions.user_id = leaderboard_entries.user_id
+        )
+    """)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_submissions_user_id_idempotency_key", "submissions", ["user_id", "idempotency_key"], unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    op.drop_index("ix_submissions_user_id_idempotency_key", table_name="submissions")
+    with op.batch_alter_table("leaderboard_entries") as batch:
+        batch.drop_column("attempts")
+    with op.batch_alter_table("quizzes") as batch:
+        batch.drop_column("attempt_policy")
+        batch.drop_column("max_attempts")
+    with op.batch_alter_table("submissions") as batch:
+        batch.drop_column("idempotency_key")
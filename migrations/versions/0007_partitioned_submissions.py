@@ -0,0 +1,227 @@
+"""Monthly partitions of submissions and submission_answers, archive registry
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+- submission_answers.submitted_at: copy of the submission's timestamp so both
+  tables can be partitioned on it; submitted_at becomes NOT NULL in both
+- archived_partitions: months moved out to Parquet files (utils/archive.py)
+- PostgreSQL only: both tables are rebuilt as PARTITION BY RANGE (submitted_at)
+  with one partition per month, from the oldest submission to PREMAKE_MONTHS
+  ahead, plus a DEFAULT partition. PostgreSQL requires the partition key in
+  every unique constraint, so the primary keys become (id, submitted_at), the
+  answers reference (submission_id, submitted_at), and the ticket and
+  Idempotency-Key indexes are plain per-partition indexes. Later months are
+  created by the app (utils/partitions.py).
+The rebuild copies both tables while writes are blocked: run it in a maintenance window.
+It reads the database as it goes (sequence names, oldest submission month), so
+it cannot be rendered offline (alembic upgrade --sql): run it against the database.
+"""
+from datetime import date, datetime
+
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+PREMAKE_MONTHS = 3  # Months created ahead of the current one
+
+SUBMISSION_COLUMNS = "id, user_id, quiz_id, score, submitted_at, ticket, idempotency_key"
+ANSWER_COLUMNS = "id, submission_id, question_id, selected_answer, submitted_at"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def require_online():
+    if context.is_offline_mode():
+        raise RuntimeError(
+            "Migration 0007 reads the database while it runs and cannot be rendered as SQL: "
+            "run it online (alembic upgrade 0007), then render later revisions with --sql"
+        )
+
+
+def upgrade():
+    require_online()
+    op.create_table(
+        "archived_partitions",
+        sa.Column("month", sa.Date, primary_key=True),
+        sa.Column("file", sa.String, nullable=False),
+        sa.Column("submissions", sa.Integer, nullable=False),
+        sa.Column("answers", sa.Integer, nullable=False),
+        sa.Column("first_submission_id", sa.Integer),
+        sa.Column("last_submission_id", sa.Integer),
+        sa.Column("archived_at", sa.DateTime, nullable=False),
+    )
+    # submitted_at is naive UTC: use the server's UTC clock
+    now = "now() AT TIME ZONE 'utc'" if op.get_context().dialect.name == "postgresql" else "CURRENT_TIMESTAMP"
+    op.execute(f"UPDATE submissions SET submitted_at = {now} WHERE submitted_at IS NULL")
+
+    if op.get_context().dialect.name == "postgresql":
+        partition_tables()
+        return
+
+    op.add_column("submission_answers", sa.Column("submitted_at", sa.DateTime, nullable=True))
+    op.execute("""
+        UPDATE submission_answers SET submitted_at = (
+            SELECT submitted_at FROM submissions WHERE submissions.id = submission_answers.submission_id
+        )
+    """)
+    with op.batch_alter_table("submission_answers") as batch:
+        batch.alter_column("submitted_at", existing_type=sa.DateTime, nullable=False)
+    with op.batch_alter_table("submissions") as batch:
+        batch.alter_column("submitted_at", existing_type=sa.DateTime, nullable=False)
+
+
+def partition_tables():
+    bind = op.get_bind()
+    op.execute("LOCK TABLE submissions, submission_answers IN EXCLUSIVE MODE")  # Reads go on, writes wait
+    sequences = {
+        table: bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+        for table in ("submissions", "submission_answers")
+    }
+
+    op.execute(f"""
+        CREATE TABLE submissions_partitioned (
+            id integer NOT NULL DEFAULT nextval('{sequences["submissions"]}'),
+            user_id integer NOT NULL,
+            quiz_id integer NOT NULL,
+            score double precision,
+            submitted_at timestamp without time zone NOT NULL,
+            ticket varchar(32),
+            idempotency_key varchar(64),
+            CONSTRAINT submissions_partitioned_pkey PRIMARY KEY (id, submitted_at)
+        ) PARTITION BY RANGE (submitted_at)
+    """)
+    op.execute(f"""
+        CREATE TABLE submission_answers_partitioned (
+            id integer NOT NULL DEFAULT nextval('{sequences["submission_answers"]}'),
+            submission_id integer NOT NULL,
+            question_id integer NOT NULL,
+            selected_answer varchar,
+            submitted_at timestamp without time zone NOT NULL,
+            CONSTRAINT submission_answers_partitioned_pkey PRIMARY KEY (id, submitted_at)
+        ) PARTITION BY RANGE (submitted_at)
+    """)
+
+    current = datetime.utcnow().date().replace(day=1)
+    first = bind.execute(sa.text("SELECT min(submitted_at) FROM submissions")).scalar()
+    month = min(first.date().replace(day=1), current) if first is not None else current
+    while month <= add_months(current, PREMAKE_MONTHS):
+        for table in ("submissions", "submission_answers"):
+            op.execute(
+                f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table}_partitioned "
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+        month = add_months(month, 1)
+    for table in ("submissions", "submission_answers"):
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table}_partitioned DEFAULT")
+
+    op.execute(f"INSERT INTO submissions_partitioned ({SUBMISSION_COLUMNS}) SELECT {SUBMISSION_COLUMNS} FROM submissions")
+    op.execute(f"""
+        INSERT INTO submission_answers_partitioned ({ANSWER_COLUMNS})
+        SELECT a.id, a.submission_id, a.question_id, a.selected_answer, s.submitted_at
+        FROM submission_answers a JOIN submissions s ON s.id = a.submission_id
+    """)
+
+    # Keep the ID sequences: hand them over before the old tables (their owners) go
+    for table, sequence in sequences.items():
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}_partitioned.id")
+    op.drop_table("submission_answers")
+    op.drop_table("submissions")
+    for table in ("submissions", "submission_answers"):
+        op.rename_table(f"{table}_partitioned", table)
+        op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_partitioned_pkey TO {table}_pkey")
+
+    # Created on the parents, so every partition (and every later one) gets them
+    op.create_index("ix_submissions_quiz_id_user_id", "submissions", ["quiz_id", "user_id", "id"])
+    op.create_index("ix_submissions_ticket", "submissions", ["ticket"])
+    op.create_index("ix_submissions_user_id_idempotency_key", "submissions", ["user_id", "idempotency_key"])
+    op.create_index("ix_submission_answers_submission_id", "submission_answers", ["submission_id"])
+    op.create_foreign_key("submissions_user_id_fkey", "submissions", "users", ["user_id"], ["id"])
+    op.create_foreign_key("submissions_quiz_id_fkey", "submissions", "quizzes", ["quiz_id"], ["id"])
+    op.create_foreign_key(
+        "submission_answers_submission_id_fkey", "submission_answers", "submissions",
+        ["submission_id", "submitted_at"], ["id", "submitted_at"],
+    )
+    op.create_foreign_key(
+        "submission_answers_question_id_fkey", "submission_answers", "questions", ["question_id"], ["id"]
+    )
+
+
+def downgrade():
+    require_online()
+    # Archived months stay in their Parquet files; only the live rows are kept
+    if op.get_context().dialect.name == "postgresql":
+        unpartition_tables()
+    else:
+        with op.batch_alter_table("submission_answers") as batch:
+            batch.drop_column("submitted_at")
+        with op.batch_alter_table("submissions") as batch:
+            batch.alter_column("submitted_at", existing_type=sa.DateTime, nullable=True)
+    op.drop_table("archived_partitions")
+
+
+def unpartition_tables():
+    bind = op.get_bind()
+    op.execute("LOCK TABLE submissions, submission_answers IN EXCLUSIVE MODE")
+    sequences = {
+        table: bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+        for table in ("submissions", "submission_answers")
+    }
+
+    op.execute(f"""
+        CREATE TABLE submissions_plain (
+            id integer NOT NULL DEFAULT nextval('{sequences["submissions"]}'),
+            user_id integer NOT NULL,
+            quiz_id integer NOT NULL,
+            score double precision,
+            submitted_at timestamp without time zone,
+            ticket varchar(32),
+            idempotency_key varchar(64),
+            CONSTRAINT submissions_plain_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f"""
+        CREATE TABLE submission_answers_plain (
+            id integer NOT NULL DEFAULT nextval('{sequences["submission_answers"]}'),
+            submission_id integer NOT NULL,
+            question_id integer NOT NULL,
+            selected_answer varchar,
+            CONSTRAINT submission_answers_plain_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f"INSERT INTO submissions_plain ({SUBMISSION_COLUMNS}) SELECT {SUBMISSION_COLUMNS} FROM submissions")
+    op.execute("""
+        INSERT INTO submission_answers_plain (id, submission_id, question_id, selected_answer)
+        SELECT id, submission_id, question_id, selected_answer FROM submission_answers
+    """)
+
+    for table, sequence in sequences.items():
+        op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}_plain.id")
+    op.drop_table("submission_answers")  # With all of its partitions
+    op.drop_table("submissions")
+    for table in ("submissions", "submission_answers"):
+        op.rename_table(f"{table}_plain", table)
+        op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_plain_pkey TO {table}_pkey")
+
+    op.create_index("ix_submissions_id", "submissions", ["id"])
+    op.create_index("ix_submissions_quiz_id_user_id", "submissions", ["quiz_id", "user_id", "id"])
+    op.create_index("ix_submissions_ticket", "submissions", ["ticket"], unique=True)
+    op.create_index("ix_submissions_user_id_idempotency_key", "submissions", ["user_id", "idempotency_key"], unique=True)
+    op.create_index("ix_submission_answers_id", "submission_answers", ["id"])
+    op.create_index("ix_submission_answers_submission_id", "submission_answers", ["submission_id"])
+    op.create_foreign_key("submissions_user_id_fkey", "submissions", "users", ["user_id"], ["id"])
+    op.create_foreign_key("submissions_quiz_id_fkey", "submissions", "quizzes", ["quiz_id"], ["id"])
+    op.create_foreign_key(
+        "submission_answers_submission_id_fkey", "submission_answers", "submissions", ["submission_id"], ["id"]
+    )
+    op.create_foreign_key(
+        "submission_answers_question_id_fkey", "submission_answers", "questions", ["question_id"], ["id"]
+    )
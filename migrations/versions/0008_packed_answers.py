@@ -0,0 +1,47 @@
+"""Packed answer storage
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+- submissions.packed_answers: {question_id: option} map of a submission's
+  answers (JSONB on PostgreSQL), written instead of submission_answers rows
+  when the app runs with ANSWER_STORAGE=packed. Nullable without a default,
+  so adding it does not rewrite the table (on the partitioned parent as well).
+  Existing submissions keep their rows; both layouts are read.
+Downgrading first turns packed answers back into submission_answers rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "submissions",
+        sa.Column("packed_answers", sa.JSON().with_variant(JSONB, "postgresql"), nullable=True),
+    )
+
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("""
+            INSERT INTO submission_answers (submission_id, question_id, selected_answer, submitted_at)
+            SELECT s.id, a.key::integer, a.value, s.submitted_at
+            FROM submissions s CROSS JOIN LATERAL jsonb_each_text(s.packed_answers) a
+            WHERE s.packed_answers IS NOT NULL
+        """)
+    else:
+        op.execute("""
+            INSERT INTO submission_answers (submission_id, question_id, selected_answer, submitted_at)
+            SELECT s.id, CAST(a.key AS INTEGER), a.value, s.submitted_at
+            FROM submissions s, json_each(s.packed_answers) a
+            WHERE s.packed_answers IS NOT NULL
+        """)
+    with op.batch_alter_table("submissions") as batch:
+        batch.drop_column("packed_answers")
@@ -0,0 +1,33 @@
+"""Failed queued submissions
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+failed_submissions records the tickets the ingestion writer could not store
+(SUBMIT_MODE=queue), so the status endpoint reports them as failed from any
+worker process and after restarts. Stored tickets are in submissions.ticket;
+queued ones are recognised from the ticket itself.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "failed_submissions",
+        sa.Column("ticket", sa.String(32), primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("quiz_id", sa.Integer, nullable=False),
+        sa.Column("detail", sa.String, nullable=False),
+        sa.Column("failed_at", sa.DateTime, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("failed_submissions")
@@ -0,0 +1,40 @@
+"""Non-unique ticket and Idempotency-Key indexes
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+Migration 0007 already rebuilt ix_submissions_ticket and
+ix_submissions_user_id_idempotency_key as plain indexes on PostgreSQL (a
+unique index on the partitioned table would only hold within a month).
+This does the same elsewhere, so every database has the schema of the
+models and stores a key once the same way: writers serialize on
+lock_idempotency_keys and look for the key. Nothing to do on PostgreSQL.
+"""
+from alembic import op
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_submissions_ticket": ["ticket"],
+    "ix_submissions_user_id_idempotency_key": ["user_id", "idempotency_key"],
+}
+
+
+def recreate(unique: bool):
+    if op.get_context().dialect.name == "postgresql":
+        return
+    for name, columns in INDEXES.items():
+        op.drop_index(name, table_name="submissions")
+        op.create_index(name, "submissions", columns, unique=unique)
+
+
+def upgrade():
+    recreate(unique=False)
+
+
+def downgrade():
+    recreate(unique=True)
@@ -3,4 +3,10 @@ from .user import User
 from .quiz import Quiz
 from .question import Question
 from .submission import Submission
-from .submission_answer import SubmissionAnswer
\ No newline at end of file
+from .submission_answer import SubmissionAnswer
+from .quiz_stats import QuizStats
+from .quiz_score_count import QuizScoreCount
+from .question_stats import QuestionStats
+from .leaderboard_entry import LeaderboardEntry
+from .archived_partition import ArchivedPartition
+from .failed_submission import FailedSubmission
@@ -0,0 +1,18 @@
+# models/archived_partition.py
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from database import Base
+from datetime import datetime
+
+class ArchivedPartition(Base):
+    """
+    A month of submissions moved out of the database into a Parquet file
+    (utils/archive.py). Export, stats rebuilds and results read it from there.
+    """
+    __tablename__ = "archived_partitions"
+    month = Column(Date, primary_key=True)                    # First day of the archived month
+    file = Column(String, nullable=False)                     # Parquet file name, relative to ARCHIVE_DIR
+    submissions = Column(Integer, nullable=False)             # Submissions archived
+    answers = Column(Integer, nullable=False)                 # Answers archived
+    first_submission_id = Column(Integer)                     # Submission ID range of the file (None if empty)
+    last_submission_id = Column(Integer)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,16 @@
+# models/failed_submission.py
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from database import Base
+from datetime import datetime
+
+class FailedSubmission(Base):
+    """
+    A queued submission the ingestion writer could not store (utils/ingest.py),
+    kept so every worker process can report its ticket as failed.
+    """
+    __tablename__ = "failed_submissions"
+    ticket = Column(String(32), primary_key=True)                       # Ticket returned by POST /participant/submit
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)   # Submitting participant
+    quiz_id = Column(Integer, nullable=False)                           # Quiz (may have been deleted meanwhile)
+    detail = Column(String, nullable=False)                             # Reason returned to the client
+    failed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,21 @@
+# models/leaderboard_entry.py
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Index
+from database import Base
+
+class LeaderboardEntry(Base):
+    """
+    Best submission and number of attempts of each user for a quiz, kept up
+    to date by every submit.
+    """
+    __tablename__ = "leaderboard_entries"
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    best_score = Column(Float, nullable=False)          # Best score of the user
+    submission_id = Column(Integer, nullable=False)     # Submission that achieved it (first one on ties)
+    achieved_at = Column(DateTime, nullable=False)      # When it was achieved
+    attempts = Column(Integer, nullable=False, default=1, server_default="1")  # Submissions of the user (checked against max_attempts)
+
+    __table_args__ = (
+        # Top-N of a quiz is an index range scan: best score first, earliest first on ties
+        Index("ix_leaderboard_entries_rank", "quiz_id", best_score.desc(), "achieved_at"),
+    )
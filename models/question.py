@@ -1,10 +1,19 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
 from database import Base
 
 class Question(Base):
     __tablename__ = "questions"
     id = Column(Integer, primary_key=True, index=True)
-    quiz_id = Column(Integer, ForeignKey("quizzes.id"))  # Quiz linking
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False, index=True)  # Quiz linking
     statement = Column(String)                           # Text of question
-    options = Column(JSON)                               # Options as JSON 
-    correct_answer = Column(String)                      # Correct answer
\ No newline at end of file
+    options = Column(JSON().with_variant(JSONB, "postgresql"))  # Options as JSON (JSONB on PostgreSQL)
+    correct_answer = Column(String)                      # Correct answer
+
+    quiz = relationship("Quiz", back_populates="questions")  # Parent quiz
+
+    __table_args__ = (
+        # GIN index for key lookups on the options (e.g. options ? 'A'), PostgreSQL only
+        Index("ix_questions_options", "options", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
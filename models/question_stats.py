@@ -0,0 +1,13 @@
+# models/question_stats.py
+from sqlalchemy import Column, Integer, ForeignKey
+from database import Base
+
+class QuestionStats(Base):
+    """
+    How often a question was answered, and answered correctly.
+    """
+    __tablename__ = "question_stats"
+    question_id = Column(Integer, ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False, index=True)
+    answered = Column(Integer, nullable=False, default=0)  # Submissions answering the question
+    correct = Column(Integer, nullable=False, default=0)   # ... with the correct answer
@@ -1,5 +1,6 @@
 # models/quiz.py
 from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy.orm import relationship
 from database import Base
 
 class Quiz(Base):
@@ -7,4 +8,14 @@ class Quiz(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String)               # Quiz title
     description = Column(String)         # Quiz description
-    created_by = Column(Integer, ForeignKey("users.id"))  # ID of the admin who created it
\ No newline at end of file
+    created_by = Column(Integer, ForeignKey("users.id"))  # ID of the admin who created it
+    max_attempts = Column(Integer, nullable=True)  # Submissions allowed per participant (NULL = unlimited)
+    attempt_policy = Column(String(16), nullable=False, default="latest", server_default="latest")  # Attempt reported as the result: "latest" or "best"
+
+    # Questions of this quiz, ordered by ID (load with selectinload to avoid N+1 queries)
+    questions = relationship(
+        "Question",
+        back_populates="quiz",
+        order_by="Question.id",
+        cascade="all, delete-orphan",
+    )
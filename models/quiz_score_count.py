@@ -0,0 +1,15 @@
+# models/quiz_score_count.py
+from sqlalchemy import Column, Integer, ForeignKey, Float
+from database import Base
+
+class QuizScoreCount(Base):
+    """
+    Score distribution of a quiz: how many submissions got each score, and for
+    how many users it is their best score. A quiz with n questions has at most
+    n + 1 distinct scores, so histograms and percentile ranks read a few rows.
+    """
+    __tablename__ = "quiz_score_counts"
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    score = Column(Float, primary_key=True)               # Score (percentage)
+    submissions = Column(Integer, nullable=False, default=0)  # Submissions with this score
+    best = Column(Integer, nullable=False, default=0)         # Users whose best score this is
@@ -0,0 +1,13 @@
+# models/quiz_stats.py
+from sqlalchemy import Column, Integer, ForeignKey, Float
+from database import Base
+
+class QuizStats(Base):
+    """
+    Running totals of a quiz's submissions, updated by every submit.
+    """
+    __tablename__ = "quiz_stats"
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    submissions = Column(Integer, nullable=False, default=0)   # Number of submissions
+    participants = Column(Integer, nullable=False, default=0)  # Distinct users who submitted
+    score_sum = Column(Float, nullable=False, default=0.0)     # Sum of all scores (for the mean)
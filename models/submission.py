@@ -1,12 +1,36 @@
 # models/submission.py
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, Index, String, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from database import Base
 from datetime import datetime
 
 class Submission(Base):
     __tablename__ = "submissions"
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))    # Participant who submitted
-    quiz_id = Column(Integer, ForeignKey("quizzes.id"))  # Quiz submitted
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)    # Participant who submitted
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), nullable=False)  # Quiz submitted
     score = Column(Float)                                # Calculated score (percentage)
-    submitted_at = Column(DateTime, default=datetime.utcnow)  # Submission timestamp
\ No newline at end of file
+    submitted_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Submission timestamp (monthly partition key on PostgreSQL)
+    ticket = Column(String(32))  # Ingestion ticket (queued submissions only)
+    idempotency_key = Column(String(64))  # Idempotency-Key header of the request, if any
+    # {question_id: option} of the answers when stored packed (ANSWER_STORAGE=packed,
+    # see utils/scoring.py) instead of as submission_answers rows; NULL otherwise
+    packed_answers = Column(JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql"))
+
+    # On PostgreSQL the table is range-partitioned by submitted_at month (migration
+    # 0007): its primary key is (id, submitted_at) and the indexes below exist per
+    # partition, where a unique index would only hold within a month. So none of
+    # them is unique, on any database (migration 0010): writers look for existing
+    # rows under lock_idempotency_keys (utils/partitions.py) instead, and the
+    # journal replaying a ticket is only ever read by one process.
+    __table_args__ = (
+        # Redundant with the primary key; migration 0007 dropped it on PostgreSQL,
+        # where the (id, submitted_at) key serves id lookups
+        Index("ix_submissions_id", "id").ddl_if(dialect="sqlite"),
+        # Serves per-quiz scans and the latest attempt of a user (ORDER BY id DESC)
+        Index("ix_submissions_quiz_id_user_id", "quiz_id", "user_id", "id"),
+        # Ticket lookups of the status endpoint and of journal replay
+        Index("ix_submissions_ticket", "ticket"),
+        # Lookups of a retried request (same user, same Idempotency-Key)
+        Index("ix_submissions_user_id_idempotency_key", "user_id", "idempotency_key"),
+    )
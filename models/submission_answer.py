@@ -1,10 +1,17 @@
 # models/submission_answer.py
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from database import Base
 
 class SubmissionAnswer(Base):
     __tablename__ = "submission_answers"
-    id = Column(Integer, primary_key=True, index=True)
-    submission_id = Column(Integer, ForeignKey("submissions.id")) # Link to submission
-    question_id = Column(Integer, ForeignKey("questions.id"))     # Link to question
-    selected_answer = Column(String)                              # Participant's answer (e.g., "B")
\ No newline at end of file
+    id = Column(Integer, primary_key=True)
+    submission_id = Column(Integer, ForeignKey("submissions.id"), nullable=False, index=True) # Link to submission
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)                 # Link to question
+    selected_answer = Column(String)                              # Participant's answer (e.g., "B")
+    submitted_at = Column(DateTime, nullable=False)               # Copy of the submission's submitted_at (partition key on PostgreSQL)
+
+    __table_args__ = (
+        # Redundant with the primary key; migration 0007 dropped it on PostgreSQL,
+        # where the (id, submitted_at) key serves id lookups
+        Index("ix_submission_answers_id", "id").ddl_if(dialect="sqlite"),
+    )
@@ -1,142 +1,430 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_session
 from models.quiz import Quiz
 from models.question import Question
 from schemas.quiz import QuizCreate, QuizOut
-from schemas.question import QuestionCreate, QuestionOut
+from schemas.question import QuestionCreate, QuestionOut, QuestionImportResult
+from schemas.stats import QuizStatsOut
 from utils.security import get_current_admin
+from utils.http import ORJSONResponse
+from utils.cache import quiz_cache, result_cache, snapshot_quiz
+from utils.metrics import pool_metrics
+from utils.ingest import submission_queue
+from utils.ratelimit import rate_limiter, admission_controllers
+from utils.replicas import replica_router
+from utils.scoring import rescore_quiz
+from utils.stats import rebuild_quiz_stats, get_quiz_stats
+from utils.question_import import (
+    IMPORT_FORMATS, IMPORT_MAX_BYTES, ImportPayloadError, ImportPayloadTooLarge, read_payload, detect_format, parse_rows, validate_rows, insert_questions
+)
+from utils.export import EXPORT_FORMATS, export_query, parquet_available, stream_export
+from utils.archive import ArchiveScan, archive_stats
+from utils.partitions import partition_maintainer, partition_stats
 
 # Create an API router for admin-specific endpoints
 router = APIRouter(prefix="/admin", tags=["admin"])
 
+# Drop the cached copies of changed quizzes; until the read replicas have caught
+# up, participants read them from the primary (so caches never refill stale)
+def quiz_changed(*quiz_ids: int):
+    quiz_cache.invalidate_quiz(*quiz_ids)
+    replica_router.mark_write()
+
 # ------------------- Creating a new quiz -------------------
 @router.post("/quizzes", response_model=QuizOut)
-def create_quiz(
-    quiz: QuizCreate, 
-    db: Session = Depends(get_db), 
+async def create_quiz(
+    quiz: QuizCreate,
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(get_current_admin)
 ):
     """
     Create a new quiz.
     Only an admin user can create a quiz.
     """
-    # Create a new quiz instance
-    new_quiz = Quiz(
-        title=quiz.title, 
-        description=quiz.description, 
-        created_by=current_user["id"]  # Assign the creator's ID
-    )
-    db.add(new_quiz)  # Add the quiz to the database session
-    db.commit()  # Commit changes to the database
-    db.refresh(new_quiz)  # Refresh the quiz instance to reflect new changes
+    def create(db: Session):
+        # Create a new quiz instance
+        new_quiz = Quiz(
+            title=quiz.title,
+            description=quiz.description,
+            created_by=current_user["id"],  # Assign the creator's ID
+            max_attempts=quiz.max_attempts,
+            attempt_policy=quiz.attempt_policy
+        )
+        db.add(new_quiz)  # Add the quiz to the database session
+        db.commit()  # Commit changes to the database
+        db.refresh(new_quiz)  # Refresh the quiz instance to reflect new changes
+        return snapshot_quiz(new_quiz)  # Detached copy, safe to use outside the session
+
+    new_quiz = await session.run_sync(create)
+    quiz_changed(new_quiz.id)  # New quiz must show up in cached listings
     return new_quiz  # Return the newly created quiz
 
 # ------------------- Deleting a quiz -------------------
-@router.delete("/quizzes/{quiz_id}")
-def delete_quiz(
-    quiz_id: int, 
-    db: Session = Depends(get_db), 
+@router.delete("/quizzes/{quiz_id}", response_class=ORJSONResponse)
+async def delete_quiz(
+    quiz_id: int,
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(get_current_admin)
 ):
     """
     Delete a quiz by its ID.
     Only the creator of the quiz can delete it.
     """
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
-    
-    if not quiz:  # If the quiz does not exist, return 404 error
-        raise HTTPException(status_code=404, detail="Quiz not found")
+    def delete(db: Session):
+        quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+
+        if not quiz:  # If the quiz does not exist, return 404 error
+            raise HTTPException(status_code=404, detail="Quiz not found")
+
+        if quiz.created_by != current_user["id"]:  # Ensure only the creator can delete
+            raise HTTPException(status_code=403, detail="Not your quiz")
 
-    if quiz.created_by != current_user["id"]:  # Ensure only the creator can delete
-        raise HTTPException(status_code=403, detail="Not your quiz")
+        db.delete(quiz)  # Delete the quiz
+        db.commit()  # Commit the deletion
 
-    db.delete(quiz)  # Delete the quiz
-    db.commit()  # Commit the deletion
+    await session.run_sync(delete)
+    quiz_changed(quiz_id)  # Drop the cached quiz and listings
     return {"message": "Quiz deleted"}
 
 # ------------------- Creating a new question -------------------
 @router.post("/questions", response_model=QuestionOut)
-def create_question(
-    question: QuestionCreate, 
-    db: Session = Depends(get_db), 
+async def create_question(
+    question: QuestionCreate,
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(get_current_admin)
 ):
     """
     Create a new question under a quiz.
     The quiz must exist and belong to the current admin.
     """
-    quiz = db.query(Quiz).filter(Quiz.id == question.quiz_id).first()
+    def create(db: Session):
+        quiz = db.query(Quiz).filter(Quiz.id == question.quiz_id).first()
 
-    if not quiz or quiz.created_by != current_user["id"]:
-        raise HTTPException(status_code=403, detail="Invalid quiz or not your quiz")
+        if not quiz or quiz.created_by != current_user["id"]:
+            raise HTTPException(status_code=403, detail="Invalid quiz or not your quiz")
 
-    # Create a new question instance
-    new_question = Question(
-        statement=question.statement,
-        options=question.options,
-        correct_answer=question.correct_answer,
-        quiz_id=question.quiz_id
-    )
+        # Create a new question instance
+        new_question = Question(
+            statement=question.statement,
+            options=question.options,
+            correct_answer=question.correct_answer,
+            quiz_id=question.quiz_id
+        )
+
+        db.add(new_question)  # Add the question to the database session
+        db.commit()  # Commit the transaction
+        db.refresh(new_question)  # Refresh to reflect new changes
+        return new_question
 
-    db.add(new_question)  # Add the question to the database session
-    db.commit()  # Commit the transaction
-    db.refresh(new_question)  # Refresh to reflect new changes
+    new_question = await session.run_sync(create)
+    quiz_changed(new_question.quiz_id)  # Cached quiz is missing the question
     return new_question  # Return the created question
 
+# ------------------- Bulk importing questions -------------------
+@router.post("/questions/import", response_model=QuestionImportResult)
+async def import_questions(
+    request: Request,
+    quiz_id: Optional[int] = None,
+    format: Optional[str] = Query(None, pattern="^(json|ndjson|csv)$"),
+    skip_invalid: bool = False,
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Create many questions in one request.
+    - Body: a JSON array, NDJSON or CSV (columns quiz_id, statement, options as a
+      JSON object, correct_answer), sent raw or as a multipart `file` upload.
+      The format comes from `format`, else from the file name or Content-Type.
+    - `quiz_id` applies to rows without one.
+    - The payload is read up to IMPORT_MAX_BYTES (413 beyond) and parsed up to
+      IMPORT_MAX_ROWS rows (400 beyond), without buffering the rest.
+    - The payload is validated once and quiz ownership is checked with one query.
+    - All questions go in with COPY (PostgreSQL) or multi-row INSERTs in a single transaction.
+    - If any row is invalid nothing is imported (422 listing the row errors),
+      unless `skip_invalid` is set: then the valid rows are imported and the
+      errors are reported alongside.
+    """
+    content_type = request.headers.get("content-type", "")
+    filename = None
+    try:
+        # A declared length over the limit is refused before anything is read (or spooled by the form parser)
+        if int(request.headers.get("content-length") or 0) > IMPORT_MAX_BYTES:
+            raise ImportPayloadTooLarge(f"Payload too large (at most {IMPORT_MAX_BYTES} bytes per import)")
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Upload the questions as a 'file' field")
+
+            async def upload_chunks():
+                while chunk := await upload.read(64 * 1024):
+                    yield chunk
+
+            data = await read_payload(upload_chunks())
+            filename, content_type = upload.filename, upload.content_type
+        else:
+            data = await read_payload(request.stream())
+    except ImportPayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    fmt = format or detect_format(content_type, filename)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=415, detail="Send JSON, NDJSON or CSV (or pass format=...)")
+
+    try:
+        rows = parse_rows(data, fmt)
+    except ImportPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def load(db: Session):
+        questions, errors = validate_rows(db, rows, current_user["id"], quiz_id)
+        if errors and not skip_invalid:
+            db.rollback()
+            return 0, errors, set()
+
+        try:
+            insert_questions(db, questions)
+            db.commit()  # One transaction for the whole import
+        except Exception:
+            db.rollback()
+            raise
+        return len(questions), errors, {q.quiz_id for q in questions}
+
+    imported, errors, quiz_ids = await session.run_sync(load)
+    if quiz_ids:
+        quiz_changed(*quiz_ids)  # Cached quizzes are missing the new questions
+
+    result = {"imported": imported, "errors": errors}
+    if errors and not skip_invalid:
+        return ORJSONResponse(status_code=422, content=result)
+    return result
+
 # ------------------- Updating a question -------------------
 @router.put("/questions/{question_id}", response_model=QuestionOut)
-def update_question(
-    question_id: int, 
-    question: QuestionCreate, 
-    db: Session = Depends(get_db), 
+async def update_question(
+    question_id: int,
+    question: QuestionCreate,
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(get_current_admin)
 ):
     """
     Update an existing question.
     Only the admin who created the quiz can update its questions.
+    Changing the correct answer or options rescores the quiz's stored submissions.
     """
-    q = db.query(Question).filter(Question.id == question_id).first()
+    def update(db: Session):
+        q = db.query(Question).filter(Question.id == question_id).first()
+
+        if not q:  # If the question does not exist, return 404 error
+            raise HTTPException(status_code=404, detail="Question not found")
 
-    if not q:  # If the question does not exist, return 404 error
-        raise HTTPException(status_code=404, detail="Question not found")
+        quiz = db.query(Quiz).filter(Quiz.id == q.quiz_id).first()
 
-    quiz = db.query(Quiz).filter(Quiz.id == q.quiz_id).first()
+        if quiz.created_by != current_user["id"]:  # Ensure only the quiz creator can update
+            raise HTTPException(status_code=403, detail="Not your quiz")
 
-    if quiz.created_by != current_user["id"]:  # Ensure only the quiz creator can update
-        raise HTTPException(status_code=403, detail="Not your quiz")
+        old_quiz_id = q.quiz_id  # The question may move to another quiz
+        answer_changed = q.correct_answer != question.correct_answer or q.options != question.options
 
-    # Update the question details
-    q.statement = question.statement
-    q.options = question.options
-    q.correct_answer = question.correct_answer
-    q.quiz_id = question.quiz_id
+        # Update the question details
+        q.statement = question.statement
+        q.options = question.options
+        q.correct_answer = question.correct_answer
+        q.quiz_id = question.quiz_id
 
-    db.commit()  # Save changes
-    db.refresh(q)  # Refresh the question instance
+        # A corrected answer changes stored scores: rescore them in the same transaction
+        rescored = answer_changed and old_quiz_id == q.quiz_id
+        if rescored:
+            db.flush()
+            rescore_quiz(db, q.quiz_id)
+            rebuild_quiz_stats(db, q.quiz_id)  # Leaderboard and stats follow the new scores
+
+        db.commit()  # Save changes
+        db.refresh(q)  # Refresh the question instance
+        return q, old_quiz_id, rescored
+
+    q, old_quiz_id, rescored = await session.run_sync(update)
+    quiz_changed(old_quiz_id, q.quiz_id)  # Drop both affected quizzes
+    if rescored:
+        result_cache.invalidate()  # Cached results carry the old scores
     return q  # Return the updated question
 
 # ------------------- Deleting a question -------------------
-@router.delete("/questions/{question_id}")
-def delete_question(
-    question_id: int, 
-    db: Session = Depends(get_db), 
+@router.delete("/questions/{question_id}", response_class=ORJSONResponse)
+async def delete_question(
+    question_id: int,
+    session: AsyncSession = Depends(get_session),
     current_user: dict = Depends(get_current_admin)
 ):
     """
     Delete a question by its ID.
     Only the admin who created the quiz can delete its questions.
     """
-    q = db.query(Question).filter(Question.id == question_id).first()
+    def delete(db: Session):
+        q = db.query(Question).filter(Question.id == question_id).first()
 
-    if not q:  # If the question does not exist, return 404 error
-        raise HTTPException(status_code=404, detail="Question not found")
+        if not q:  # If the question does not exist, return 404 error
+            raise HTTPException(status_code=404, detail="Question not found")
 
-    quiz = db.query(Quiz).filter(Quiz.id == q.quiz_id).first()
+        quiz = db.query(Quiz).filter(Quiz.id == q.quiz_id).first()
 
-    if quiz.created_by != current_user["id"]:  # Ensure only the quiz creator can delete
-        raise HTTPException(status_code=403, detail="Not your quiz")
+        if quiz.created_by != current_user["id"]:  # Ensure only the quiz creator can delete
+            raise HTTPException(status_code=403, detail="Not your quiz")
 
-    db.delete(q)  # Delete the question
-    db.commit()  # Commit the deletion
+        db.delete(q)  # Delete the question
+        db.commit()  # Commit the deletion
+        return quiz.id
+
+    quiz_id = await session.run_sync(delete)
+    quiz_changed(quiz_id)  # Drop the cached quiz and listings
     return {"message": "Question deleted"}
+
+# ------------------- Quiz statistics -------------------
+@router.get("/quizzes/{quiz_id}/stats", response_model=QuizStatsOut)
+async def get_quiz_statistics(
+    quiz_id: int,
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Return submission count, participants, mean score, score histogram and
+    per-question correctness rate of a quiz.
+    Only the creator of the quiz can see its statistics.
+    Read from aggregates maintained on submit (no scan of the submissions).
+    """
+    def load(db: Session):
+        quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+
+        if not quiz:  # If the quiz does not exist, return 404 error
+            raise HTTPException(status_code=404, detail="Quiz not found")
+
+        if quiz.created_by != current_user["id"]:  # Ensure only the creator can see the stats
+            raise HTTPException(status_code=403, detail="Not your quiz")
+
+        return get_quiz_stats(db, quiz_id)
+
+    return await session.run_sync(load)
+
+# ------------------- Exporting submissions -------------------
+@router.get("/export/submissions")
+async def export_submissions(
+    quiz_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Stream the submissions and answers of the admin's quizzes as CSV, NDJSON or Parquet.
+    - One row per answer; filter by `quiz_id` and/or a submitted_at range [since, until).
+    - Rows are read with a server-side cursor and encoded batch by batch, so
+      memory stays constant however many rows are exported.
+    - Archived months are read from their Parquet files and come first.
+    """
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    if quiz_id is not None:
+        def check(db: Session):
+            quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+
+            if not quiz:  # If the quiz does not exist, return 404 error
+                raise HTTPException(status_code=404, detail="Quiz not found")
+
+            if quiz.created_by != current_user["id"]:  # Ensure only the creator can export
+                raise HTTPException(status_code=403, detail="Not your quiz")
+
+        await session.run_sync(check)
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"submissions-{quiz_id}.{extension}" if quiz_id is not None else f"submissions.{extension}"
+    return StreamingResponse(
+        # Streams on its own connection: the request session is closed once the handler returns
+        stream_export(
+            session.bind, export_query(current_user["id"], quiz_id, since, until), format,
+            archived=ArchiveScan(current_user["id"], quiz_id, since, until),
+        ),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# ------------------- Quiz cache statistics -------------------
+@router.get("/cache/stats", response_class=ORJSONResponse)
+async def get_cache_stats(current_user: dict = Depends(get_current_admin)):
+    """
+    Return hit/miss/eviction counters of the in-process quiz and result caches.
+    Only reflects the worker process that serves the request.
+    """
+    return {**quiz_cache.stats(), "results": result_cache.stats()}
+
+# ------------------- Connection pool statistics -------------------
+@router.get("/pool/stats", response_class=ORJSONResponse)
+async def get_pool_stats(current_user: dict = Depends(get_current_admin)):
+    """
+    Return checkout wait and in-use metrics of the database connection pools.
+    Use them to size DB_POOL_SIZE / DB_MAX_OVERFLOW for this worker process.
+    """
+    return {name: metrics.stats() for name, metrics in pool_metrics.items()}
+
+# ------------------- Submission queue statistics -------------------
+@router.get("/ingest/stats", response_class=ORJSONResponse)
+async def get_ingest_stats(current_user: dict = Depends(get_current_admin)):
+    """
+    Return the state of the submission ingestion queue (SUBMIT_MODE=queue):
+    pending, stored and failed submissions, batches committed, rejections.
+    Only reflects the worker process that serves the request.
+    """
+    return submission_queue.stats()
+
+# ------------------- Rate limit and admission statistics -------------------
+@router.get("/limits/stats", response_class=ORJSONResponse)
+async def get_limit_stats(current_user: dict = Depends(get_current_admin)):
+    """
+    Return the configured rate limits with allowed/limited (429) counts, and the
+    admission controller's in-flight, waiting and rejected (503) requests.
+    Only reflects the worker process that serves the request.
+    """
+    return {
+        "rate_limits": rate_limiter.stats(),
+        "admission": admission_controllers[0].stats() if admission_controllers else None,
+    }
+
+# ------------------- Read replica statistics -------------------
+@router.get("/replicas/stats", response_class=ORJSONResponse)
+async def get_replica_stats(current_user: dict = Depends(get_current_admin)):
+    """
+    Return the health, replication lag, reads and failovers of each read replica,
+    and how many reads went to the primary (no healthy replica, or read-your-writes).
+    Only reflects the worker process that serves the request.
+    """
+    return replica_router.stats()
+
+# ------------------- Partitions and archived months -------------------
+@router.get("/partitions/stats", response_class=ORJSONResponse)
+async def get_partition_stats(
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Return the monthly partitions of the submission tables (PostgreSQL) with
+    their estimated rows, the rows that fell into the DEFAULT partition, the
+    archived months, and this worker's partition maintenance.
+    """
+    def load(db: Session):
+        conn = db.connection()
+        return {
+            **partition_stats(conn),
+            "archived": archive_stats(conn),
+            "maintenance": {
+                "enabled": partition_maintainer.enabled(),  # Runs in this worker process
+                "created": partition_maintainer.created, "last_error": partition_maintainer.last_error,
+            },
+        }
+
+    return await session.run_sync(load)
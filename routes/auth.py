@@ -1,18 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
-from database import get_db
+from database import get_session
 from models.user import User, Role
 from schemas.user import UserCreate, UserOut, Token
-from utils.security import get_password_hash, verify_password, create_access_token
+from utils.security import create_access_token
+from utils.hashing import hashing_service, HashingBusy
+from utils.ratelimit import enforce
 from datetime import timedelta
 
 # Creating an API router for authentication endpoints
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# Error returned when the password hashing service sheds load
+def hashing_busy(error: HashingBusy) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server busy, please retry",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+# Client address the per-IP limits are keyed by (the proxy's unless proxy headers are trusted)
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+# ------------------- Rate limits -------------------
+async def register_rate_limit(request: Request):
+    """
+    RATE_LIMIT_REGISTER_IP per client IP. Answers 429 with Retry-After.
+    """
+    enforce("register_ip", client_ip(request))
+
+async def login_rate_limit(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """
+    Checked before any password is hashed:
+    - RATE_LIMIT_LOGIN per client IP and username (password guessing against
+      one account), so nobody can lock an account out from another address,
+    - RATE_LIMIT_LOGIN_USER, looser, per username from any IP (distributed guessing),
+    - RATE_LIMIT_LOGIN_IP per client IP.
+    """
+    ip, username = client_ip(request), form_data.username.lower()
+    enforce("login_ip", ip)
+    enforce("login", f"{ip}|{username}")
+    enforce("login_user", username)
+
 # ------------------- Registering a new user -------------------
-@router.post("/register", response_model=UserOut)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+@router.post("/register", response_model=UserOut, dependencies=[Depends(register_rate_limit)])
+async def register_user(user: UserCreate, session: AsyncSession = Depends(get_session)):
     """
     Register a new user.
     - Checks if the username already exists.
@@ -20,45 +55,71 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     - Saves the user to the database.
     """
     # Check if the username is already taken
-    existing_user = db.query(User).filter(User.username == user.username).first()
+    existing_user = await session.run_sync(
+        lambda db: db.query(User).filter(User.username == user.username).first()
+    )
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already taken")
 
-    # Hash the password before storing it
-    hashed_password = get_password_hash(user.password)
+    # Hash the password before storing it (CPU-bound, done by the hashing service)
+    try:
+        hashed_password = await hashing_service.hash(user.password)
+    except HashingBusy as e:
+        raise hashing_busy(e)
 
-    # Create a new user instance
-    new_user = User(
-        username=user.username, 
-        hashed_password=hashed_password, 
-        role=user.role  # Assign the role
-    )
+    def create(db: Session):
+        # Create a new user instance
+        new_user = User(
+            username=user.username,
+            hashed_password=hashed_password,
+            role=user.role  # Assign the role
+        )
+
+        db.add(new_user)  # Add the user to the database session
+        db.commit()  # Commit changes to save the user
+        db.refresh(new_user)  # Refresh the user instance
+        return new_user
 
-    db.add(new_user)  # Add the user to the database session
-    db.commit()  # Commit changes to save the user
-    db.refresh(new_user)  # Refresh the user instance
+    new_user = await session.run_sync(create)
 
     return new_user  # Return the newly created user
 
 # ------------------- Login and getting a JWT token -------------------
-@router.post("/token", response_model=Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), 
-    db: Session = Depends(get_db)
+@router.post("/token", response_model=Token, dependencies=[Depends(login_rate_limit)])
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Authenticate a user and generate a JWT token.
     - Checks if the user exists.
     - Verifies the provided password.
+    - Rehashes the password if it was stored with outdated bcrypt settings.
     - Generates an access token valid for 30 minutes.
     """
     # Fetch the user from the database using the provided username
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await session.run_sync(
+        lambda db: db.query(User).filter(User.username == form_data.username).first()
+    )
 
     # If the user does not exist or password is incorrect, return 401 error
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    try:
+        valid, new_hash = await hashing_service.verify_and_update(form_data.password, user.hashed_password)
+    except HashingBusy as e:
+        raise hashing_busy(e)
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
+    # Upgrade the stored hash to the current cost parameters
+    if new_hash:
+        def rehash(db: Session):
+            db.query(User).filter(User.id == user.id).update({User.hashed_password: new_hash})
+            db.commit()
+
+        await session.run_sync(rehash)
+
     # Create an access token valid for 30 minutes
     token = create_access_token(
         user.username,  # Username as the identity
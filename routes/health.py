@@ -0,0 +1,44 @@
+import asyncio
+import os
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_session
+from utils.http import ORJSONResponse
+from utils.ingest import SUBMIT_MODE, submission_queue
+
+# Seconds the readiness probe waits for the database before reporting it down
+READINESS_DB_TIMEOUT = float(os.getenv("READINESS_DB_TIMEOUT", "2"))
+
+# Creating an API router for load balancer / orchestrator probes (no authentication)
+router = APIRouter(prefix="/health", tags=["health"])
+
+# ------------------- Liveness -------------------
+@router.get("/live", response_class=ORJSONResponse)
+async def liveness():
+    """
+    The process is up and serving requests. Does not touch the database.
+    """
+    return {"status": "ok"}
+
+# ------------------- Readiness -------------------
+@router.get("/ready", response_class=ORJSONResponse)
+async def readiness(request: Request, session: AsyncSession = Depends(get_session)):
+    """
+    The worker can take traffic: startup finished, the database answers
+    (within READINESS_DB_TIMEOUT seconds) and, with SUBMIT_MODE=queue, the
+    submission writer is running. Returns 503 with the failed checks otherwise.
+    """
+    checks = {"startup": getattr(request.app.state, "ready", False)}
+
+    try:
+        await asyncio.wait_for(session.run_sync(lambda db: db.execute(text("SELECT 1"))), READINESS_DB_TIMEOUT)
+        checks["database"] = True
+    except Exception:
+        checks["database"] = False
+
+    if SUBMIT_MODE == "queue":
+        checks["submission_queue"] = submission_queue.running
+
+    ready = all(checks.values())
+    return ORJSONResponse(status_code=200 if ready else 503, content={"status": "ok" if ready else "unavailable", "checks": checks})
@@ -1,41 +1,215 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_session
 from models.quiz import Quiz
 from models.question import Question
 from models.submission import Submission
 from models.submission_answer import SubmissionAnswer
-from schemas.quiz import QuizOut
-from schemas.submission import SubmissionCreate, SubmissionResult, AnswerResult
+from models.leaderboard_entry import LeaderboardEntry
+from models.failed_submission import FailedSubmission
+from schemas.quiz import QuizOut, QuizSummary, QuestionParticipant
+from schemas.submission import SubmissionCreate, SubmissionResult, SubmissionTicket
+from schemas.stats import LeaderboardOut
 from utils.security import get_current_participant
-from typing import List
+from utils.cache import quiz_cache, result_cache, idempotency_cache, render_quizzes
+from utils.http import ORJSONResponse, make_etag, cached_json_response, encoded_json_response, json_dumps
+from utils.scoring import InvalidAnswers, ANSWER_STORAGE, ANSWER_VALIDATION, pack_answers, unpack_answers, validate_answers_sql
+from utils.stats import AttemptsExhausted, record_submission, get_attempts, get_leaderboard
+from utils.ingest import SUBMIT_MODE, IngestQueueFull, queued_recently, submission_queue
+from utils.ratelimit import enforce
+from utils.replicas import get_read_session, read_or_primary, replica_router
+from utils.partitions import DuplicateSubmission, lock_idempotency_keys
+from utils.archive import find_archived_submission, latest_archived_submission
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import hashlib
+import json
 
 # Creating an API router for participant-related actions
 router = APIRouter(prefix="/participant", tags=["participant"])
 
+# ------------------- Storing a scored submission -------------------
+def store_submission(
+    db: Session,
+    user_id: int,
+    quiz_id: int,
+    score: float,
+    answers: Sequence[Tuple[int, str]],
+    correct: Sequence[bool] = (),
+    idempotency_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    storage: str = ANSWER_STORAGE
+) -> int:
+    """
+    Insert a submission and all of its (question_id, selected_answer) pairs
+    atomically and return the new submission ID.
+    - The submission row is inserted with RETURNING id (no refresh round trip).
+    - Answers go in as one executemany, batched into multi-row VALUES; with
+      `storage` "packed" they are packed into the submission row instead.
+    - The quiz aggregates (stats, leaderboard) are updated in the same transaction;
+      `correct` tells, per answer, whether it was right.
+    - A single commit, so a failure never leaves a half-written submission.
+    - Raises DuplicateSubmission if the user already stored `idempotency_key`,
+      and AttemptsExhausted beyond `max_attempts`; nothing is stored in either case.
+    """
+    submitted_at = datetime.utcnow()
+    packed = storage == "packed"
+    try:
+        if idempotency_key is not None:
+            # Retries of the key wait for each other, the second one finds the first one's row
+            lock_idempotency_keys(db, [(user_id, idempotency_key)])
+            if db.query(Submission.id).filter(
+                Submission.user_id == user_id,
+                Submission.idempotency_key == idempotency_key
+            ).first() is not None:
+                raise DuplicateSubmission()
+
+        submission_id = db.execute(
+            insert(Submission)
+            .values(
+                user_id=user_id, quiz_id=quiz_id, score=score, submitted_at=submitted_at,
+                idempotency_key=idempotency_key, packed_answers=pack_answers(answers) if packed else None,
+            )
+            .returning(Submission.id)
+        ).scalar_one()
+
+        if answers and not packed:
+            db.execute(insert(SubmissionAnswer), [
+                {
+                    "submission_id": submission_id, "question_id": question_id, "selected_answer": selected,
+                    "submitted_at": submitted_at,
+                }
+                for question_id, selected in answers
+            ])
+
+        record_submission(
+            db, submission_id, user_id, quiz_id, score, submitted_at,
+            list(zip((question_id for question_id, _ in answers), correct)),
+            max_attempts,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()  # Nothing of the submission is kept
+        raise
+    return submission_id
+
 # ------------------- Get all available quizzes -------------------
 @router.get("/quizzes", response_model=List[QuizOut])
-def get_quizzes(
-    db: Session = Depends(get_db), 
+async def get_quizzes(
+    limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_participant)
 ):
     """
-    Fetch all available quizzes along with their questions.
+    Fetch available quizzes along with their questions.
+    - Uses keyset pagination: pass the last quiz ID seen as `after_id`.
+    - Questions for the whole page are loaded with one batched query.
+    - Pages are served from the in-process quiz cache when possible.
+    - Each cached quiz is serialized once; the page body is joined from those bytes.
+    - The `X-Next-After-Id` header holds the cursor for the next page.
     """
-    quizzes = db.query(Quiz).all()  # Fetch all quizzes from the database
-    
-    # Fetch questions for each quiz
-    for quiz in quizzes:
-        quiz.questions = db.query(Question).filter(Question.quiz_id == quiz.id).all()
+    quizzes = await session.run_sync(quiz_cache.get_page, after_id, limit)
 
-    return quizzes  # Return quizzes along with their questions
+    # Only advertise a next page when this one is full
+    headers = {}
+    if len(quizzes) == limit:
+        headers["X-Next-After-Id"] = str(quizzes[-1].id)
 
-# ------------------- Submit quiz answers -------------------
-@router.post("/submit", response_model=SubmissionResult)
-def submit_quiz(
-    submission: SubmissionCreate, 
-    db: Session = Depends(get_db), 
+    # Return quizzes along with their questions
+    return Response(content=render_quizzes(quizzes), media_type="application/json", headers=headers)
+
+# ------------------- Quiz listing without questions -------------------
+@router.get("/quizzes/summary", response_model=List[QuizSummary])
+async def get_quiz_summaries(
+    limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(get_current_participant)
+):
+    """
+    Fetch available quizzes with their question counts but without questions,
+    for list views.
+    - Same keyset pagination as GET /participant/quizzes (`after_id`, `X-Next-After-Id`).
+    - Rendered pages are cached and invalidated together with the quiz cache.
+    """
+    body, last_id, count = await session.run_sync(quiz_cache.get_summary_page, after_id, limit)
+
+    # Only advertise a next page when this one is full
+    headers = {}
+    if count == limit:
+        headers["X-Next-After-Id"] = str(last_id)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# ------------------- Get one quiz snapshot -------------------
+@router.get("/quizzes/{quiz_id}", response_model=QuizOut)
+async def get_quiz_snapshot(
+    quiz_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_participant)
+):
+    """
+    Fetch one quiz with all its questions.
+    - The body is rendered, hashed and compressed (gzip, brotli if installed)
+      once per cached snapshot and negotiated through Accept-Encoding.
+    - Responses carry a strong ETag derived from the content; re-fetching with
+      If-None-Match returns 304 without a body until the quiz changes.
+    """
+    quiz = await session.run_sync(quiz_cache.get_quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    return encoded_json_response(request, quiz.encoded)
+
+# ------------------- Get questions of a quiz page by page -------------------
+@router.get("/quizzes/{quiz_id}/questions", response_model=List[QuestionParticipant])
+async def get_quiz_questions(
+    quiz_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=200),
+    after_id: Optional[int] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(get_current_participant)
+):
+    """
+    Fetch the questions of a quiz one page at a time, ordered by ID.
+    - Keyset pagination: pass the last question ID seen as `after_id`; the
+      `X-Next-After-Id` header holds the cursor for the next page.
+    - Served from the cached quiz snapshot.
+    """
+    quiz = await session.run_sync(quiz_cache.get_quiz, quiz_id)
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    start = 0 if after_id is None else bisect_right(quiz.questions, after_id, key=lambda q: q.id)
+    questions = quiz.questions[start:start + limit]
+
+    # Only advertise a next page when more questions follow
+    if start + limit < len(quiz.questions):
+        response.headers["X-Next-After-Id"] = str(questions[-1].id)
+
+    return questions
+
+# ------------------- Submit quiz answers -------------------
+async def submit_rate_limit(current_user: dict = Depends(get_current_participant)):
+    """
+    RATE_LIMIT_SUBMIT per user ID from the JWT claims. Answers 429 with Retry-After.
+    """
+    enforce("submit", current_user["id"])
+
+@router.post("/submit", response_model=SubmissionResult, dependencies=[Depends(submit_rate_limit)])
+async def submit_quiz(
+    submission: SubmissionCreate,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+    current_user: dict = Depends(get_current_participant),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", min_length=1, max_length=64)
 ):
     """
     Submit quiz answers.
@@ -43,104 +217,352 @@ def submit_quiz(
     - Checks if answers are valid.
     - Calculates score.
     - Stores the submission and answers in the database.
+    - With SUBMIT_MODE=queue, answers 202 with a ticket instead and the submission
+      is stored by the background writer; poll GET /participant/submissions/{ticket}.
+    - A retry with the same Idempotency-Key returns the stored result (or the same
+      ticket) without scoring or storing again; reusing a key for different
+      answers is rejected with 422.
+    - Quizzes with max_attempts refuse further submissions with 409.
     """
-    # Check if quiz exists
-    quiz = db.query(Quiz).filter(Quiz.id == submission.quiz_id).first()
+    user_id = current_user["id"]
+
+    # Retried request: answer with what the first one stored
+    fingerprint = None
+    if idempotency_key is not None:
+        fingerprint = submission_fingerprint(submission.quiz_id, submission.answers)
+        replay = await session.run_sync(replay_submission, user_id, idempotency_key, fingerprint, submission)
+        if replay is not None:
+            return replay
+
+    # Check if quiz exists (served from the quiz cache together with its questions)
+    quiz = await session.run_sync(quiz_cache.get_quiz, submission.quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
-    # Fetch all questions for the given quiz
-    questions = db.query(Question).filter(Question.quiz_id == submission.quiz_id).all()
-    question_ids = [q.id for q in questions]
-
-    # Ensure all questions are answered
-    if set(submission.answers.keys()) != set(question_ids):
-        raise HTTPException(status_code=400, detail="Answer all questions")
+    # Refuse early once the attempts are used up (enforced again when storing)
+    if quiz.max_attempts is not None:
+        attempts = await session.run_sync(get_attempts, submission.quiz_id, user_id)
+        if attempts >= quiz.max_attempts:
+            raise attempts_exhausted(AttemptsExhausted(quiz.max_attempts))
 
-    # Calculate score and validate answers
-    correct_count = 0
-    answers_list = []
+    # Optionally validate in PostgreSQL as well (set-based check on the JSONB options)
+    if ANSWER_VALIDATION == "sql":
+        try:
+            await session.run_sync(validate_answers_sql, submission.quiz_id, submission.answers)
+        except InvalidAnswers as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    for q in questions:
-        selected_answer = submission.answers[q.id]
+    # Validate and score against the quiz's compiled answer key
+    key = quiz.answer_key
+    try:
+        score = key.score(submission.answers)
+    except InvalidAnswers as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Validate if the selected answer is a valid option
-        if selected_answer not in q.options:
-            raise HTTPException(status_code=400, detail=f"Invalid answer for question {q.id}")
+    answers_list = [
+        {"question_id": question_id, "selected_answer": submission.answers[question_id], "correct_answer": correct}
+        for question_id, correct in zip(key.question_ids, key.correct)
+    ]
 
-        # Check if the answer is correct
-        if selected_answer == q.correct_answer:
-            correct_count += 1
+    answers = [(answer["question_id"], answer["selected_answer"]) for answer in answers_list]
+    correct = [answer["selected_answer"] == answer["correct_answer"] for answer in answers_list]
 
-        # Store the answer result
-        answers_list.append(
-            AnswerResult(
-                question_id=q.id, 
-                selected_answer=selected_answer, 
-                correct_answer=q.correct_answer
+    # Queue mode: acknowledge with a ticket, the background writer stores the submission
+    if SUBMIT_MODE == "queue":
+        try:
+            ticket = await submission_queue.submit(
+                user_id, submission.quiz_id, score, answers, correct, idempotency_key, quiz.max_attempts
             )
+        except IngestQueueFull as e:
+            raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": str(e.retry_after)})
+        if idempotency_key is not None:
+            idempotency_cache.put((user_id, idempotency_key), (fingerprint, None, ticket), idempotency_cache.generation)
+        accepted = ORJSONResponse(status_code=202, content={"ticket": ticket, "status": "queued"})
+        replica_router.mark_write(user_id, accepted)  # Read the ticket and result back from the primary
+        return accepted
+
+    # Save the submission and its answers in one transaction
+    result = {"score": score, "answers": answers_list}
+    generation = result_cache.generation
+    try:
+        submission_id = await session.run_sync(
+            store_submission, user_id, submission.quiz_id, score, answers, correct, idempotency_key, quiz.max_attempts
         )
+    except AttemptsExhausted as e:
+        raise attempts_exhausted(e)
+    except (IntegrityError, DuplicateSubmission):
+        if idempotency_key is None:
+            raise
+        # A concurrent retry with the same key stored first: answer with its submission
+        replay = await session.run_sync(replay_submission, user_id, idempotency_key, fingerprint, submission)
+        if replay is None:
+            raise
+        return replay
+
+    replica_router.mark_write(user_id, response)  # GET /result must see this submission: read from the primary for a while
 
-    # Calculate the score as a percentage
-    score = (correct_count / len(questions)) * 100  
+    # Remember the response so retries are answered from memory
+    if idempotency_key is not None:
+        body = json_dumps(result)
+        result_cache.put(submission_id, (make_etag(body), body), generation)
+        idempotency_cache.put((user_id, idempotency_key), (fingerprint, submission_id, None), idempotency_cache.generation)
 
-    # Save the submission in the database
-    new_submission = Submission(
-        user_id=current_user["id"], 
-        quiz_id=submission.quiz_id, 
-        score=score
-    )
-    db.add(new_submission)
-    db.commit()
-    db.refresh(new_submission)
+    return result
 
-    # Save each answer in the database
-    for answer in answers_list:
-        db.add(SubmissionAnswer(
-            submission_id=new_submission.id, 
-            question_id=answer.question_id, 
-            selected_answer=answer.selected_answer
-        ))
+# ------------------- Answers of a stored submission -------------------
+def load_answers(db: Session, submission_id: int) -> List[dict]:
+    """
+    Selected and correct answer of every question of a submission, in question
+    order. Answers are stored as rows (read with one joined query) or packed
+    into the submission (ANSWER_STORAGE): the layout new submissions use is
+    looked up first, the other one only if it has nothing.
+    """
+    if ANSWER_STORAGE == "packed":
+        answers = load_packed_answers(db, submission_id) or load_answer_rows(db, submission_id)
+    else:
+        answers = load_answer_rows(db, submission_id) or load_packed_answers(db, submission_id)
+
+    return [
+        {"question_id": question_id, "selected_answer": selected, "correct_answer": correct}
+        for question_id, selected, correct in answers
+    ]
+
+def load_answer_rows(db: Session, submission_id: int) -> List[Tuple[int, str, str]]:
+    return db.query(
+        SubmissionAnswer.question_id,
+        SubmissionAnswer.selected_answer,
+        Question.correct_answer
+    ).join(Question, Question.id == SubmissionAnswer.question_id).filter(
+        SubmissionAnswer.submission_id == submission_id
+    ).order_by(SubmissionAnswer.question_id).all()
+
+def load_packed_answers(db: Session, submission_id: int) -> List[Tuple[int, str, str]]:
+    """
+    Same as load_answer_rows for a packed submission: one query for the packed
+    answers, the correct ones come from the quiz cache's answer key. Like the
+    join there, answers to questions deleted since are left out.
+    """
+    stored = db.query(Submission.quiz_id, Submission.packed_answers).filter(Submission.id == submission_id).first()
+    if stored is None or not stored.packed_answers:
+        return []
+    quiz = quiz_cache.get_quiz(db, stored.quiz_id)
+    if quiz is None:
+        return []
+    key = quiz.answer_key
+    return [
+        (question_id, selected, key.correct[key.positions[question_id]])
+        for question_id, selected in unpack_answers(stored.packed_answers) if question_id in key.positions
+    ]
+
+# ------------------- Rendering a stored result -------------------
+def render_result(db: Session, submission_id: int, score: Optional[float] = None) -> Tuple[str, bytes]:
+    """
+    (ETag, SubmissionResult JSON) of a stored submission, rendered once and
+    kept in the result cache. `score` spares a lookup when the caller has it.
+    """
+    cached = result_cache.get(submission_id)
+    if cached is not None:
+        return cached
+
+    generation = result_cache.generation
+    if score is None:
+        score = db.query(Submission.score).filter(Submission.id == submission_id).scalar()
+    answers = load_answers(db, submission_id)
 
-    db.commit()  # Commit the changes
+    # Not in the tables any more: its month may have been archived
+    if score is None or not answers:
+        archived = find_archived_submission(db.connection(), submission_id)
+        if archived is not None:
+            score, selected = archived
+            correct = dict(db.query(Question.id, Question.correct_answer).filter(
+                Question.id.in_([question_id for question_id, _ in selected])
+            ).all())
+            answers = [
+                {"question_id": question_id, "selected_answer": answer, "correct_answer": correct.get(question_id)}
+                for question_id, answer in selected
+            ]
+
+    # Render the submission result with the score and answers once
+    body = json_dumps({
+        "score": score,
+        "answers": answers,
+    })
+    rendered = (make_etag(body), body)
+    result_cache.put(submission_id, rendered, generation)
+    return rendered
+
+# ------------------- Replaying a retried submission -------------------
+def submission_fingerprint(quiz_id: int, answers: Dict[int, str]) -> str:
+    """
+    Hash of what a submission asks to store, to tell a retry from a reused key.
+    """
+    payload = json.dumps([quiz_id, sorted(answers.items())], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def idempotency_conflict() -> HTTPException:
+    return HTTPException(status_code=422, detail="Idempotency-Key was already used for a different submission")
+
+def attempts_exhausted(error: AttemptsExhausted) -> HTTPException:
+    return HTTPException(status_code=409, detail=str(error))
+
+def replay_submission(
+    db: Session, user_id: int, key: str, fingerprint: str, submission: SubmissionCreate
+) -> Optional[Response]:
+    """
+    Response of an earlier request of the user with the same Idempotency-Key,
+    or None if there was none.
+    - Recent keys are answered from the idempotency cache: the stored result
+      (from the result cache) or, for a queued submission, its ticket.
+    - Otherwise the (user_id, idempotency_key) index is looked up and the
+      stored answers are compared with the request.
+    Responses carry `Idempotent-Replayed: true`; a key reused for other answers raises 422.
+    """
+    headers = {"Idempotent-Replayed": "true"}
+    cached = idempotency_cache.get((user_id, key))
+    if cached is not None:
+        cached_fingerprint, submission_id, ticket = cached
+        if cached_fingerprint != fingerprint:
+            raise idempotency_conflict()
+        if submission_id is None:
+            state = submission_queue.status(ticket)
+            status = state["status"] if state is not None else "queued"
+            return ORJSONResponse(status_code=202, content={"ticket": ticket, "status": status}, headers=headers)
+        _, body = render_result(db, submission_id)
+        return Response(body, media_type="application/json", headers=headers)
+
+    stored = db.query(Submission.id, Submission.quiz_id, Submission.score).filter(
+        Submission.user_id == user_id,
+        Submission.idempotency_key == key
+    ).first()
+    if stored is None:
+        return None
 
-    return SubmissionResult(score=score, answers=answers_list)
+    answers = load_answers(db, stored.id)
+    selected = {answer["question_id"]: answer["selected_answer"] for answer in answers}
+    if stored.quiz_id != submission.quiz_id or selected != submission.answers:
+        raise idempotency_conflict()
+
+    generation = result_cache.generation
+    body = json_dumps({"score": stored.score, "answers": answers})
+    result_cache.put(stored.id, (make_etag(body), body), generation)
+    idempotency_cache.put((user_id, key), (fingerprint, stored.id, None), idempotency_cache.generation)
+    return Response(body, media_type="application/json", headers=headers)
 
 # ------------------- Get quiz result -------------------
 @router.get("/result/{quiz_id}", response_model=SubmissionResult)
-def get_result(
-    quiz_id: int, 
-    db: Session = Depends(get_db), 
+async def get_result(
+    quiz_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
     current_user: dict = Depends(get_current_participant)
 ):
     """
     Retrieve quiz results for the participant.
-    - Fetches the participant's submission for the given quiz.
-    - Retrieves the selected and correct answers.
+    - Reports the attempt chosen by the quiz's attempt_policy: the latest
+      submission, or the best one (highest score, earliest on ties, as on the
+      leaderboard).
+    - Retrieves the selected and correct answers with one joined query (two
+      for packed submissions on a quiz cache miss, see load_answers).
+    - The rendered result is cached and carries an ETag; re-polling with
+      If-None-Match returns 304 without a body.
+    - On a replica that has no submission yet, the read is retried on the primary.
     """
-    # Fetch the submission for the quiz and the current user
-    submission = db.query(Submission).filter(
-        Submission.quiz_id == quiz_id, 
-        Submission.user_id == current_user["id"]
-    ).first()
+    def load(db: Session):
+        quiz = quiz_cache.get_quiz(db, quiz_id)
+        if not quiz:
+            raise HTTPException(status_code=404, detail="Quiz not found")
 
-    if not submission:
-        raise HTTPException(status_code=404, detail="No submission found")
-
-    # Fetch all answers for this submission
-    answers = db.query(SubmissionAnswer).filter(SubmissionAnswer.submission_id == submission.id).all()
-    result_answers = []
-
-    # Retrieve correct answers for each question
-    for answer in answers:
-        question = db.query(Question).filter(Question.id == answer.question_id).first()
-        result_answers.append(
-            AnswerResult(
-                question_id=answer.question_id,
-                selected_answer=answer.selected_answer,
-                correct_answer=question.correct_answer
-            )
-        )
+        if quiz.attempt_policy == "best":
+            # Best attempt, tracked by the leaderboard
+            submission = db.query(LeaderboardEntry.submission_id, LeaderboardEntry.best_score).filter(
+                LeaderboardEntry.quiz_id == quiz_id,
+                LeaderboardEntry.user_id == current_user["id"]
+            ).first()
+        else:
+            # Latest attempt
+            submission = db.query(Submission.id, Submission.score).filter(
+                Submission.quiz_id == quiz_id,
+                Submission.user_id == current_user["id"]
+            ).order_by(Submission.id.desc()).first()
+            if not submission:
+                # Archived months are older than any stored submission: only look there when nothing is stored
+                submission = latest_archived_submission(db.connection(), quiz_id, current_user["id"])
+
+        if not submission:
+            raise HTTPException(status_code=404, detail="No submission found")
+
+        submission_id, score = submission
+        return render_result(db, submission_id, score)
+
+    etag, body = await read_or_primary(session, load)
+    return cached_json_response(request, body, etag)
+
+# ------------------- Quiz leaderboard -------------------
+@router.get("/leaderboard/{quiz_id}", response_model=LeaderboardOut)
+async def get_quiz_leaderboard(
+    quiz_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(get_current_participant)
+):
+    """
+    Top participants of a quiz by best score, plus the caller's own best score
+    and percentile rank.
+    - Read from the leaderboard and score-count aggregates maintained on submit,
+      so the cost does not grow with the number of submissions.
+    """
+    def load(db: Session):
+        if db.get(Quiz, quiz_id) is None:
+            raise HTTPException(status_code=404, detail="Quiz not found")
+        return get_leaderboard(db, quiz_id, current_user["id"], limit)
+
+    return await session.run_sync(load)
+
+# ------------------- Status of a queued submission -------------------
+@router.get("/submissions/{ticket}", response_model=SubmissionTicket)
+async def get_submission_status(
+    ticket: str,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(get_current_participant)
+):
+    """
+    Poll a ticket returned by POST /participant/submit in queue mode.
+    - `queued`: accepted, not stored yet.
+    - `stored`: stored; the score and answers are included.
+    - `failed`: the submission could not be stored (see `detail`).
+    Tickets unknown to this worker process are looked up in the database;
+    a genuine ticket of the caller found in neither table is still `queued`
+    (accepted by another worker) for INGEST_TICKET_WINDOW seconds.
+    """
+    state = submission_queue.status(ticket)
+    if state is not None and state["user_id"] != current_user["id"]:
+        state = None  # Someone else's ticket: same answer as an unknown one
+    if state is not None and state["status"] != "stored":
+        return {"ticket": ticket, "status": state["status"], "detail": state.get("detail")}
+
+    def load(db: Session):
+        submission = db.query(Submission.id, Submission.score).filter(
+            Submission.ticket == ticket,
+            Submission.user_id == current_user["id"]
+        ).first()
+
+        if not submission:
+            failure = db.query(FailedSubmission.detail).filter(
+                FailedSubmission.ticket == ticket,
+                FailedSubmission.user_id == current_user["id"]
+            ).first()
+            if failure:
+                return {"ticket": ticket, "status": "failed", "detail": failure.detail}
+            if queued_recently(ticket, current_user["id"]):
+                return {"ticket": ticket, "status": "queued"}
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+        return {
+            "ticket": ticket,
+            "status": "stored",
+            "submission_id": submission.id,
+            "score": submission.score,
+            "answers": load_answers(db, submission.id),
+        }
 
-    # Return the submission result with the score and answers
-    return SubmissionResult(score=submission.score, answers=result_answers)
+    return await read_or_primary(session, load)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List
 
 # Schema for creating a new question
 class QuestionCreate(BaseModel):
@@ -17,5 +17,14 @@ class QuestionOut(BaseModel):
     quiz_id: int  # The ID of the quiz this question is part of
 
     # Configuration for ORM compatibility
-    class Config:
-        orm_mode = True  # Enables compatibility with ORM models (e.g., SQLAlchemy)
+    model_config = ConfigDict(from_attributes=True)  # Enables compatibility with ORM models (e.g., SQLAlchemy)
+
+# Errors of one rejected row of a bulk import
+class QuestionImportError(BaseModel):
+    row: int  # 1-based row number in the payload (CSV: after the header)
+    errors: List[str]  # What is wrong with the row
+
+# Schema for the result of a bulk question import
+class QuestionImportResult(BaseModel):
+    imported: int  # Number of questions inserted
+    errors: List[QuestionImportError]  # Rejected rows (empty if everything was valid)
@@ -1,11 +1,13 @@
 
-from pydantic import BaseModel
-from typing import List, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Dict, Literal, Optional
 
 # Schema for creating a new quiz
 class QuizCreate(BaseModel):
     title: str  # Title of the quiz
     description: str  # Brief description of the quiz
+    max_attempts: Optional[int] = Field(None, ge=1)  # Submissions allowed per participant (None = unlimited)
+    attempt_policy: Literal["latest", "best"] = "latest"  # Attempt reported as the participant's result
 
 # Schema for questions as seen by participants (hides the correct answer)
 class QuestionParticipant(BaseModel):
@@ -14,14 +16,30 @@ class QuestionParticipant(BaseModel):
     options: Dict[str, str]  # Dictionary containing answer choices (e.g., {"A": "Option A", "B": "Option B"})
     quiz_id: int  # The ID of the quiz to which this question belongs
 
+    # Read attributes of ORM objects and cached snapshots
+    model_config = ConfigDict(from_attributes=True)
+
+# Schema for the summary-only quiz listing (no questions)
+class QuizSummary(BaseModel):
+    id: int  # Unique ID of the quiz
+    title: str  # Title of the quiz
+    description: str  # Description of the quiz
+    created_by: int  # ID of the user who created the quiz
+    question_count: int  # Number of questions in the quiz
+    max_attempts: Optional[int] = None  # Submissions allowed per participant (None = unlimited)
+    attempt_policy: str = "latest"  # Attempt reported as the result: "latest" or "best"
+
+    model_config = ConfigDict(from_attributes=True)
+
 # Schema for returning quiz details (includes questions)
 class QuizOut(BaseModel):
     id: int  # Unique ID of the quiz
     title: str  # Title of the quiz
     description: str  # Description of the quiz
     created_by: int  # ID of the user who created the quiz
+    max_attempts: Optional[int] = None  # Submissions allowed per participant (None = unlimited)
+    attempt_policy: str = "latest"  # Attempt reported as the result: "latest" or "best"
     questions: List[QuestionParticipant] = []  # List of questions in the quiz
 
-    # ORM mode enables Pydantic to work with ORM models like SQLAlchemy
-    class Config:
-        orm_mode = True
+    # Read attributes of ORM objects like SQLAlchemy models (Pydantic v2 `from_attributes`)
+    model_config = ConfigDict(from_attributes=True)
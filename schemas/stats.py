@@ -0,0 +1,44 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+# One bucket of the score histogram (min_score inclusive, max_score exclusive except for 100)
+class ScoreBucket(BaseModel):
+    min_score: float  # Lower bound of the bucket (percentage)
+    max_score: float  # Upper bound of the bucket (percentage)
+    submissions: int  # Submissions scoring within the bucket
+
+# How a single question was answered across all submissions
+class QuestionStatsOut(BaseModel):
+    question_id: int  # The ID of the question
+    answered: int  # Submissions that answered it
+    correct: int  # Submissions that answered it correctly
+    correct_rate: Optional[float]  # correct / answered (None before the first submission)
+
+# Schema for the admin statistics of a quiz
+class QuizStatsOut(BaseModel):
+    quiz_id: int  # The ID of the quiz
+    submissions: int  # Number of submissions
+    participants: int  # Distinct users who submitted
+    mean_score: Optional[float]  # Mean score over all submissions (None if there are none)
+    histogram: List[ScoreBucket]  # Score distribution in 10-point buckets
+    questions: List[QuestionStatsOut]  # Per-question correctness, in question order
+
+# One row of the leaderboard
+class LeaderboardRow(BaseModel):
+    rank: int  # Position on the leaderboard (1 = best)
+    user_id: int  # The ID of the participant
+    username: str  # The participant's username
+    best_score: float  # Best score of the participant
+    achieved_at: datetime  # When the best score was first achieved
+
+# The current participant's standing
+class LeaderboardMe(BaseModel):
+    best_score: float  # Best score of the participant
+    percentile_rank: Optional[float]  # Share of participants with a lower best score (percentage)
+
+# Schema for the leaderboard of a quiz
+class LeaderboardOut(BaseModel):
+    quiz_id: int  # The ID of the quiz
+    top: List[LeaderboardRow]  # Top participants by best score
+    me: Optional[LeaderboardMe] = None  # The caller's standing (None if they have not submitted)
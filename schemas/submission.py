@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Dict, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class SubmissionCreate(BaseModel):
@@ -10,7 +10,7 @@ class SubmissionCreate(BaseModel):
     answers: Dict[int, str] = Field(
         ..., 
         description="A dictionary mapping question IDs to selected option letters (e.g., 'A', 'B', 'C', 'D')",
-        example={1: "Correct Option", 2: "A"}  # Showing question ID: option
+        examples=[{1: "A", 2: "C"}]  # Showing question ID: option
     )
 
 class SubmissionOut(BaseModel):
@@ -22,8 +22,7 @@ class SubmissionOut(BaseModel):
     score: float  # The calculated score of the submission
     submitted_at: datetime  # Timestamp of when the submission was made
 
-    class Config:
-        orm_mode = True  # Enables ORM support for compatibility with database models
+    model_config = ConfigDict(from_attributes=True)  # Enables ORM support for compatibility with database models
 
 class AnswerResult(BaseModel):
     """
@@ -39,3 +38,14 @@ class SubmissionResult(BaseModel):
     """
     score: float  # Final score obtained by the user
     answers: List[AnswerResult]  # List of question-wise answer results
+
+class SubmissionTicket(BaseModel):
+    """
+    Model to represent the state of a submission accepted by the ingestion queue.
+    """
+    ticket: str  # Ticket returned when the submission was accepted
+    status: str  # "queued", "stored" or "failed"
+    submission_id: Optional[int] = None  # ID of the stored submission
+    score: Optional[float] = None  # Score, once stored
+    answers: Optional[List[AnswerResult]] = None  # Question-wise results, once stored
+    detail: Optional[str] = None  # Why the submission failed
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from enum import Enum
 
 class Role(str, Enum):
@@ -24,8 +24,7 @@ class UserOut(BaseModel):
     username: str  # Username of the user
     role: Role  # Role assigned to the user
 
-    class Config:
-        orm_mode = True  # Allows Pydantic to work with ORM objects like SQLAlchemy models
+    model_config = ConfigDict(from_attributes=True)  # Allows Pydantic to work with ORM objects like SQLAlchemy models
 
 class Token(BaseModel):
     """
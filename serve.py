@@ -0,0 +1,143 @@
+"""
+Production launcher: imports the app once in a master process, then forks
+WEB_CONCURRENCY uvicorn workers that share one listening socket.
+
+Preloading means the imports (FastAPI, SQLAlchemy, drivers, routes) are paid
+once and shared copy-on-write instead of once per worker, so workers start in
+milliseconds. Each worker then runs the app's lifespan on its own: schema
+check (DB_SCHEMA_CHECK), submission writer (with its own INGEST_JOURNAL
+file, suffixed with the worker index), and its own connection pools.
+Workers that die are replaced; SIGTERM/SIGINT stop all of them gracefully.
+
+    python serve.py --host 0.0.0.0 --port 8000 --workers 4
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+logger = logging.getLogger("serve")
+
+# Worker processes (defaults to one per CPU)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+
+
+def run_worker(app, sock: socket.socket, args) -> bool:
+    """
+    Body of a forked worker: serve the preloaded app on the shared socket.
+    Returns False if the app failed to start (e.g. DB_SCHEMA_CHECK=strict).
+    """
+    # Forget the master's signal handlers; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Never reuse pooled connections inherited from the master
+    from database import engine, async_engine
+    from utils.replicas import replica_router
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+    replica_router.dispose(close=False)
+
+    config = uvicorn.Config(
+        app,
+        lifespan="on",
+        log_level=args.log_level,
+        proxy_headers=args.proxy_headers,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return server.started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--keep-alive", type=int, default=5, help="Seconds an idle keep-alive connection is kept")
+    parser.add_argument("--graceful-timeout", type=int, default=30, help="Seconds workers get to finish on shutdown")
+    parser.add_argument("--proxy-headers", action="store_true", help="Trust X-Forwarded-* from --forwarded-allow-ips")
+    parser.add_argument("--forwarded-allow-ips", default="127.0.0.1")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    logger.setLevel(args.log_level.upper())
+
+    # Bind before forking so every worker accepts on the same socket
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    # Give each worker its share of the CPUs for bcrypt; utils/hashing.py reads this on import
+    os.environ.setdefault("HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // max(args.workers, 1))))
+
+    started = time.perf_counter()
+    from main import app  # Preload: import once, share with the workers
+    logger.info("App imported in %.0fms", (time.perf_counter() - started) * 1000)
+    gc.freeze()  # Keep preloaded objects out of the collector so they stay shared after fork
+
+    workers = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            # Stable per-slot identity: a replacement worker takes over its predecessor's ingest journal
+            os.environ["SERVE_WORKER_INDEX"] = str(index)
+            code = 1
+            try:
+                code = 0 if run_worker(app, sock, args) else 3
+            finally:
+                os._exit(code)
+        workers[pid] = (index, time.monotonic())
+        logger.info("Started worker %d (index %d)", pid, index)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(args.workers):
+        spawn(index)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker = workers.pop(pid, None)
+        if worker is None or stopping:
+            continue
+        index, started_at = worker
+        logger.warning("Worker %d exited with status %d; restarting", pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - started_at < 1:
+            time.sleep(1)  # Do not spin when workers crash on startup
+        spawn(index)
+
+    sock.close()
+    logger.info("Stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Shared fixtures of the test suite.
+
+Tests drive the routers in-process through FastAPI's TestClient, like the
+benchmarks (see benchmarks/common.py), against a throwaway SQLite file.
+Tests marked `postgres` run against TEST_POSTGRES_URL, an empty PostgreSQL
+database that is migrated with Alembic (and wiped), and are skipped without it:
+
+    python -m pytest
+    TEST_POSTGRES_URL=postgresql://postgres@localhost/quiz_test python -m pytest
+"""
+import argparse
+import os
+import tempfile
+
+# Set before the app modules are imported: they read their settings on import
+TEST_DIR = tempfile.mkdtemp(prefix="quiz-api-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{TEST_DIR}/app.db",  # Never the application database
+    DB_MODE="sync",
+    DB_SCHEMA_CHECK="off",
+    HASH_WORKERS="0",  # bcrypt in the threadpool: no worker processes per test
+    BCRYPT_ROUNDS="4",
+    CACHE_SHARED_PATH=os.path.join(TEST_DIR, "cache"),
+    RATE_LIMIT_SHARED_PATH=os.path.join(TEST_DIR, "ratelimit"),
+    ARCHIVE_DIR=os.path.join(TEST_DIR, "archive"),
+    PARTITION_MAINTENANCE="off",
+)
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL", "")
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, select, text, update
+
+from benchmarks.common import make_client, make_engine, seed
+from models.question import Question
+from models.user import User
+from routes import admin, auth, participant
+from utils import ratelimit
+from utils.cache import idempotency_cache, quiz_cache, result_cache
+from utils.security import get_password_hash, token_cache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_collection_modifyitems(config, items):
+    if TEST_POSTGRES_URL:
+        return
+    skip = pytest.mark.skip(reason="set TEST_POSTGRES_URL to run the PostgreSQL tests")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """
+    Module-level caches and rate limits outlive a test; every test starts empty
+    (IDs repeat from one test database to the next).
+    """
+    quiz_cache.clear()
+    result_cache.invalidate()
+    idempotency_cache.invalidate()
+    token_cache.clear()
+    monkeypatch.setattr(ratelimit, "rate_limiter", ratelimit.RateLimiter(ratelimit.MemoryBuckets()))
+    yield
+
+
+@pytest.fixture
+def engine():
+    engine = make_engine(f"sqlite:///{TEST_DIR}/test.db")
+    yield engine
+    engine.dispose()
+
+
+def migrate(url: str, revision: str = "head", downgrade: bool = False):
+    """
+    Run the Alembic migrations against `url` (as `alembic -x url=... upgrade`).
+    """
+    config = Config()  # Not alembic.ini: its logging setup would replace pytest's
+    config.set_main_option("script_location", os.path.join(REPO_ROOT, "migrations"))
+    config.cmd_opts = argparse.Namespace(x=[f"url={url}"])
+    (command.downgrade if downgrade else command.upgrade)(config, revision)
+
+
+@pytest.fixture
+def postgres_engine():
+    """
+    TEST_POSTGRES_URL wiped and migrated to head (partitioned submissions).
+    """
+    engine = create_engine(TEST_POSTGRES_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    migrate(TEST_POSTGRES_URL)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def ids(engine) -> dict:
+    """
+    One admin (ID 1), three participants (2-4), three quizzes of three questions.
+    """
+    return seed(engine, users=4, quizzes=3, questions_per_quiz=3)
+
+
+@pytest.fixture
+def clients(engine, ids):
+    """
+    clients(user_id, role="participant"): a client authenticated as that user
+    (the JWT dependencies are replaced); closed after the test.
+    """
+    opened = []
+
+    def open_client(user_id: int, role: str = "participant"):
+        client = make_client(
+            engine, [participant.router, admin.router],
+            current_user={"id": user_id, "username": f"user{user_id}", "role": role},
+        )
+        opened.append(client)
+        return client
+
+    yield open_client
+    for client in opened:
+        client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def participant_client(clients):
+    return clients(2)
+
+
+@pytest.fixture
+def admin_client(clients):
+    return clients(1, "admin")
+
+
+@pytest.fixture
+def passwords(engine, ids) -> dict:
+    """
+    Real password hashes for the participants: {username: password}.
+    """
+    passwords = {f"user{user_id}": f"password-{user_id}" for user_id in ids["participant_ids"]}
+    with engine.begin() as conn:
+        for username, password in passwords.items():
+            conn.execute(update(User).where(User.username == username).values(hashed_password=get_password_hash(password)))
+    return passwords
+
+
+@pytest.fixture
+def auth_client(engine):
+    """
+    Client with the real JWT dependencies (auth and participant routes).
+    """
+    client = make_client(engine, [auth.router, participant.router])
+    yield client
+    client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def answer_key(engine):
+    """
+    answer_key(quiz_id) -> {question_id: correct option}.
+    """
+    def load(quiz_id: int) -> dict:
+        with engine.connect() as conn:
+            return dict(conn.execute(
+                select(Question.id, Question.correct_answer).where(Question.quiz_id == quiz_id).order_by(Question.id)
+            ).all())
+    return load
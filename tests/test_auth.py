@@ -0,0 +1,120 @@
+"""
+Registration and login, password rehashing, and JWT verification with
+key rotation (JWT_KEYS / JWT_ACTIVE_KID) on both backends.
+"""
+from datetime import timedelta
+
+import jwt as pyjwt
+import pytest
+from jose import jwt as jose_jwt
+from passlib.context import CryptContext
+from sqlalchemy import select, update
+
+from models.user import User
+from utils import security
+from utils.security import create_access_token
+
+
+# HMAC keys as long as the SHA-256 digest (PyJWT warns about shorter ones)
+FIRST_KEY = "first-signing-key-".ljust(32, "1")
+SECOND_KEY = "second-signing-key-".ljust(32, "2")
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def quizzes(client, token: str) -> int:
+    return client.get("/participant/quizzes", headers=bearer(token)).status_code
+
+
+@pytest.fixture(params=["jose", "pyjwt"])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(security, "JWT_BACKEND", request.param)
+    if request.param == "pyjwt":
+        monkeypatch.setattr(security, "pyjwt", pyjwt, raising=False)
+        monkeypatch.setattr(security, "TOKEN_ERRORS", (pyjwt.PyJWTError, KeyError))
+    return request.param
+
+
+@pytest.fixture
+def keys(monkeypatch):
+    """
+    keys(active, **secrets): reconfigure the signing keys as a deploy would.
+    """
+    def configure(active: str, **secrets):
+        monkeypatch.setattr(security, "JWT_KEYS", secrets)
+        monkeypatch.setattr(security, "JWT_ACTIVE_KID", active)
+    return configure
+
+
+def token_for(user_id: int = 2, minutes: int = 5) -> str:
+    return create_access_token(f"user{user_id}", user_id, "participant", timedelta(minutes=minutes))
+
+
+def test_register_and_login(ids, auth_client):
+    registered = auth_client.post("/auth/register", json={"username": "newbie", "password": "pw-123", "role": "participant"})
+    assert registered.status_code == 200
+    assert auth_client.post("/auth/register", json={"username": "newbie", "password": "x", "role": "participant"}).status_code == 400
+
+    assert auth_client.post("/auth/token", data={"username": "newbie", "password": "nope"}).status_code == 401
+    login = auth_client.post("/auth/token", data={"username": "newbie", "password": "pw-123"})
+    assert login.status_code == 200
+    assert quizzes(auth_client, login.json()["access_token"]) == 200
+
+
+def test_login_rehashes_outdated_passwords(engine, ids, auth_client):
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("pw")
+    with engine.begin() as conn:
+        conn.execute(update(User).where(User.id == 2).values(hashed_password=old_hash))
+    assert auth_client.post("/auth/token", data={"username": "user2", "password": "pw"}).status_code == 200
+    with engine.connect() as conn:
+        new_hash = conn.execute(select(User.hashed_password).where(User.id == 2)).scalar()
+    assert new_hash != old_hash
+    assert new_hash.startswith(f"$2b$0{security.BCRYPT_ROUNDS}$")
+
+
+def test_key_rotation(ids, auth_client, keys, backend):
+    keys("old", old=FIRST_KEY)
+    old_token = token_for()
+    assert quizzes(auth_client, old_token) == 200  # Now in the token cache
+
+    # Step 1: add the new key and sign with it; tokens of the old key stay valid
+    keys("new", old=FIRST_KEY, new=SECOND_KEY)
+    new_token = token_for()
+    assert jose_jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert quizzes(auth_client, old_token) == 200
+    assert quizzes(auth_client, new_token) == 200
+
+    # Step 2: drop the old key; its tokens are refused, cached or not
+    keys("new", new=SECOND_KEY)
+    assert quizzes(auth_client, old_token) == 401
+    assert quizzes(auth_client, new_token) == 200
+
+
+def test_invalid_tokens_are_refused(ids, auth_client, keys, backend):
+    keys("k1", k1=FIRST_KEY)
+    valid = token_for()
+    header, payload, signature = valid.split(".")
+    tampered = ".".join([header, payload, signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")])
+    unknown_kid = jose_jwt.encode({"sub": "user2", "id": 2, "role": "participant", "exp": 4102444800}, FIRST_KEY,
+                                  algorithm="HS256", headers={"kid": "gone"})
+    without_exp = jose_jwt.encode({"sub": "user2", "id": 2, "role": "participant"}, FIRST_KEY,
+                                  algorithm="HS256", headers={"kid": "k1"})
+
+    assert quizzes(auth_client, valid) == 200
+    assert quizzes(auth_client, tampered) == 401
+    assert quizzes(auth_client, unknown_kid) == 401
+    assert quizzes(auth_client, without_exp) == 401
+    assert quizzes(auth_client, token_for(minutes=-1)) == 401
+
+
+def test_token_without_kid_uses_the_active_key(ids, auth_client, keys, backend):
+    keys("k1", k1=FIRST_KEY)
+    legacy = jose_jwt.encode({"sub": "user2", "id": 2, "role": "participant", "exp": 4102444800}, FIRST_KEY, algorithm="HS256")
+    assert quizzes(auth_client, legacy) == 200
+
+
+def test_admin_token_cannot_use_participant_routes(ids, auth_client):
+    admin = create_access_token("user1", 1, "admin", timedelta(minutes=5))
+    assert quizzes(auth_client, admin) == 403
@@ -0,0 +1,82 @@
+"""
+Quiz and result caches: invalidation on admin writes, across worker
+processes (shared counters), and the generation guard against stale loads.
+"""
+import os
+import subprocess
+import sys
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models.question import Question
+from utils.cache import LRUCache, quiz_cache, result_cache
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def in_other_process(code: str):
+    # A fresh interpreter with the same settings (CACHE_SHARED_PATH), like another worker
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=os.environ, check=True)
+
+
+def rename_questions(engine, quiz_id: int, statement: str):
+    # Behind the caches' back, as a write by another worker process
+    with engine.begin() as conn:
+        conn.execute(update(Question).where(Question.quiz_id == quiz_id).values(statement=statement))
+
+
+def statements(engine, quiz_id: int) -> set:
+    with Session(engine) as db:
+        return {question.statement for question in quiz_cache.get_quiz(db, quiz_id).questions}
+
+
+def test_invalidation_reaches_other_processes(engine, ids):
+    statements(engine, 1), statements(engine, 2)
+    rename_questions(engine, 1, "Changed")
+    rename_questions(engine, 2, "Changed")
+    assert "Changed" not in statements(engine, 1)  # Served from the cache
+
+    in_other_process("from utils.cache import quiz_cache; quiz_cache.invalidate_quiz(1)")
+    assert statements(engine, 1) == {"Changed"}
+    assert "Changed" not in statements(engine, 2)  # Only quiz 1 was dropped
+
+
+def test_result_cache_is_dropped_everywhere(ids):
+    result_cache.put(1, ("etag", b"{}"), result_cache.generation)
+    assert result_cache.get(1) is not None
+    in_other_process("from utils.cache import result_cache; result_cache.invalidate()")
+    assert result_cache.get(1) is None
+
+
+def test_admin_edits_are_served_at_once(engine, admin_client, participant_client, answer_key):
+    before = participant_client.get("/participant/quizzes/1").json()
+    question_id = before["questions"][0]["id"]
+    response = admin_client.put(f"/admin/questions/{question_id}", json={
+        "statement": "Edited", "options": before["questions"][0]["options"],
+        "correct_answer": answer_key(1)[question_id], "quiz_id": 1,
+    })
+    assert response.status_code == 200
+    after = participant_client.get("/participant/quizzes/1").json()
+    assert after["questions"][0]["statement"] == "Edited"
+    listed = participant_client.get("/participant/quizzes").json()
+    assert listed[0]["questions"][0]["statement"] == "Edited"
+
+
+def test_value_loaded_before_an_invalidation_is_not_cached():
+    cache = LRUCache(10, 60, "test_values")
+    generation = cache.generation_of("k")
+    cache.invalidate("k")  # A write lands while "k" is being loaded
+    assert not cache.put("k", "stale", generation)
+    assert cache.get("k") is None
+    assert cache.put("k", "fresh", cache.generation_of("k"))
+    assert cache.get("k") == "fresh"
+
+
+def test_key_invalidation_leaves_other_keys():
+    cache = LRUCache(10, 60, "test_keys")
+    for key in ("a", "b"):
+        cache.put(key, key, cache.generation_of(key))
+    in_other_process("from utils.cache import LRUCache; LRUCache(10, 60, 'test_keys').invalidate('a')")
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
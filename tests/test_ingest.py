@@ -0,0 +1,176 @@
+"""
+SUBMIT_MODE=queue: tickets, their status from any worker process, failed
+tickets, and the journal (replay and compaction).
+"""
+import fcntl
+import json
+import time
+from dataclasses import asdict
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from models.failed_submission import FailedSubmission
+from models.submission import Submission
+from routes import participant
+from utils import ingest
+from utils.ingest import PendingSubmission, SubmissionQueue, new_ticket, queued_recently
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+@pytest.fixture
+def queue(monkeypatch, tmp_path, participant_client, session_factory):
+    """
+    A started queue (journaled in tmp_path) serving POST /participant/submit.
+    Its writer runs on the event loop of participant_client, so only that
+    client submits.
+    """
+    queue = SubmissionQueue(max_wait_ms=1, journal_path=str(tmp_path / "journal"))
+    monkeypatch.setattr(participant, "SUBMIT_MODE", "queue")
+    monkeypatch.setattr(participant, "submission_queue", queue)
+    participant_client.portal.call(queue.start, session_factory)
+    yield queue
+    participant_client.portal.call(queue.stop)
+
+
+def other_worker(monkeypatch):
+    # A process that never saw the tickets: its queue knows nothing
+    monkeypatch.setattr(participant, "submission_queue", SubmissionQueue(journal_path=""))
+
+
+def wait_for(client, ticket: str, timeout: float = 5) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        state = client.get(f"/participant/submissions/{ticket}").json()
+        if state["status"] != "queued" or time.monotonic() > deadline:
+            return state
+        time.sleep(0.01)
+
+
+def test_submission_is_acknowledged_then_stored(engine, queue, participant_client, answer_key):
+    response = participant_client.post("/participant/submit", json={"quiz_id": 1, "answers": answer_key(1)})
+    assert response.status_code == 202
+    ticket = response.json()["ticket"]
+
+    state = wait_for(participant_client, ticket)
+    assert state["status"] == "stored"
+    assert state["score"] == 100.0
+    with engine.connect() as conn:
+        assert conn.execute(select(Submission.user_id).where(Submission.ticket == ticket)).scalar() == 2
+    assert participant_client.get("/participant/result/1").json()["score"] == 100.0
+
+
+def test_status_from_another_worker(monkeypatch, queue, participant_client, clients, answer_key):
+    ticket = participant_client.post("/participant/submit", json={"quiz_id": 1, "answers": answer_key(1)}).json()["ticket"]
+    assert wait_for(participant_client, ticket)["status"] == "stored"
+
+    other_worker(monkeypatch)
+    assert participant_client.get(f"/participant/submissions/{ticket}").json()["status"] == "stored"
+    # Someone else's ticket is unknown to them
+    assert clients(3).get(f"/participant/submissions/{ticket}").status_code == 404
+
+
+def test_ticket_queued_on_another_worker_is_reported_queued(monkeypatch, participant_client, clients):
+    other_worker(monkeypatch)
+    ticket = new_ticket(2)  # Accepted by a worker whose writer has not stored it yet
+    assert participant_client.get(f"/participant/submissions/{ticket}").json()["status"] == "queued"
+    assert clients(3).get(f"/participant/submissions/{ticket}").status_code == 404
+    forged = ticket[:-1] + ("0" if ticket[-1] != "0" else "1")
+    assert participant_client.get(f"/participant/submissions/{forged}").status_code == 404
+
+
+def test_queued_window():
+    ticket = new_ticket(2)
+    assert queued_recently(ticket, 2)
+    assert not queued_recently(ticket, 3)
+    assert not queued_recently(ticket, 2, window=-1)
+    assert not queued_recently("not-a-ticket", 2)
+
+
+def test_failed_ticket_is_persisted(engine, monkeypatch, queue, participant_client, answer_key):
+    answers = list(answer_key(1).items())
+    tickets = [
+        participant_client.portal.call(queue.submit, 2, 1, 100.0, answers, [True] * 3, None, 1)
+        for _ in range(2)
+    ]
+    assert wait_for(participant_client, tickets[0])["status"] == "stored"
+    failed = wait_for(participant_client, tickets[1])
+    assert failed["status"] == "failed"
+    assert "attempts" in failed["detail"]
+
+    with engine.connect() as conn:
+        assert conn.execute(select(FailedSubmission.user_id).where(FailedSubmission.ticket == tickets[1])).scalar() == 2
+    other_worker(monkeypatch)
+    assert participant_client.get(f"/participant/submissions/{tickets[1]}").json() == failed
+
+
+def test_retry_with_same_key_gets_the_same_ticket(engine, queue, participant_client, answer_key):
+    body = {"quiz_id": 1, "answers": answer_key(1)}
+    first = participant_client.post("/participant/submit", json=body, headers={"Idempotency-Key": "q1"})
+    retry = participant_client.post("/participant/submit", json=body, headers={"Idempotency-Key": "q1"})
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json()["ticket"] == first.json()["ticket"]
+    wait_for(participant_client, first.json()["ticket"])
+    with engine.connect() as conn:
+        assert len(conn.execute(select(Submission.id).where(Submission.idempotency_key == "q1")).all()) == 1
+
+
+def test_full_queue_sheds_load(queue, participant_client, answer_key):
+    queue.max_pending = 0
+    response = participant_client.post("/participant/submit", json={"quiz_id": 1, "answers": answer_key(1)})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(queue.retry_after)
+
+
+# ------------------- Journal -------------------
+def job(ticket: str, quiz_id: int = 1, answers=()) -> PendingSubmission:
+    return PendingSubmission(
+        ticket=ticket, user_id=2, quiz_id=quiz_id, score=100.0, submitted_at="2026-01-01T00:00:00",
+        answers=list(answers), correct=[True] * len(answers),
+    )
+
+
+def test_journal_is_replayed_on_start(engine, ids, tmp_path, participant_client, session_factory, answer_key):
+    path = tmp_path / "journal"
+    answers = list(answer_key(1).items())
+    with open(path, "w") as journal:
+        for ticket in ("crashed-1", "crashed-2"):
+            journal.write(json.dumps(asdict(job(ticket, answers=answers))) + "\n")
+        journal.write('{"ticket": "torn')  # Last line of a crash
+
+    queue = SubmissionQueue(max_wait_ms=1, journal_path=str(path))
+    participant_client.portal.call(queue.start, session_factory)
+    participant_client.portal.call(queue.stop)
+    with engine.connect() as conn:
+        assert sorted(conn.execute(select(Submission.ticket)).scalars()) == ["crashed-1", "crashed-2"]
+    assert path.stat().st_size == 0
+
+
+def test_journal_is_compacted_to_what_is_pending(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_JOURNAL_COMPACT_BYTES", 1024)
+    path = tmp_path / "journal"
+    queue = SubmissionQueue(journal_path=str(path))
+    queue._journal = open(path, "a+", encoding="utf-8")
+    fcntl.flock(queue._journal.fileno(), fcntl.LOCK_EX)
+    for i in range(100):
+        queue.pending[f"t{i}"] = job(f"t{i}")
+        queue._append(queue._journal_line(queue.pending[f"t{i}"]))
+    for i in range(90):  # Stored meanwhile
+        del queue.pending[f"t{i}"]
+
+    assert queue._journal_needs_compaction()
+    queue._compact_journal()
+    assert [json.loads(line)["ticket"] for line in open(path)] == [f"t{i}" for i in range(90, 100)]
+    assert not queue._journal_needs_compaction()  # Waits for the journal to double again
+
+    # Still locked against adoption by another process, and appended to
+    with open(path, "r+") as other, pytest.raises(BlockingIOError):
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    queue._append(queue._journal_line(job("t100")))
+    assert json.loads(open(path).readlines()[-1])["ticket"] == "t100"
+    queue._journal.close()
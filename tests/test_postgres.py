@@ -0,0 +1,115 @@
+"""
+PostgreSQL with partitioned submissions (migration 0007): archived months
+stay readable, and an Idempotency-Key holds across partitions and writers.
+Skipped without TEST_POSTGRES_URL.
+"""
+import json
+import threading
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from benchmarks.common import make_client, seed
+from models.question import Question
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from routes import admin, participant
+from utils.archive import archive_partitions
+from utils.partitions import DuplicateSubmission, create_partitions, list_partitions
+
+pytestmark = pytest.mark.postgres
+
+OLD_MONTH = date(2024, 1, 1)
+OLD_SUBMITTED_AT = datetime(2024, 1, 15, 12, 0)
+
+
+@pytest.fixture
+def pg_ids(postgres_engine) -> dict:
+    return seed(postgres_engine, users=4, quizzes=2, questions_per_quiz=3)
+
+
+@pytest.fixture
+def pg_clients(postgres_engine, pg_ids):
+    opened = []
+
+    def open_client(user_id: int, role: str = "participant"):
+        client = make_client(
+            postgres_engine, [participant.router, admin.router],
+            current_user={"id": user_id, "username": f"user{user_id}", "role": role},
+        )
+        opened.append(client)
+        return client
+
+    yield open_client
+    for client in opened:
+        client.__exit__(None, None, None)
+
+
+def store_old_submission(engine, submission_id: int, user_id: int, quiz_id: int, idempotency_key: str = None) -> dict:
+    # A submission of OLD_MONTH, as if stored back then; returns its answers
+    with engine.begin() as conn:
+        question_ids = conn.execute(select(Question.id).where(Question.quiz_id == quiz_id).order_by(Question.id)).scalars().all()
+        conn.execute(insert(Submission).values(
+            id=submission_id, user_id=user_id, quiz_id=quiz_id, score=50.0,
+            submitted_at=OLD_SUBMITTED_AT, idempotency_key=idempotency_key,
+        ))
+        conn.execute(insert(SubmissionAnswer), [
+            {"submission_id": submission_id, "question_id": question_id, "selected_answer": "A", "submitted_at": OLD_SUBMITTED_AT}
+            for question_id in question_ids
+        ])
+        if OLD_MONTH not in list_partitions(conn):
+            create_partitions(conn, OLD_MONTH)  # Moves the rows out of the DEFAULT partition
+    return {question_id: "A" for question_id in question_ids}
+
+
+def test_archived_submission_is_still_served(postgres_engine, pg_clients):
+    answers = store_old_submission(postgres_engine, 1000, user_id=2, quiz_id=1)
+    archived = archive_partitions(postgres_engine, 1)
+    assert [entry["file"] for entry in archived] == ["submissions_2024_01.parquet"]
+    with postgres_engine.connect() as conn:
+        assert OLD_MONTH not in list_partitions(conn)
+        assert conn.execute(select(func.count()).select_from(Submission)).scalar() == 0
+
+    result = pg_clients(2).get("/participant/result/1")
+    assert result.status_code == 200
+    assert result.json()["score"] == 50.0
+    assert {answer["question_id"]: answer["selected_answer"] for answer in result.json()["answers"]} == answers
+
+    export = pg_clients(1, "admin").get("/admin/export/submissions", params={"format": "ndjson"})
+    rows = [json.loads(line) for line in export.text.splitlines()]
+    assert {row["submission_id"] for row in rows} == {1000}
+    assert len(rows) == len(answers)
+
+
+def test_idempotency_key_holds_across_months(postgres_engine, pg_ids):
+    # A unique index would only compare the key within one month's partition
+    answers = list(store_old_submission(postgres_engine, 1000, user_id=2, quiz_id=1, idempotency_key="k1").items())
+    with Session(postgres_engine) as db, pytest.raises(DuplicateSubmission):
+        participant.store_submission(db, 2, 1, 100.0, answers, [True] * 3, idempotency_key="k1")
+
+
+def test_concurrent_writers_of_a_key_store_once(postgres_engine, pg_ids):
+    answers = [(question_id, "A") for question_id in range(1, 4)]
+    start = threading.Barrier(4)
+    outcomes = []
+
+    def write():
+        start.wait()
+        with Session(postgres_engine) as db:
+            try:
+                participant.store_submission(db, 2, 1, 100.0, answers, [True] * 3, idempotency_key="k2")
+                outcomes.append("stored")
+            except DuplicateSubmission:
+                outcomes.append("duplicate")
+
+    writers = [threading.Thread(target=write) for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert sorted(outcomes) == ["duplicate"] * 3 + ["stored"]
+    with postgres_engine.connect() as conn:
+        assert conn.execute(select(func.count()).where(Submission.idempotency_key == "k2")).scalar() == 1
@@ -0,0 +1,32 @@
+"""
+The hot queries use indexes (benchmarks/check_query_plans.py as a test):
+on the models' schema (SQLite) and on the migrated, partitioned schema
+(PostgreSQL).
+"""
+import pytest
+
+from benchmarks.check_query_plans import has_seq_scan, plans, seed_for_plans
+from benchmarks.common import make_engine
+from conftest import TEST_DIR
+
+
+@pytest.fixture(scope="module")
+def sqlite_plans():
+    engine = make_engine(f"sqlite:///{TEST_DIR}/plans.db")
+    yield plans(engine, seed_for_plans(engine))
+    engine.dispose()
+
+
+def assert_no_seq_scan(dialect: str, found: dict):
+    scans = {name: plan for name, plan in found.items() if has_seq_scan(dialect, plan)}
+    assert not scans, "\n".join(f"{name}:\n  " + "\n  ".join(plan) for name, plan in scans.items())
+
+
+def test_hot_queries_use_indexes_sqlite(sqlite_plans):
+    assert sqlite_plans and all(sqlite_plans.values())  # Something was explained
+    assert_no_seq_scan("sqlite", sqlite_plans)
+
+
+@pytest.mark.postgres
+def test_hot_queries_use_indexes_postgres(postgres_engine):
+    assert_no_seq_scan("postgresql", plans(postgres_engine, seed_for_plans(postgres_engine)))
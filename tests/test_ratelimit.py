@@ -0,0 +1,121 @@
+"""
+Per-route rate limits (memory and shared backends) and admission control.
+"""
+import asyncio
+import random
+
+import pytest
+
+from utils import ratelimit
+from utils.ratelimit import AdmissionController, MemoryBuckets, RateLimiter, SharedMemoryBuckets
+
+
+def limit(monkeypatch, overrides: str = "", **limits):
+    monkeypatch.setattr(ratelimit, "rate_limiter", RateLimiter(MemoryBuckets(), limits, overrides))
+
+
+def submit(client, answers: dict):
+    return client.post("/participant/submit", json={"quiz_id": 1, "answers": answers})
+
+
+def login(client, username: str, password: str = "wrong"):
+    return client.post("/auth/token", data={"username": username, "password": password})
+
+
+def test_submit_limit_per_user(monkeypatch, clients, answer_key):
+    limit(monkeypatch, submit="2/60")
+    answers = answer_key(1)
+    first = clients(2)
+    assert [submit(first, answers).status_code for _ in range(2)] == [200, 200]
+    refused = submit(first, answers)
+    assert refused.status_code == 429
+    assert 1 <= int(refused.headers["Retry-After"]) <= 30
+    assert submit(clients(3), answers).status_code == 200
+
+
+def test_override_per_subject(monkeypatch, clients, answer_key):
+    limit(monkeypatch, "submit:2=0", submit="1/60")
+    answers = answer_key(1)
+    assert [submit(clients(2), answers).status_code for _ in range(3)] == [200] * 3
+    assert [submit(clients(3), answers).status_code for _ in range(2)] == [200, 429]
+
+
+def test_login_limit_per_ip_and_username(monkeypatch, passwords, auth_client):
+    limit(monkeypatch, login="2/60", login_user="0", login_ip="0")
+    assert [login(auth_client, "user2").status_code for _ in range(2)] == [401, 401]
+    assert login(auth_client, "user2").status_code == 429
+    assert login(auth_client, "USER2").status_code == 429  # Usernames are case-folded
+    assert login(auth_client, "user3").status_code == 401
+
+
+def test_login_limit_per_username(monkeypatch, passwords, auth_client):
+    limit(monkeypatch, login="0", login_user="1/3600", login_ip="0")
+    assert login(auth_client, "user2").status_code == 401
+    assert login(auth_client, "user2").status_code == 429
+
+
+def test_memory_buckets_fail_closed_when_full():
+    buckets = MemoryBuckets(shards=1, max_keys=1)
+    assert buckets.acquire("a", 2, 1 / 60) == 0
+    assert buckets.acquire("b", 2, 1 / 60) > 0  # "a" is not back to capacity: not forgotten
+    assert buckets.acquire("a", 2, 1 / 60) == 0
+    assert buckets.acquire("a", 2, 1 / 60) > 0
+
+
+def test_shared_buckets_are_shared_between_processes(tmp_path):
+    # Two mappings of one file, as two worker processes have
+    path = str(tmp_path / "buckets")
+    first, second = SharedMemoryBuckets(path, 64), SharedMemoryBuckets(path, 64)
+    assert first.acquire("submit:2", 2, 1 / 60) == 0
+    assert second.acquire("submit:2", 2, 1 / 60) == 0
+    assert first.acquire("submit:2", 2, 1 / 60) > 0
+    assert second.acquire("submit:3", 2, 1 / 60) == 0
+
+
+def test_admission_never_loses_a_slot(monkeypatch):
+    monkeypatch.setattr(ratelimit, "admission_controllers", [])
+    rng = random.Random(7)
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(rng.uniform(0, 0.004))
+
+    async def send(message):
+        pass
+
+    async def run():
+        controller = AdmissionController(app, max_inflight=4, max_queue=1000, queue_timeout_ms=2)
+        for _ in range(20):
+            await asyncio.gather(*(controller({"type": "http", "path": "/x"}, None, send) for _ in range(100)))
+        return controller
+
+    controller = asyncio.run(run())
+    assert controller.rejected > 0  # Timeouts did happen
+    assert controller.inflight == 0
+    assert controller._slots._value == controller.max_inflight
+
+
+def test_admission_rejects_beyond_the_queue(monkeypatch):
+    monkeypatch.setattr(ratelimit, "admission_controllers", [])
+    sent = []
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.05)
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        controller = AdmissionController(app, max_inflight=1, max_queue=1, queue_timeout_ms=1000, retry_after=3)
+        await asyncio.gather(*(controller({"type": "http", "path": "/x"}, None, send) for _ in range(3)))
+        await controller({"type": "http", "path": "/health/live"}, None, send)  # Exempt
+        return controller
+
+    controller = asyncio.run(run())
+    assert (controller.admitted, controller.rejected) == (2, 1)
+    assert sent[0]["status"] == 503
+    assert (b"retry-after", b"3") in sent[0]["headers"]
+
+
+@pytest.mark.parametrize("spec, parsed", [("10/60", (10.0, 10 / 60)), ("0", None), ("", None), ("5", (5.0, 5.0))])
+def test_parse_limit(spec, parsed):
+    assert ratelimit.parse_limit(spec) == parsed
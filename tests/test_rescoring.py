@@ -0,0 +1,76 @@
+"""
+Correcting a question rescores the quiz's stored submissions (rows and
+packed), and the results, leaderboard and stats follow.
+"""
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models.submission import Submission
+from routes import participant
+
+
+def correct_question(admin_client, question_id: int, quiz_id: int, correct_answer: str):
+    return admin_client.put(f"/admin/questions/{question_id}", json={
+        "statement": "Corrected", "options": {"A": "a", "B": "b", "C": "c", "D": "d"},
+        "correct_answer": correct_answer, "quiz_id": quiz_id,
+    })
+
+
+def scores(engine, quiz_id: int) -> dict:
+    with engine.connect() as conn:
+        return dict(conn.execute(select(Submission.user_id, Submission.score).where(Submission.quiz_id == quiz_id)).all())
+
+
+def test_correcting_an_answer_rescores_rows_and_packed(engine, ids, admin_client, answer_key):
+    key = answer_key(1)
+    first = next(iter(key))
+    answers = list(key.items())
+    with Session(engine) as db:
+        participant.store_submission(db, 2, 1, 100.0, answers, [True] * 3, storage="rows")
+        participant.store_submission(db, 3, 1, 100.0, answers, [True] * 3, storage="packed")
+
+    other = "B" if key[first] == "A" else "A"
+    assert correct_question(admin_client, first, 1, other).status_code == 200
+    assert scores(engine, 1) == pytest.approx({2: 200 / 3, 3: 200 / 3})
+
+    assert correct_question(admin_client, first, 1, key[first]).status_code == 200
+    assert scores(engine, 1) == {2: 100.0, 3: 100.0}
+
+
+def test_rescoring_updates_result_leaderboard_and_stats(engine, clients, admin_client, answer_key):
+    key = answer_key(1)
+    first = next(iter(key))
+    participant_client = clients(2)
+    submitted = participant_client.post("/participant/submit", json={"quiz_id": 1, "answers": key})
+    assert submitted.json()["score"] == 100.0
+    assert participant_client.get("/participant/result/1").json()["score"] == 100.0  # Now cached
+
+    other = "B" if key[first] == "A" else "A"
+    correct_question(admin_client, first, 1, other)
+
+    result = participant_client.get("/participant/result/1").json()
+    assert result["score"] == pytest.approx(200 / 3)
+    assert result["answers"][0]["correct_answer"] == other
+    assert participant_client.get("/participant/leaderboard/1").json()["top"][0]["best_score"] == pytest.approx(200 / 3)
+    stats = admin_client.get("/admin/quizzes/1/stats").json()
+    assert stats["mean_score"] == pytest.approx(200 / 3)
+    assert stats["questions"][0]["correct"] == 0
+
+
+def test_editing_only_the_statement_keeps_scores(engine, ids, admin_client, answer_key):
+    key = answer_key(1)
+    first = next(iter(key))
+    with Session(engine) as db:
+        participant.store_submission(db, 2, 1, 100.0, list(key.items()), [True] * 3)
+    response = admin_client.put(f"/admin/questions/{first}", json={
+        "statement": "Reworded", "options": {k: f"Option {k}" for k in "ABCD"},
+        "correct_answer": key[first], "quiz_id": 1,
+    })
+    assert response.status_code == 200
+    assert scores(engine, 1) == {2: 100.0}
+
+
+def test_only_the_quiz_owner_can_correct(engine, ids, clients, answer_key):
+    first = next(iter(answer_key(1)))
+    assert correct_question(clients(4, "admin"), first, 1, "A").status_code == 403
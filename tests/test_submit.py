@@ -0,0 +1,176 @@
+"""
+POST /participant/submit (direct mode): Idempotency-Key replays, attempt
+limits and attempt policies, and packed answer storage.
+"""
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from models.quiz import Quiz
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from routes import participant
+
+
+def wrong(option: str) -> str:
+    return "B" if option == "A" else "A"
+
+
+def submit(client, quiz_id: int, answers: dict, key: str = None):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post("/participant/submit", json={"quiz_id": quiz_id, "answers": answers}, headers=headers)
+
+
+def count_submissions(engine, **filters) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(Submission).filter_by(**filters)).scalar()
+
+
+# ------------------- Idempotency -------------------
+def test_retry_with_same_key_replays_the_stored_result(engine, participant_client, answer_key):
+    answers = answer_key(1)
+    first = submit(participant_client, 1, answers, key="retry-1")
+    assert first.status_code == 200
+    assert first.json()["score"] == 100.0
+
+    retry = submit(participant_client, 1, answers, key="retry-1")
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert count_submissions(engine, user_id=2) == 1
+
+
+def test_replay_survives_a_cold_cache(engine, participant_client, answer_key):
+    # Another worker (empty idempotency cache) answers from the database
+    answers = answer_key(1)
+    first = submit(participant_client, 1, answers, key="cold")
+    participant.idempotency_cache.invalidate()
+    participant.result_cache.invalidate()
+
+    retry = submit(participant_client, 1, answers, key="cold")
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert count_submissions(engine, user_id=2) == 1
+
+
+def test_key_reused_for_other_answers_is_rejected(engine, participant_client, answer_key):
+    answers = answer_key(1)
+    assert submit(participant_client, 1, answers, key="k").status_code == 200
+
+    changed = {**answers, next(iter(answers)): wrong(next(iter(answers.values())))}
+    assert submit(participant_client, 1, changed, key="k").status_code == 422
+    assert submit(participant_client, 2, answer_key(2), key="k").status_code == 422
+    assert count_submissions(engine, user_id=2) == 1
+
+
+def test_keys_are_per_user(engine, clients, answer_key):
+    answers = answer_key(1)
+    assert submit(clients(2), 1, answers, key="shared").status_code == 200
+    other = submit(clients(3), 1, answers, key="shared")
+    assert other.status_code == 200
+    assert "Idempotent-Replayed" not in other.headers
+    assert count_submissions(engine, idempotency_key="shared") == 2
+
+
+def test_submissions_without_key_are_all_stored(engine, participant_client, answer_key):
+    answers = answer_key(1)
+    for _ in range(3):
+        assert submit(participant_client, 1, answers).status_code == 200
+    assert count_submissions(engine, user_id=2) == 3
+
+
+def test_store_submission_refuses_a_stored_key(engine, ids, answer_key):
+    # The path a concurrent retry takes once the first request has stored the key
+    answers = list(answer_key(1).items())
+    with Session(engine) as db:
+        participant.store_submission(db, 2, 1, 100.0, answers, [True] * 3, idempotency_key="race")
+    with Session(engine) as db, pytest.raises(participant.DuplicateSubmission):
+        participant.store_submission(db, 2, 1, 100.0, answers, [True] * 3, idempotency_key="race")
+    assert count_submissions(engine, user_id=2) == 1
+
+
+# ------------------- Attempt limits and policies -------------------
+def test_attempt_limit(engine, admin_client, participant_client, answer_key):
+    created = admin_client.post("/admin/quizzes", json={"title": "Limited", "description": "d", "max_attempts": 2})
+    assert created.status_code == 200
+    quiz_id = created.json()["id"]
+    question = admin_client.post(
+        "/admin/questions",
+        json={"statement": "Q", "options": {"A": "a", "B": "b"}, "correct_answer": "A", "quiz_id": quiz_id},
+    ).json()
+
+    for _ in range(2):
+        assert submit(participant_client, quiz_id, {question["id"]: "A"}).status_code == 200
+    refused = submit(participant_client, quiz_id, {question["id"]: "A"})
+    assert refused.status_code == 409
+    assert "(2)" in refused.json()["detail"]
+    assert count_submissions(engine, quiz_id=quiz_id) == 2
+
+
+def test_attempt_limit_does_not_count_replays(engine, participant_client, answer_key):
+    with engine.begin() as conn:
+        conn.execute(update(Quiz).where(Quiz.id == 1).values(max_attempts=1))
+    answers = answer_key(1)
+    assert submit(participant_client, 1, answers, key="once").status_code == 200
+    assert submit(participant_client, 1, answers, key="once").status_code == 200
+    assert submit(participant_client, 1, answers, key="twice").status_code == 409
+
+
+def test_attempt_policies(engine, participant_client, answer_key):
+    answers = answer_key(1)
+    worse = {question_id: wrong(option) for question_id, option in answers.items()}
+    submit(participant_client, 1, answers)
+    submit(participant_client, 1, worse)
+
+    assert participant_client.get("/participant/result/1").json()["score"] == 0.0  # latest (default)
+
+    with engine.begin() as conn:
+        conn.execute(update(Quiz).where(Quiz.id == 1).values(attempt_policy="best"))
+    participant.quiz_cache.invalidate_quiz(1)
+    assert participant_client.get("/participant/result/1").json()["score"] == 100.0
+
+
+def test_invalid_answers_are_refused(participant_client, answer_key):
+    answers = answer_key(1)
+    missing = dict(list(answers.items())[:-1])
+    assert submit(participant_client, 1, missing).status_code == 400
+    assert submit(participant_client, 1, {**answers, next(iter(answers)): "Z"}).status_code == 400
+    assert submit(participant_client, 99, answers).status_code == 404
+
+
+# ------------------- Packed answers -------------------
+def test_packed_submission_reads_back_like_rows(engine, clients, answer_key):
+    key = answer_key(1)
+    selected = dict(zip(key, ["A", "B", "C"]))
+    answers = list(selected.items())
+    correct = [selected[question_id] == option for question_id, option in key.items()]
+    score = sum(correct) / len(correct) * 100
+
+    with Session(engine) as db:
+        participant.store_submission(db, 2, 1, score, answers, correct, storage="rows")
+        participant.store_submission(db, 3, 1, score, answers, correct, storage="packed")
+
+    with engine.connect() as conn:
+        packed_rows = conn.execute(
+            select(func.count()).select_from(SubmissionAnswer).join(Submission).where(Submission.user_id == 3)
+        ).scalar()
+        packed_column = conn.execute(select(Submission.packed_answers).where(Submission.user_id == 3)).scalar()
+    assert packed_rows == 0
+    assert packed_column
+
+    as_rows = clients(2).get("/participant/result/1").json()
+    as_packed = clients(3).get("/participant/result/1").json()
+    assert as_packed == as_rows
+    assert [answer["selected_answer"] for answer in as_packed["answers"]] == ["A", "B", "C"]
+    assert [answer["correct_answer"] for answer in as_packed["answers"]] == list(key.values())
+
+
+def test_packed_submissions_count_in_quiz_stats(engine, admin_client, answer_key):
+    key = answer_key(1)
+    answers = list(key.items())
+    with Session(engine) as db:
+        participant.store_submission(db, 2, 1, 100.0, answers, [True] * 3, storage="packed")
+        participant.store_submission(db, 3, 1, 100.0, answers, [True] * 3, storage="rows")
+    stats = admin_client.get("/admin/quizzes/1/stats").json()
+    assert stats["submissions"] == 2
+    assert [question["answered"] for question in stats["questions"]] == [2, 2, 2]
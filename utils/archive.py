@@ -0,0 +1,317 @@
+"""
+Archival of old submission months (PostgreSQL with partitioned tables, see
+migration 0007).
+
+Each month older than ARCHIVE_AFTER_MONTHS is written to a zstd-compressed
+Parquet file in ARCHIVE_DIR (one row per answer, packed or not, EXPORT_COLUMNS,
+sorted by submission ID), recorded in `archived_partitions`, then its
+partitions are detached and dropped, all in one transaction. The files stay
+readable by GET /admin/export/submissions, stats rebuilds and participant results.
+Run it from cron (every worker needs ARCHIVE_DIR, e.g. a shared mount):
+
+    python -m utils.archive --older-than-months 12
+"""
+import argparse
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, insert, select, text
+from sqlalchemy.engine import Connection
+
+from database import engine
+from models.archived_partition import ArchivedPartition
+from models.quiz import Quiz
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from utils.export import EXPORT_BATCH_SIZE, parquet_schema, parquet_table, unpack_rows
+from utils.partitions import (
+    PARTITION_LOCK_ID, PARTITIONED_TABLES, add_months, ensure_partitions, is_partitioned, list_partitions, month_start,
+    partition_name,
+)
+
+logger = logging.getLogger(__name__)
+
+# Directory of the Parquet files of archived months
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+# Months kept in the database before they are archived (the current month never is)
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12"))
+# Milliseconds the archiver waits for the brief exclusive lock of a detach before giving up
+ARCHIVE_LOCK_TIMEOUT_MS = int(os.getenv("ARCHIVE_LOCK_TIMEOUT_MS", "5000"))
+
+
+def archive_path(file: str) -> str:
+    return os.path.join(ARCHIVE_DIR, file)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # submitted_at is stored as naive UTC
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _fsync_dir(directory: str):
+    # Makes a rename in `directory` durable
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# ------------------- Archiving -------------------
+def month_rows(month: date):
+    """
+    Export rows of one month, read from its partitions only (both tables are
+    restricted to the month, so the planner prunes every other partition),
+    with the packed answers last like export_query.
+    """
+    lo = datetime.combine(month, datetime.min.time())
+    hi = datetime.combine(add_months(month, 1), datetime.min.time())
+    return (
+        select(
+            Submission.id, Submission.user_id, Submission.quiz_id, Submission.score, Submission.submitted_at,
+            SubmissionAnswer.question_id, SubmissionAnswer.selected_answer, Submission.packed_answers,
+        )
+        .outerjoin(SubmissionAnswer, and_(
+            SubmissionAnswer.submission_id == Submission.id,
+            SubmissionAnswer.submitted_at >= lo, SubmissionAnswer.submitted_at < hi,
+        ))
+        .where(Submission.submitted_at >= lo, Submission.submitted_at < hi)
+        .order_by(Submission.id, SubmissionAnswer.question_id)
+    )
+
+
+def write_month(conn: Connection, month: date, path: str, batch_size: int = EXPORT_BATCH_SIZE) -> dict:
+    """
+    Write the rows of `month` to a Parquet file (one row group per batch) and
+    return what the file holds.
+    """
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    counts = {"submissions": 0, "answers": 0, "first_submission_id": None, "last_submission_id": None}
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        result = conn.execute(month_rows(month).execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            rows = unpack_rows(rows)
+            writer.write_table(parquet_table(rows, schema))
+            for row in rows:
+                if row[0] != counts["last_submission_id"]:
+                    counts["submissions"] += 1
+                    counts["last_submission_id"] = row[0]
+                    if counts["first_submission_id"] is None:
+                        counts["first_submission_id"] = row[0]
+                counts["answers"] += row[5] is not None
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+    return counts
+
+
+def archive_month(bind, month: date) -> dict:
+    """
+    Move one month out of the database into ARCHIVE_DIR, in one transaction:
+    the month's partitions are locked against writes (rescoring), written out,
+    registered, detached and dropped. If anything fails, the month stays in
+    the database, its file is removed and a later run starts over.
+    The file is durable (fsynced, then renamed into place and the directory
+    fsynced) before the transaction commits, so a committed month always has
+    its file; a file left by a crash before the commit is overwritten by the
+    next run and never read, as only registered files are.
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    file = f"submissions_{month:%Y_%m}.parquet"
+    path = archive_path(file)
+    partitions = [partition_name(table, month) for table in PARTITIONED_TABLES]
+
+    try:
+        with bind.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": PARTITION_LOCK_ID})
+            conn.execute(text(f"LOCK TABLE {', '.join(partitions)} IN SHARE MODE"))
+            counts = write_month(conn, month, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            _fsync_dir(ARCHIVE_DIR)
+            conn.execute(insert(ArchivedPartition).values(month=month, file=file, archived_at=datetime.utcnow(), **counts))
+
+            # Detaching locks the parent exclusively: give up rather than stall the app behind a long query
+            conn.execute(text(f"SET LOCAL lock_timeout = {ARCHIVE_LOCK_TIMEOUT_MS}"))
+            for table, partition in reversed(list(zip(PARTITIONED_TABLES, partitions))):
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+            for partition in reversed(partitions):
+                conn.execute(text(f"DROP TABLE {partition}"))
+    except BaseException:
+        # Rolled back: the month is still in the database, its file must not linger
+        for leftover in (path + ".tmp", path):
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass
+        raise
+
+    logger.info("Archived %s: %d submissions, %d answers", file, counts["submissions"], counts["answers"])
+    return {"month": month.isoformat(), "file": file, **counts}
+
+
+def archive_partitions(bind=engine, older_than_months: int = ARCHIVE_AFTER_MONTHS, now: Optional[datetime] = None) -> List[dict]:
+    """
+    Archive every attached month that ended more than `older_than_months`
+    months ago (at least 1), oldest first. Nothing to do when not partitioned.
+    """
+    cutoff = add_months(month_start(now or datetime.utcnow()), -max(older_than_months, 1))
+    with bind.connect() as conn:
+        if not is_partitioned(conn):
+            return []
+        months = sorted(month for month in list_partitions(conn) if add_months(month, 1) <= cutoff)
+    return [archive_month(bind, month) for month in months]
+
+
+# ------------------- Reading archived months -------------------
+def archived_files(conn: Connection, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[str]:
+    """
+    Parquet files of the archived months overlapping [since, until), oldest first.
+    """
+    query = select(ArchivedPartition.file).order_by(ArchivedPartition.month)
+    if since is not None:
+        query = query.where(ArchivedPartition.month >= month_start(_naive_utc(since)))
+    if until is not None:
+        query = query.where(ArchivedPartition.month < _naive_utc(until))
+    return list(conn.execute(query).scalars())
+
+
+class ArchiveScan:
+    """
+    Archived rows of an export, with the filters of export_query: the
+    admin's quizzes, optionally one quiz and a submitted_at range [since, until).
+    `prepare` looks the files up, `batches` reads them (in the threadpool).
+    """
+
+    def __init__(self, created_by: int, quiz_id: Optional[int] = None, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        self.created_by = created_by
+        self.quiz_id = quiz_id
+        self.since = _naive_utc(since)
+        self.until = _naive_utc(until)
+        self.files: List[str] = []
+        self.quiz_ids: List[int] = []
+
+    def prepare(self, conn: Connection):
+        self.files = archived_files(conn, self.since, self.until)
+        if self.files:
+            self.quiz_ids = list(conn.execute(select(Quiz.id).where(Quiz.created_by == self.created_by)).scalars())
+
+    def batches(self, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[tuple]]:
+        if not self.files or not self.quiz_ids:
+            return
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        owned = pa.array(self.quiz_ids, pa.int64())
+        for file in self.files:
+            for batch in pq.ParquetFile(archive_path(file)).iter_batches(batch_size=batch_size):
+                mask = pc.is_in(batch["quiz_id"], value_set=owned)
+                if self.quiz_id is not None:
+                    mask = pc.and_(mask, pc.equal(batch["quiz_id"], self.quiz_id))
+                if self.since is not None:
+                    mask = pc.and_(mask, pc.greater_equal(batch["submitted_at"], pa.scalar(self.since, pa.timestamp("us"))))
+                if self.until is not None:
+                    mask = pc.and_(mask, pc.less(batch["submitted_at"], pa.scalar(self.until, pa.timestamp("us"))))
+                batch = batch.filter(mask)
+                if batch.num_rows:
+                    yield list(zip(*(column.to_pylist() for column in batch.columns)))
+
+
+def archived_submissions(conn: Connection, quiz_id: int) -> Iterator[List[Tuple[int, int, int, float, datetime, List[Tuple[int, str]]]]]:
+    """
+    Archived submissions of a quiz, one list per file, as (submission_id,
+    user_id, quiz_id, score, submitted_at, [(question_id, selected_answer)]).
+    """
+    files = archived_files(conn)
+    if not files:
+        return
+    import pyarrow.parquet as pq
+
+    for file in files:
+        submissions = {}
+        for row in pq.read_table(archive_path(file), filters=[("quiz_id", "=", quiz_id)]).to_pylist():
+            submission = submissions.setdefault(row["submission_id"], (
+                row["submission_id"], row["user_id"], row["quiz_id"], row["score"], row["submitted_at"], [],
+            ))
+            if row["question_id"] is not None:
+                submission[5].append((row["question_id"], row["selected_answer"]))
+        if submissions:
+            yield list(submissions.values())
+
+
+def find_archived_submission(conn: Connection, submission_id: int) -> Optional[Tuple[float, List[Tuple[int, str]]]]:
+    """
+    (score, [(question_id, selected_answer)]) of an archived submission, or None.
+    Files are sorted by submission ID, so row group statistics skip most of the file.
+    """
+    file = conn.execute(
+        select(ArchivedPartition.file).where(
+            ArchivedPartition.first_submission_id <= submission_id,
+            ArchivedPartition.last_submission_id >= submission_id,
+        )
+    ).scalar()
+    if file is None:
+        return None
+    import pyarrow.parquet as pq
+
+    rows = pq.read_table(
+        archive_path(file), columns=["score", "question_id", "selected_answer"],
+        filters=[("submission_id", "=", submission_id)],
+    ).to_pylist()
+    if not rows:
+        return None
+    return rows[0]["score"], sorted(
+        (row["question_id"], row["selected_answer"]) for row in rows if row["question_id"] is not None
+    )
+
+
+def latest_archived_submission(conn: Connection, quiz_id: int, user_id: int) -> Optional[Tuple[int, float]]:
+    """
+    (submission_id, score) of a user's latest archived submission of a quiz, or None.
+    Files are read newest first; the first one with a match holds the latest.
+    """
+    files = archived_files(conn)
+    if not files:
+        return None
+    import pyarrow.parquet as pq
+
+    for file in reversed(files):
+        rows = pq.read_table(
+            archive_path(file), columns=["submission_id", "score"],
+            filters=[("quiz_id", "=", quiz_id), ("user_id", "=", user_id)],
+        ).to_pylist()
+        if rows:
+            latest = max(rows, key=lambda row: row["submission_id"])
+            return latest["submission_id"], latest["score"]
+    return None
+
+
+def archive_stats(conn: Connection) -> List[dict]:
+    return [
+        {
+            "month": row.month.isoformat(), "file": row.file, "submissions": row.submissions, "answers": row.answers,
+            "archived_at": row.archived_at,
+        }
+        for row in conn.execute(select(ArchivedPartition.__table__).order_by(ArchivedPartition.month))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-months", type=int, default=ARCHIVE_AFTER_MONTHS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    with engine.begin() as conn:
+        ensure_partitions(conn)  # Also keeps the coming months ready when the app is idle
+    for archived in archive_partitions(engine, args.older_than_months):
+        print(f"{archived['month']}: {archived['submissions']} submissions, {archived['answers']} answers -> {archived['file']}")
+
+
+if __name__ == "__main__":
+    main()
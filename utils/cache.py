@@ -0,0 +1,400 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from models.quiz import Quiz
+from models.question import Question
+from schemas.quiz import QuizOut, QuizSummary
+from utils.http import EncodedBody, encode_body
+from utils.scoring import AnswerKey, compile_answer_key
+
+# Cache limits (override through the environment)
+QUIZ_CACHE_SIZE = int(os.getenv("QUIZ_CACHE_SIZE", "1024"))  # Max cached quizzes
+QUIZ_PAGE_CACHE_SIZE = int(os.getenv("QUIZ_PAGE_CACHE_SIZE", "256"))  # Max cached listing pages
+QUIZ_CACHE_TTL = float(os.getenv("QUIZ_CACHE_TTL", "300"))  # Seconds before an entry is reloaded
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "4096"))  # Max cached rendered results (0 disables)
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))  # Seconds a rendered result is kept
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))  # Max remembered Idempotency-Keys
+IDEMPOTENCY_CACHE_TTL = float(os.getenv("IDEMPOTENCY_CACHE_TTL", "600"))  # Seconds a key is answered from memory
+# File of the invalidation counters shared by the worker processes of the host ("" keeps caches per process)
+CACHE_SHARED_PATH = os.getenv(
+    "CACHE_SHARED_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "quiz-api-cache"),
+)
+CACHE_SHARED_SLOTS = int(os.getenv("CACHE_SHARED_SLOTS", "65536"))  # Counters in that file
+
+# Validates and serializes the participant view of a quiz (no correct answers)
+QUIZ_OUT = TypeAdapter(QuizOut)
+# Validates and serializes a page of the summary-only listing
+QUIZ_SUMMARIES = TypeAdapter(List[QuizSummary])
+
+
+# Immutable copy of a question, detached from any database session
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    id: int
+    quiz_id: int
+    statement: str
+    options: Dict[str, str]
+    correct_answer: str
+
+
+# Immutable copy of a quiz together with its ordered questions
+@dataclass(frozen=True)
+class QuizSnapshot:
+    id: int
+    title: str
+    description: str
+    created_by: int
+    max_attempts: Optional[int]
+    attempt_policy: str
+    questions: Tuple[QuestionSnapshot, ...]
+    version: int  # Cache generation the snapshot was loaded in
+
+    # Compiled scoring data, built on first use and cached with the snapshot
+    # (not a dataclass field, so it is never serialized in responses)
+    @cached_property
+    def answer_key(self) -> AnswerKey:
+        return compile_answer_key(self.id, self.questions)
+
+    # QuizOut JSON of the snapshot, rendered once by Pydantic and reused by every listing page
+    @cached_property
+    def rendered(self) -> bytes:
+        return QUIZ_OUT.dump_json(QUIZ_OUT.validate_python(self, from_attributes=True))
+
+    # Content-hashed, precompressed body of GET /participant/quizzes/{quiz_id}
+    @cached_property
+    def encoded(self) -> EncodedBody:
+        return encode_body(self.rendered)
+
+
+def snapshot_quiz(quiz: Quiz, version: int = 0) -> QuizSnapshot:
+    """
+    Copy a Quiz ORM object (with its questions loaded) into a QuizSnapshot.
+    """
+    return QuizSnapshot(
+        id=quiz.id,
+        title=quiz.title,
+        description=quiz.description,
+        created_by=quiz.created_by,
+        max_attempts=quiz.max_attempts,
+        attempt_policy=quiz.attempt_policy or "latest",
+        questions=tuple(
+            QuestionSnapshot(
+                id=q.id,
+                quiz_id=q.quiz_id,
+                statement=q.statement,
+                options=dict(q.options or {}),
+                correct_answer=q.correct_answer,
+            )
+            for q in quiz.questions
+        ),
+        version=version,
+    )
+
+
+def render_quizzes(snapshots: Sequence[QuizSnapshot]) -> bytes:
+    """
+    JSON array of QuizOut for a listing page, joined from the pre-rendered snapshots.
+    """
+    return b"[" + b",".join(snapshot.rendered for snapshot in snapshots) + b"]"
+
+
+class SharedCounters:
+    """
+    64-bit counters in a memory-mapped file (on /dev/shm by default), shared by
+    every worker process of the host however they were started.
+    - Names are hashed to slots; two names sharing a slot only cost a spurious
+      invalidation.
+    - Updates hold an fcntl byte-range lock on the slot (across processes) plus
+      a thread lock (fcntl locks are per process); reads take no lock.
+    """
+
+    COUNTER = struct.Struct("<Q")
+
+    def __init__(self, path: str = CACHE_SHARED_PATH, slots: int = CACHE_SHARED_SLOTS):
+        self.slots = max(slots, 1)
+        size = self.slots * self.COUNTER.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)  # New pages read as zeroes
+        self.map = mmap.mmap(self.fd, size)
+        self.lock = threading.Lock()
+
+    def _offset(self, name: str) -> int:
+        slot = int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), "little") % self.slots
+        return slot * self.COUNTER.size
+
+    def get(self, name: str) -> int:
+        return self.COUNTER.unpack_from(self.map, self._offset(name))[0]
+
+    def _update(self, name: str, update) -> int:
+        offset = self._offset(name)
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.COUNTER.size, offset)
+            try:
+                value = update(self.COUNTER.unpack_from(self.map, offset)[0])
+                self.COUNTER.pack_into(self.map, offset, value)
+                return value
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.COUNTER.size, offset)
+
+    def increment(self, name: str) -> int:
+        return self._update(name, lambda value: (value + 1) % 2 ** 64)
+
+    def raise_to(self, name: str, value: int) -> int:
+        return self._update(name, lambda current: max(current, value))
+
+
+# Counters shared by the worker processes of the host (None when CACHE_SHARED_PATH is "")
+shared_counters = SharedCounters() if CACHE_SHARED_PATH else None
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with a per-entry TTL.
+    - `generation` changes on every invalidation; `put` drops values that were
+      loaded under an older generation so a concurrent write is never overwritten
+      by stale data. Read it (or `generation_of(key)`) before loading the value.
+    - With a `shared_name`, invalidations also bump counters in `shared_counters`
+      and every hit checks them, so an invalidation in any worker process of the
+      host drops the entry everywhere. Values that can be invalidated one key
+      at a time must be put with `generation_of(key)`.
+    - Keeps hit/miss/eviction counters for the stats endpoint.
+    """
+
+    def __init__(self, max_size: int, ttl: float, shared_name: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = shared_counters if shared_name else None
+        self.shared_name = shared_name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value, shared counters when loaded)
+        self._lock = threading.Lock()
+
+    def _shared_state(self, key=None, with_key: bool = False) -> Optional[tuple]:
+        if self.shared is None:
+            return None
+        state = (self.shared.get(f"{self.shared_name}:*"),)
+        if with_key:
+            state += (self.shared.get(f"{self.shared_name}:{key!r}"),)
+        return state
+
+    @property
+    def generation(self) -> tuple:
+        """
+        Generation to `put` a value with, for caches invalidated as a whole.
+        """
+        return self._generation, self._shared_state()
+
+    def generation_of(self, key) -> tuple:
+        """
+        Generation to `put` the value of `key` with, when single keys are invalidated.
+        """
+        return self._generation, self._shared_state(key, with_key=True)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value, state = entry
+            # Expired, or invalidated by another worker process: treat as a miss
+            if expires_at < time.monotonic() or (
+                state is not None and state != self._shared_state(key, with_key=len(state) > 1)
+            ):
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)  # Mark as most recently used
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation: tuple) -> bool:
+        local, state = generation
+        with self._lock:
+            if local != self._generation:  # Invalidated while the value was loading
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value, state)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)  # Drop the least recently used entry
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key=None):
+        """
+        Drop one key, or every entry when no key is given (in every worker
+        process of the host when the cache is shared).
+        """
+        if self.shared is not None:
+            self.shared.increment(f"{self.shared_name}:*" if key is None else f"{self.shared_name}:{key!r}")
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "shared": self.shared is not None,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class QuizCache:
+    """
+    In-process cache of whole quizzes (questions, options and correct answers)
+    and of participant listing pages.
+
+    Entries live in each worker process, but invalidations go through
+    `shared_counters`: an admin write drops the quiz in every worker of the
+    host before their next hit, so no worker scores against an old answer key.
+    Workers on other hosts only catch up after the TTL.
+    """
+
+    def __init__(self, max_size: int = QUIZ_CACHE_SIZE, page_size: int = QUIZ_PAGE_CACHE_SIZE, ttl: float = QUIZ_CACHE_TTL):
+        self.quizzes = LRUCache(max_size, ttl, "quizzes")  # quiz_id -> QuizSnapshot
+        self.pages = LRUCache(page_size, ttl, "quiz_pages")   # (after_id, limit) -> tuple of QuizSnapshot
+        self.summaries = LRUCache(page_size, ttl, "quiz_summaries")  # (after_id, limit) -> (JSON body, last quiz ID, quizzes)
+
+    def get_quiz(self, db: Session, quiz_id: int) -> Optional[QuizSnapshot]:
+        """
+        Return the quiz snapshot, loading it with a single batched query on a miss.
+        Returns None if the quiz does not exist.
+        """
+        snapshot = self.quizzes.get(quiz_id)
+        if snapshot is not None:
+            return snapshot
+
+        generation = self.quizzes.generation_of(quiz_id)
+        quiz = (
+            db.query(Quiz)
+            .options(selectinload(Quiz.questions))
+            .filter(Quiz.id == quiz_id)
+            .first()
+        )
+        if quiz is None:
+            return None
+
+        snapshot = snapshot_quiz(quiz, generation[0])
+        self.quizzes.put(quiz_id, snapshot, generation)
+        return snapshot
+
+    def get_page(self, db: Session, after_id: Optional[int], limit: int) -> Tuple[QuizSnapshot, ...]:
+        """
+        Return one keyset page of the quiz catalogue (see GET /participant/quizzes).
+        """
+        key = (after_id, limit)
+        page = self.pages.get(key)
+        if page is not None:
+            return page
+
+        page_generation = self.pages.generation
+        query = db.query(Quiz).options(selectinload(Quiz.questions)).order_by(Quiz.id)
+        if after_id is not None:
+            query = query.filter(Quiz.id > after_id)
+
+        page = tuple(snapshot_quiz(quiz, page_generation[0]) for quiz in query.limit(limit).all())
+        self.pages.put(key, page, page_generation)
+        for snapshot in page:  # Warm the per-quiz entries used by submit
+            # Quiz generations are read after the load: they are only valid if the page
+            # was not invalidated since it started (invalidate_quiz drops pages first)
+            quiz_generation = self.quizzes.generation_of(snapshot.id)
+            if self.pages.generation != page_generation:
+                break
+            self.quizzes.put(snapshot.id, snapshot, quiz_generation)
+        return page
+
+    def get_summary_page(self, db: Session, after_id: Optional[int], limit: int) -> Tuple[bytes, Optional[int], int]:
+        """
+        Return one rendered keyset page of the summary-only listing (see
+        GET /participant/quizzes/summary) with its last quiz ID and size.
+        Question counts are aggregated in the query; no question is loaded.
+        """
+        key = (after_id, limit)
+        page = self.summaries.get(key)
+        if page is not None:
+            return page
+
+        generation = self.summaries.generation
+        query = (
+            db.query(
+                Quiz.id, Quiz.title, Quiz.description, Quiz.created_by, Quiz.max_attempts, Quiz.attempt_policy,
+                func.count(Question.id).label("question_count"),
+            )
+            .outerjoin(Question, Question.quiz_id == Quiz.id)
+            .group_by(Quiz.id)
+            .order_by(Quiz.id)
+        )
+        if after_id is not None:
+            query = query.filter(Quiz.id > after_id)
+
+        rows = query.limit(limit).all()
+        page = (
+            QUIZ_SUMMARIES.dump_json(QUIZ_SUMMARIES.validate_python(rows, from_attributes=True)),
+            rows[-1].id if rows else None,
+            len(rows),
+        )
+        self.summaries.put(key, page, generation)
+        return page
+
+    def invalidate_quiz(self, *quiz_ids: int):
+        """
+        Drop the given quizzes and every listing page (they embed the quizzes),
+        in every worker process of the host.
+        Pages go first: get_page relies on it when warming the quiz entries.
+        """
+        self.pages.invalidate()
+        self.summaries.invalidate()
+        for quiz_id in quiz_ids:
+            self.quizzes.invalidate(quiz_id)
+
+    def clear(self):
+        self.quizzes.invalidate()
+        self.pages.invalidate()
+        self.summaries.invalidate()
+
+    def stats(self) -> dict:
+        return {"quizzes": self.quizzes.stats(), "pages": self.pages.stats(), "summaries": self.summaries.stats()}
+
+
+# Shared cache instance used by the routers
+quiz_cache = QuizCache()
+
+# Rendered results of finished submissions: submission_id -> (etag, JSON body).
+# A result only changes when an admin rescoring invalidates the whole cache (in every worker).
+result_cache = LRUCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL, "results")
+
+# Recently used Idempotency-Keys of POST /participant/submit:
+# (user_id, key) -> (request fingerprint, submission ID or None, ticket or None).
+# Only spares the database lookup; the submissions table is authoritative (see lock_idempotency_keys).
+idempotency_cache = LRUCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_CACHE_TTL)
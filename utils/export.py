@@ -0,0 +1,253 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import Select, and_, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from models.quiz import Quiz
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from utils.scoring import unpack_answers
+
+# Rows fetched from the server-side cursor (and encoded) per batch
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+
+# One row per answer, denormalized with its submission
+EXPORT_COLUMNS = ("submission_id", "user_id", "quiz_id", "score", "submitted_at", "question_id", "selected_answer")
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def export_query(created_by: int, quiz_id: Optional[int] = None, since: Optional[datetime] = None, until: Optional[datetime] = None) -> Select:
+    """
+    Submissions (with their answers) of the quizzes owned by `created_by`,
+    optionally restricted to one quiz and to a submitted_at range [since, until).
+    Submissions without answers appear once with empty answer columns.
+    Rows carry the packed answers last; unpack_rows turns them into EXPORT_COLUMNS.
+    """
+    # submitted_at is the partition key of both tables (answers copy it from their submission):
+    # matching it, and repeating the range on the answers, lets PostgreSQL prune both sides
+    on = [SubmissionAnswer.submission_id == Submission.id, SubmissionAnswer.submitted_at == Submission.submitted_at]
+    where = [Submission.quiz_id.in_(select(Quiz.id).where(Quiz.created_by == created_by))]
+    if quiz_id is not None:
+        where.append(Submission.quiz_id == quiz_id)
+    if since is not None:
+        where.append(Submission.submitted_at >= since)
+        on.append(SubmissionAnswer.submitted_at >= since)
+    if until is not None:
+        where.append(Submission.submitted_at < until)
+        on.append(SubmissionAnswer.submitted_at < until)
+    return (
+        select(
+            Submission.id, Submission.user_id, Submission.quiz_id, Submission.score, Submission.submitted_at,
+            SubmissionAnswer.question_id, SubmissionAnswer.selected_answer, Submission.packed_answers,
+        )
+        .outerjoin(SubmissionAnswer, and_(*on))
+        .where(*where)
+        .order_by(Submission.id, SubmissionAnswer.question_id)
+    )
+
+
+def unpack_rows(rows: Sequence) -> List[tuple]:
+    """
+    Rows of export_query in EXPORT_COLUMNS order: a packed submission (one row,
+    no joined answer) becomes one row per answer, sorted by question ID.
+    """
+    unpacked = []
+    for row in rows:
+        answers = unpack_answers(row[7]) if row[7] is not None else None
+        if answers:
+            unpacked.extend((*row[:5], question_id, selected) for question_id, selected in answers)
+        else:
+            unpacked.append(tuple(row[:7]))
+    return unpacked
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ------------------- Encoders (one batch of rows -> bytes) -------------------
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+class CsvEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+    def start(self) -> bytes:
+        self._writer.writerow(EXPORT_COLUMNS)
+        return self._drain()
+
+    def batch(self, rows: Sequence) -> bytes:
+        self._writer.writerows(
+            (submission_id, user_id, quiz_id, score, _isoformat(submitted_at), question_id, selected)
+            for submission_id, user_id, quiz_id, score, submitted_at, question_id, selected in rows
+        )
+        return self._drain()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    def __init__(self):
+        self._dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+    def start(self) -> bytes:
+        return b""
+
+    def batch(self, rows: Sequence) -> bytes:
+        return "".join(
+            self._dumps({
+                "submission_id": submission_id, "user_id": user_id, "quiz_id": quiz_id, "score": score,
+                "submitted_at": _isoformat(submitted_at), "question_id": question_id, "selected_answer": selected,
+            }) + "\n"
+            for submission_id, user_id, quiz_id, score, submitted_at, question_id, selected in rows
+        ).encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file handing out what was written since the last drain,
+    so the Parquet writer's output can be streamed row group by row group.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def parquet_schema():
+    """
+    Arrow schema of EXPORT_COLUMNS (Parquet exports and archive files).
+    """
+    import pyarrow as pa
+
+    return pa.schema([
+        ("submission_id", pa.int64()), ("user_id", pa.int64()), ("quiz_id", pa.int64()),
+        ("score", pa.float64()), ("submitted_at", pa.timestamp("us")),
+        ("question_id", pa.int64()), ("selected_answer", pa.string()),
+    ])
+
+
+def parquet_table(rows: Sequence, schema):
+    """
+    Arrow table of export rows (tuples in EXPORT_COLUMNS order).
+    """
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    return pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema,
+    )
+
+
+class ParquetEncoder:
+    """
+    One Parquet row group per batch; only the current batch is held in memory.
+    """
+
+    def __init__(self):
+        import pyarrow.parquet as pq
+
+        self._schema = parquet_schema()
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="zstd")
+
+    def start(self) -> bytes:
+        return self._sink.drain()
+
+    def batch(self, rows: Sequence) -> bytes:
+        self._writer.write_table(parquet_table(rows, self._schema))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()  # Writes the footer
+        return self._sink.drain()
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+
+# ------------------- Streaming -------------------
+async def stream_export(bind, query: Select, fmt: str, batch_size: int = EXPORT_BATCH_SIZE, archived=None) -> AsyncIterator[bytes]:
+    """
+    Stream the rows of `query` encoded as `fmt` from a dedicated connection.
+    - Rows are read through a server-side cursor (`yield_per`), `batch_size` at a
+      time; packed answers are expanded to one row per answer (unpack_rows).
+    - `archived` (an ArchiveScan, see utils/archive.py) adds the matching rows
+      of archived months first; they are older than any row still in the tables.
+    - Encoding always runs in the threadpool; async engines fetch on the event
+      loop, sync engines fetch in the threadpool too.
+    Memory stays bounded by one batch whatever the number of rows.
+    """
+    encoder = ENCODERS[fmt]()
+    query = query.execution_options(yield_per=batch_size)
+
+    if isinstance(bind, AsyncEngine):
+        yield encoder.start()
+        async with bind.connect() as conn:
+            if archived is not None:
+                await conn.run_sync(archived.prepare)
+                async for rows in iterate_in_threadpool(archived.batches(batch_size)):
+                    yield await run_in_threadpool(encoder.batch, rows)
+            result = await conn.stream(query)
+            async for rows in result.partitions():
+                yield await run_in_threadpool(encoder.batch, unpack_rows(rows))
+        yield await run_in_threadpool(encoder.finish)
+        return
+
+    def generate():
+        yield encoder.start()
+        with bind.connect() as conn:
+            if archived is not None:
+                archived.prepare(conn)
+                for rows in archived.batches(batch_size):
+                    yield encoder.batch(rows)
+            for rows in conn.execute(query).partitions():
+                yield encoder.batch(unpack_rows(rows))
+        yield encoder.finish()
+
+    async for chunk in iterate_in_threadpool(generate()):
+        yield chunk
@@ -0,0 +1,105 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+# Web worker processes sharing this host's CPUs (uvicorn --workers defaults to it too)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Worker processes doing bcrypt work in each web worker (0 = use the threadpool instead).
+# Defaults to this web worker's share of the CPUs, so all pools together use each CPU once.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(max(1, (os.cpu_count() or 1) // max(WEB_CONCURRENCY, 1)))))
+# Hash/verify calls allowed in flight (running + queued) before shedding load
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(max(HASH_WORKERS, 1) * 8)))
+# Seconds a client is asked to wait before retrying when the service is saturated
+HASH_RETRY_AFTER = int(os.getenv("HASH_RETRY_AFTER", "1"))
+
+
+class HashingBusy(Exception):
+    """
+    Raised when too many hash/verify calls are already pending.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing service is saturated")
+        self.retry_after = retry_after
+
+
+# Functions run inside the worker processes (module level so they can be pickled)
+def _hash(password: str) -> str:
+    from utils.security import get_password_hash
+    return get_password_hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    from utils.security import verify_and_update_password
+    return verify_and_update_password(password, hashed_password)
+
+
+class HashingService:
+    """
+    Runs bcrypt hashing and verification off the event loop with bounded queueing.
+    - With workers > 0 a process pool is used, so bcrypt no longer competes
+      with request handling for the GIL.
+    - At most `max_pending` calls are in flight; further calls raise HashingBusy
+      immediately instead of queueing behind a login spike.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING, retry_after: int = HASH_RETRY_AFTER):
+        self.configure(workers, max_pending, retry_after)
+
+    def configure(self, workers: int, max_pending: int, retry_after: int = HASH_RETRY_AFTER):
+        """
+        (Re)configure the service; an existing process pool is shut down.
+        """
+        self.shutdown()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+
+    def shutdown(self):
+        executor = getattr(self, "_executor", None)
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingBusy(self.retry_after)
+
+        self.pending += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+            if self._executor is None:  # Start the worker processes on first use
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password; also returns a new hash when the stored one uses
+        outdated cost parameters (None otherwise).
+        """
+        return await self._run(_verify_and_update, password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+
+# Shared hashing service used by the auth routes
+hashing_service = HashingService()
@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional: only gzip variants are precompressed
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 512
+# Preferred content codings, best first
+ENCODINGS = ("br", "gzip")
+
+
+def json_dumps(content: Any) -> bytes:
+    """
+    Compact JSON encoding of plain Python data (orjson when installed).
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with `json_dumps`.
+    Only for routes and responses without a response model: those are already
+    validated and serialized to bytes in one step by Pydantic, which an
+    explicit response class would turn off.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Strong ETag derived from the response body.
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    True if the request's If-None-Match header names `etag` (or "*").
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_json_response(request: Request, body: bytes, etag: str, cache_control: str = "private, no-cache") -> Response:
+    """
+    Return a pre-rendered JSON body, or an empty 304 if the client already has it.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# ------------------- Precompressed bodies -------------------
+@dataclass(frozen=True)
+class EncodedBody:
+    """
+    A rendered JSON body with its strong ETag and its precompressed variants.
+    """
+    etag: str
+    variants: Dict[str, bytes]  # Content coding ("identity", "gzip", "br") -> bytes
+
+    def etag_for(self, coding: str) -> str:
+        # Each representation gets its own strong ETag
+        return self.etag if coding == "identity" else self.etag[:-1] + "-" + coding + '"'
+
+
+def encode_body(body: bytes) -> EncodedBody:
+    """
+    Hash and compress a body once (gzip, and brotli when installed).
+    """
+    variants = {"identity": body}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=11)
+        variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+    return EncodedBody(make_etag(body), variants)
+
+
+def pick_encoding(request: Request, available) -> str:
+    """
+    Best content coding of `available` accepted by the client's Accept-Encoding.
+    """
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in ENCODINGS:
+        if coding in available and accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+
+def encoded_json_response(request: Request, encoded: EncodedBody, cache_control: str = "private, no-cache") -> Response:
+    """
+    Return the best precompressed variant of a body, or an empty 304 if the
+    client already has any variant of it.
+    """
+    coding = pick_encoding(request, encoded.variants)
+    headers = {"ETag": encoded.etag_for(coding), "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if any(etag_matches(request, encoded.etag_for(variant)) for variant in encoded.variants):
+        return Response(status_code=304, headers=headers)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=encoded.variants[coding], media_type="application/json", headers=headers)
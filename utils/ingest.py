@@ -0,0 +1,587 @@
+import asyncio
+import fcntl
+import glob
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models.failed_submission import FailedSubmission
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from utils.cache import LRUCache
+from utils.partitions import lock_idempotency_keys
+from utils.scoring import ANSWER_STORAGE, pack_answers
+from utils.security import SECRET_KEY
+from utils.stats import AttemptsExhausted, record_submissions
+
+logger = logging.getLogger(__name__)
+
+# "direct" stores each submission inside its request; "queue" acknowledges it with
+# a ticket and leaves persistence to the background writer
+SUBMIT_MODE = os.getenv("SUBMIT_MODE", "direct")
+# Submissions committed together by the writer
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+# Milliseconds the writer waits for a batch to fill up
+INGEST_MAX_WAIT_MS = float(os.getenv("INGEST_MAX_WAIT_MS", "20"))
+# Accepted but not yet stored submissions before new ones are refused (503)
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "20000"))
+# Seconds a client is asked to wait before retrying when the queue is full
+INGEST_RETRY_AFTER = int(os.getenv("INGEST_RETRY_AFTER", "1"))
+# Journal file of accepted submissions, replayed after a crash ("" keeps the queue in memory only).
+# Workers of serve.py each write their own file, suffixed with their worker index
+INGEST_JOURNAL = os.getenv("INGEST_JOURNAL", "")
+# fsync the journal before acknowledging (survives power loss, costs a disk flush per submission)
+INGEST_JOURNAL_FSYNC = os.getenv("INGEST_JOURNAL_FSYNC", "0") == "1"
+# Journal size (bytes) from which it is rewritten with only the submissions still pending
+INGEST_JOURNAL_COMPACT_BYTES = int(os.getenv("INGEST_JOURNAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
+# Outcomes of processed tickets kept in memory for the status endpoint
+INGEST_STATUS_SIZE = int(os.getenv("INGEST_STATUS_SIZE", "100000"))
+# Seconds a ticket that is neither stored nor failed is reported as queued (by any worker)
+INGEST_TICKET_WINDOW = int(os.getenv("INGEST_TICKET_WINDOW", "3600"))
+
+
+class IngestQueueFull(Exception):
+    """
+    Raised when INGEST_MAX_PENDING submissions are already waiting to be stored.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Submission queue is full")
+        self.retry_after = retry_after
+
+
+def _ticket_signature(user_id: int, issued: str, nonce: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), f"ticket.{user_id}.{issued}.{nonce}".encode(), hashlib.sha256).hexdigest()[:12]
+
+
+def new_ticket(user_id: int) -> str:
+    """
+    32 hex characters: issue time (8), random nonce (12) and a signature binding
+    both to the user (12). Any worker process can tell a genuine recent ticket
+    without the database (see queued_recently).
+    """
+    issued, nonce = f"{int(time.time()):08x}", os.urandom(6).hex()
+    return issued + nonce + _ticket_signature(user_id, issued, nonce)
+
+
+def queued_recently(ticket: str, user_id: int, window: int = INGEST_TICKET_WINDOW) -> bool:
+    """
+    Whether `ticket` was issued to `user_id` by new_ticket less than `window` seconds ago.
+    """
+    if len(ticket) != 32:
+        return False
+    issued, nonce, signature = ticket[:8], ticket[8:20], ticket[20:]
+    try:
+        age = time.time() - int(issued, 16)
+    except ValueError:
+        return False
+    return -60 <= age < window and hmac.compare_digest(signature, _ticket_signature(user_id, issued, nonce))
+
+
+def record_failures(db: Session, failures: List[Tuple["PendingSubmission", str]]):
+    """
+    Store the failed tickets (skipping those already recorded by an earlier replay) and commit.
+    """
+    known = set(db.execute(
+        select(FailedSubmission.ticket).where(FailedSubmission.ticket.in_([job.ticket for job, _ in failures]))
+    ).scalars())
+    rows = [
+        {"ticket": job.ticket, "user_id": job.user_id, "quiz_id": job.quiz_id, "detail": detail, "failed_at": datetime.utcnow()}
+        for job, detail in failures if job.ticket not in known
+    ]
+    if rows:
+        db.execute(insert(FailedSubmission), rows)
+    db.commit()
+
+
+# A scored submission waiting to be stored
+@dataclass
+class PendingSubmission:
+    ticket: str
+    user_id: int
+    quiz_id: int
+    score: float
+    submitted_at: str  # ISO timestamp (journal friendly)
+    answers: List[Tuple[int, str]]  # (question_id, selected_answer) in question order
+    correct: List[bool]  # Whether each answer is correct
+    idempotency_key: Optional[str] = None  # Idempotency-Key of the request, if any
+    max_attempts: Optional[int] = None  # Attempt limit of the quiz when it was accepted
+
+
+def store_batch(db: Session, batch: List[PendingSubmission]) -> Dict[str, int]:
+    """
+    Store a batch of submissions (answers and aggregates included) in one
+    transaction and return ticket -> submission ID. Tickets that are already
+    stored (journal replay), and retries of a request whose Idempotency-Key is
+    already stored or earlier in the batch, are mapped to the existing row.
+    Answers are stored as rows or packed into the submissions (ANSWER_STORAGE).
+    """
+    packed = ANSWER_STORAGE == "packed"
+    try:
+        stored = dict(db.execute(
+            select(Submission.ticket, Submission.id).where(Submission.ticket.in_([job.ticket for job in batch]))
+        ).all())
+
+        # Submissions already stored under the same Idempotency-Key (a retry accepted by another worker)
+        keys = {(job.user_id, job.idempotency_key) for job in batch if job.idempotency_key and job.ticket not in stored}
+        by_key = {}
+        if keys:
+            lock_idempotency_keys(db, keys)  # Retries accepted by other workers wait for this batch (and vice versa)
+            by_key = {
+                (user_id, key): submission_id
+                for user_id, key, submission_id in db.execute(
+                    select(Submission.user_id, Submission.idempotency_key, Submission.id)
+                    .where(tuple_(Submission.user_id, Submission.idempotency_key).in_(keys))
+                )
+            }
+
+        jobs, retries = [], []
+        for job in batch:
+            if job.ticket in stored:
+                continue
+            key = (job.user_id, job.idempotency_key)
+            if job.idempotency_key and key in by_key:
+                retries.append(job)
+            else:
+                if job.idempotency_key:
+                    by_key[key] = None  # Stored below; later jobs with the same key are retries
+                jobs.append(job)
+
+        if jobs:
+            rows = db.execute(
+                insert(Submission).returning(Submission.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "ticket": job.ticket, "user_id": job.user_id, "quiz_id": job.quiz_id,
+                        "score": job.score, "submitted_at": datetime.fromisoformat(job.submitted_at),
+                        "idempotency_key": job.idempotency_key,
+                        "packed_answers": pack_answers(job.answers) if packed else None,
+                    }
+                    for job in jobs
+                ],
+            ).scalars().all()
+
+            answer_rows = []
+            for job, submission_id in zip(jobs, rows):
+                stored[job.ticket] = submission_id
+                if job.idempotency_key:
+                    by_key[job.user_id, job.idempotency_key] = submission_id
+                if packed:
+                    continue
+                submitted_at = datetime.fromisoformat(job.submitted_at)
+                answer_rows.extend(
+                    {
+                        "submission_id": submission_id, "question_id": question_id, "selected_answer": selected,
+                        "submitted_at": submitted_at,
+                    }
+                    for question_id, selected in job.answers
+                )
+            if answer_rows:
+                db.execute(insert(SubmissionAnswer), answer_rows)
+
+            record_submissions(db, [
+                (
+                    submission_id, job.user_id, job.quiz_id, job.score, datetime.fromisoformat(job.submitted_at),
+                    list(zip((question_id for question_id, _ in job.answers), job.correct)),
+                )
+                for job, submission_id in zip(jobs, rows)
+            ], {job.quiz_id: job.max_attempts for job in jobs if job.max_attempts is not None})
+
+        for job in retries:
+            stored[job.ticket] = by_key[job.user_id, job.idempotency_key]
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return stored
+
+
+class SubmissionQueue:
+    """
+    Accepts scored submissions on the request path and stores them from one
+    background writer task.
+    - `submit` only appends to the journal (if any) and to an asyncio queue.
+    - The writer drains up to `batch_size` submissions (waiting at most
+      `max_wait_ms` for the batch to fill) and group-commits them in the threadpool.
+    - A failing batch is retried one submission at a time so a single bad
+      submission (e.g. its quiz was deleted meanwhile) only fails its own ticket,
+      which is recorded in failed_submissions.
+    - On start the journal is replayed; tickets already in the database are skipped.
+      It is truncated whenever everything it holds has been committed, and
+      compacted once it grows past `INGEST_JOURNAL_COMPACT_BYTES` while
+      submissions keep arriving (see _compact_journal).
+    The queue is per worker process, like the quiz cache. So is the journal
+    (see journal_file): each process holds an flock on its own file while it
+    runs, and on start also takes over the journals nobody holds (workers that
+    are gone, a smaller WEB_CONCURRENCY), keeping them locked until their
+    submissions are stored. No journal is ever replayed by two processes.
+    `status` only knows this process's tickets; the status endpoint falls back
+    to the database and to the ticket itself (queued_recently).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = INGEST_BATCH_SIZE,
+        max_wait_ms: float = INGEST_MAX_WAIT_MS,
+        max_pending: int = INGEST_MAX_PENDING,
+        journal_path: str = INGEST_JOURNAL,
+        retry_after: int = INGEST_RETRY_AFTER
+    ):
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_pending
+        self.journal_path = journal_path
+        self.retry_after = retry_after
+        self.pending: Dict[str, PendingSubmission] = {}  # Accepted, not yet stored
+        self.outcomes = LRUCache(INGEST_STATUS_SIZE, ttl=INGEST_TICKET_WINDOW)  # ticket -> (user_id, submission_id or None, error)
+        self.stored = 0
+        self.failed = 0
+        self.batches = 0
+        self.rejected = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._journal = None
+        self._adopted = []  # Journals of other processes being replayed (locked until emptied)
+        self._journal_lock = threading.Lock()
+        self._journal_floor = 0  # Journal size after the last truncation or compaction
+        self._session_factory = None
+
+    # ------------------- Lifecycle -------------------
+    async def start(self, session_factory=None):
+        """
+        Start the writer on the running event loop and replay the journal.
+        `session_factory` defaults to database.SessionLocal.
+        """
+        if self._writer is not None:
+            return
+        if session_factory is None:
+            from database import SessionLocal as session_factory
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue()
+
+        if self.journal_path:
+            self._journal = open(self.journal_file(), "a+", encoding="utf-8")
+            # A worker being replaced may still be shutting down with this file: wait for it
+            await run_in_threadpool(fcntl.flock, self._journal.fileno(), fcntl.LOCK_EX)
+            jobs = self._read_journal(self._journal)
+            for journal in self._adopt_journals():
+                jobs.extend(self._read_journal(journal))
+            for job in jobs:
+                if job.ticket not in self.pending:
+                    self.pending[job.ticket] = job
+                    self._queue.put_nowait(job)
+            if self.pending:
+                logger.info("Replaying %d journaled submissions", len(self.pending))
+
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Store everything still queued, then stop the writer.
+        """
+        if self._writer is None:
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+        if self._journal is not None:
+            self._journal.close()  # Releases the flock
+            self._journal = None
+        for journal in self._adopted:
+            journal.close()
+        self._adopted = []
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None
+
+    # ------------------- Request path -------------------
+    async def submit(
+        self,
+        user_id: int,
+        quiz_id: int,
+        score: float,
+        answers: List[Tuple[int, str]],
+        correct: List[bool],
+        idempotency_key: Optional[str] = None,
+        max_attempts: Optional[int] = None
+    ) -> str:
+        """
+        Accept a validated, scored submission and return its ticket.
+        Raises IngestQueueFull when too many submissions are waiting.
+        """
+        if self._writer is None:
+            await self.start()
+        if len(self.pending) >= self.max_pending:
+            self.rejected += 1
+            raise IngestQueueFull(self.retry_after)
+
+        job = PendingSubmission(
+            ticket=new_ticket(user_id), user_id=user_id, quiz_id=quiz_id, score=score,
+            submitted_at=datetime.utcnow().isoformat(), answers=list(answers), correct=list(correct),
+            idempotency_key=idempotency_key, max_attempts=max_attempts,
+        )
+        self.pending[job.ticket] = job  # Before journaling: truncation and compaction keep what is pending
+        if self._journal is not None:
+            line = self._journal_line(job)
+            try:
+                if INGEST_JOURNAL_FSYNC:
+                    await run_in_threadpool(self._append, line)
+                else:
+                    self._append(line)
+            except Exception:
+                del self.pending[job.ticket]
+                raise
+
+        self._queue.put_nowait(job)
+        return job.ticket
+
+    def status(self, ticket: str) -> Optional[dict]:
+        """
+        In-memory state of a ticket: {"status": "queued" | "stored" | "failed", ...},
+        or None if this process does not know it (look it up in the database,
+        then check queued_recently).
+        """
+        job = self.pending.get(ticket)
+        if job is not None:
+            return {"status": "queued", "user_id": job.user_id}
+        outcome = self.outcomes.get(ticket)
+        if outcome is None:
+            return None
+        user_id, submission_id, error = outcome
+        if error is not None:
+            return {"status": "failed", "user_id": user_id, "detail": error}
+        return {"status": "stored", "user_id": user_id, "submission_id": submission_id}
+
+    # ------------------- Journal -------------------
+    @staticmethod
+    def _journal_line(job: PendingSubmission) -> str:
+        return json.dumps(asdict(job), separators=(",", ":")) + "\n"
+
+    def _append(self, line: str):
+        with self._journal_lock:
+            self._journal.write(line)
+            self._journal.flush()
+            if INGEST_JOURNAL_FSYNC:
+                os.fsync(self._journal.fileno())
+
+    def journal_file(self) -> str:
+        """
+        Journal of this process: `journal_path`, suffixed with the worker index
+        under serve.py (SERVE_WORKER_INDEX), so a restarted worker finds the
+        journal of the one it replaces.
+        """
+        index = os.getenv("SERVE_WORKER_INDEX")
+        return f"{self.journal_path}.{index}" if index is not None else self.journal_path
+
+    def _adopt_journals(self) -> list:
+        """
+        Open and lock the other processes' journals that nobody holds.
+        """
+        own = os.path.abspath(self.journal_file())
+        candidates = [self.journal_path] + glob.glob(glob.escape(self.journal_path) + ".*")
+        for path in candidates:
+            suffix = path[len(self.journal_path) + 1:]
+            if os.path.abspath(path) == own or (path != self.journal_path and not suffix.isdigit()):
+                continue
+            try:
+                journal = open(path, "r+", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:  # Its worker is running
+                journal.close()
+                continue
+            self._adopted.append(journal)
+        return self._adopted
+
+    @staticmethod
+    def _read_journal(journal) -> List[PendingSubmission]:
+        jobs = {}
+        journal.seek(0)
+        for line in journal:
+            try:
+                record = json.loads(line)
+            except ValueError:  # Torn last line of a crash
+                continue
+            record["answers"] = [tuple(answer) for answer in record["answers"]]
+            jobs[record["ticket"]] = PendingSubmission(**record)
+        journal.seek(0, os.SEEK_END)
+        return list(jobs.values())
+
+    def _truncate_journal(self):
+        with self._journal_lock:
+            if self._journal is not None and not self.pending:
+                self._journal.truncate(0)
+                self._journal.seek(0)
+                self._journal_floor = 0
+                self._release_adopted()
+
+    def _release_adopted(self):
+        for journal in self._adopted:  # Replayed: empty them and let them go
+            journal.truncate(0)
+            journal.close()
+        self._adopted = []
+
+    def _journal_needs_compaction(self) -> bool:
+        # Also wait for it to double since the last compaction, so a large backlog is not rewritten every batch
+        size = os.fstat(self._journal.fileno()).st_size
+        return size > max(INGEST_JOURNAL_COMPACT_BYTES, 2 * self._journal_floor)
+
+    def _compact_journal(self):
+        """
+        Rewrite this process's journal with only the submissions still pending,
+        so it stays bounded under sustained load, when it never drains to empty.
+        - The new file is written and flocked next to it, then renamed over it:
+          the lock moves with it, and a crash leaves either file complete.
+        - Submissions accepted meanwhile wait for the journal lock and are then
+          appended to the new file (they are pending before they are appended).
+        - Adopted journals are emptied and released, their pending submissions
+          being in the new file.
+        """
+        with self._journal_lock:
+            if self._journal is None:
+                return
+            path = self.journal_file()
+            journal = open(path + ".compact", "w", encoding="utf-8")  # Not a journal name: never adopted
+            try:
+                fcntl.flock(journal.fileno(), fcntl.LOCK_EX)
+                journal.writelines(self._journal_line(job) for job in list(self.pending.values()))
+                journal.flush()
+                if INGEST_JOURNAL_FSYNC:
+                    os.fsync(journal.fileno())
+                os.replace(journal.name, path)
+            except Exception:
+                journal.close()
+                raise
+            if INGEST_JOURNAL_FSYNC:  # Make the rename durable too
+                directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+                try:
+                    os.fsync(directory)
+                finally:
+                    os.close(directory)
+            self._journal.close()  # Releases the lock of the replaced file
+            self._journal = journal
+            self._journal_floor = os.fstat(journal.fileno()).st_size
+            self._release_adopted()
+
+    # ------------------- Writer -------------------
+    def _store(self, batch: List[PendingSubmission]) -> Dict[str, object]:
+        """
+        Store a batch; returns ticket -> submission ID, or the error message of a failed ticket.
+        """
+        with self._session_factory() as db:
+            try:
+                return store_batch(db, batch)
+            except OperationalError:  # Database unavailable: the writer retries the batch
+                raise
+            except AttemptsExhausted as e:
+                if len(batch) == 1:
+                    return {batch[0].ticket: str(e)}
+            except Exception:
+                if len(batch) == 1:
+                    logger.exception("Storing submission %s failed", batch[0].ticket)
+                    return {batch[0].ticket: "Submission could not be stored"}
+
+            results = {}
+            for job in batch:  # Isolate the submissions that cannot be stored
+                results.update(self._store([job]))
+            return results
+
+    def _record_failures(self, failures: List[Tuple[PendingSubmission, str]]):
+        with self._session_factory() as db:
+            try:
+                record_failures(db, failures)
+            except Exception:
+                db.rollback()
+                raise
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await run_in_threadpool(self._store, batch)
+            except Exception:  # Database unreachable: keep the batch and try again
+                logger.exception("Storing a batch of %d submissions failed; retrying", len(batch))
+                await asyncio.sleep(1)
+                for job in batch:
+                    self._queue.put_nowait(job)
+                    self._queue.task_done()
+                continue
+
+            self.batches += 1
+            failures = [
+                (job, results.get(job.ticket) or "Submission could not be stored")
+                for job in batch if not isinstance(results.get(job.ticket), int)
+            ]
+            if failures:
+                try:  # Other workers (and this one after a restart) read failures from the database
+                    await run_in_threadpool(self._record_failures, failures)
+                except Exception:
+                    logger.exception("Recording %d failed submissions failed", len(failures))
+
+            for job in batch:
+                result = results.get(job.ticket)
+                if isinstance(result, int):
+                    self.outcomes.put(job.ticket, (job.user_id, result, None), self.outcomes.generation)
+                    self.stored += 1
+                else:
+                    self.outcomes.put(job.ticket, (job.user_id, None, result or "Submission could not be stored"), self.outcomes.generation)
+                    self.failed += 1
+                self.pending.pop(job.ticket, None)
+                self._queue.task_done()
+
+            if self._journal is not None:
+                if not self.pending:
+                    self._truncate_journal()
+                elif self._journal_needs_compaction():
+                    try:
+                        await run_in_threadpool(self._compact_journal)
+                    except Exception:  # Keep appending to the current journal
+                        logger.exception("Compacting the ingest journal failed")
+
+    def stats(self) -> dict:
+        return {
+            "mode": SUBMIT_MODE,
+            "running": self.running,
+            "pending": len(self.pending),
+            "max_pending": self.max_pending,
+            "stored": self.stored,
+            "failed": self.failed,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "journal": self.journal_file() if self.journal_path else None,
+        }
+
+
+# Shared ingestion queue used by the participant routes (SUBMIT_MODE=queue)
+submission_queue = SubmissionQueue()
@@ -0,0 +1,362 @@
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the connection checkout wait histogram buckets
+POOL_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# Upper bounds (seconds) of the request latency histogram buckets
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the SQL statements per request histogram buckets
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Record per-route request metrics (served on GET /metrics)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Log requests slower than this many milliseconds with their SQL (0 = off)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Statements kept per request for the slow request log
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "50"))
+
+
+class PoolMetrics:
+    """
+    Connection pool usage of one engine.
+    - Checkout wait: time spent in the pool waiting for (or opening) a connection.
+    - In use: connections currently checked out, and the peak seen so far.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(POOL_WAIT_BUCKETS) + 1)  # Last bucket is +Inf
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.timeouts += timed_out
+            for i, bound in enumerate(POOL_WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def _on_checkout(self, *args):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def _on_checkin(self, *args):
+        with self._lock:
+            self.in_use -= 1
+
+    def attach(self, engine):
+        """
+        Track checkouts/checkins of a (sync) engine's pool.
+        """
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sum(self.wait_buckets)
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "wait_seconds_avg": round(self.wait_total / waits, 6) if waits else 0.0,
+                "wait_histogram": {
+                    **{f"le_{bound}": count for bound, count in zip(POOL_WAIT_BUCKETS, self.wait_buckets)},
+                    "le_inf": self.wait_buckets[-1],
+                },
+            }
+
+
+def timed_pool(pool_class, metrics: PoolMetrics):
+    """
+    Subclass a SQLAlchemy pool class so every connection request records how
+    long it waited in `metrics` (including pool timeouts).
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return pool_class._do_get(self)
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            metrics.record_wait(waited, timed_out=timed_out)
+            stats = current_request.get()
+            if stats is not None:  # Also charge the wait to the request being served
+                stats.pool_wait += waited
+
+    return type(f"Timed{pool_class.__name__}", (pool_class,), {"_do_get": _do_get})
+
+
+# Pool metrics of the application engines, filled in by database.py
+pool_metrics = {}
+
+
+# ------------------- Per-request metrics -------------------
+class RequestStats:
+    """
+    Database work of the request being served. Set by RequestMetricsMiddleware
+    in a context variable, which follows the request into run_sync (event loop
+    greenlet or threadpool worker), and filled in by the engine event hooks.
+    """
+
+    def __init__(self, capture_sql: bool = False):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.pool_wait = 0.0
+        self.sql: Optional[List[Tuple[str, float]]] = [] if capture_sql else None  # For the slow request log
+
+
+# RequestStats of the current request (None outside requests, e.g. the ingestion writer)
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_start"].pop()
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        if stats.sql is not None and len(stats.sql) < SLOW_REQUEST_MAX_STATEMENTS:
+            stats.sql.append((statement, elapsed))
+
+
+def _on_error(context):
+    starts = context.connection.info.get("metrics_start") if context.connection is not None else None
+    if starts:  # The statement failed: after_cursor_execute will not run
+        starts.pop()
+
+
+def attach_sql_metrics(engine):
+    """
+    Count the statements and database time of each request on a (sync) engine.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return  # Already attached
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _on_error)
+
+
+class Histogram:
+    """
+    Cumulative-on-export histogram with fixed upper bounds (last bucket is +Inf).
+    Not locked: callers hold their own lock.
+    """
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+
+class RouteMetrics:
+    """
+    Requests of one (method, route template).
+    """
+
+    def __init__(self):
+        self.latency = Histogram(REQUEST_LATENCY_BUCKETS)
+        self.statements = Histogram(SQL_COUNT_BUCKETS)
+        self.db_seconds = 0.0
+        self.pool_wait = 0.0
+        self.responses: Dict[int, int] = {}  # Status code -> count
+
+
+class RequestMetrics:
+    """
+    Per-route latency, SQL statement count, database time and pool wait of
+    this worker process, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        with self._lock:
+            metrics = self.routes.get((method, route))
+            if metrics is None:
+                metrics = self.routes[(method, route)] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.statements.observe(stats.statements)
+            metrics.db_seconds += stats.db_seconds
+            metrics.pool_wait += stats.pool_wait
+            metrics.responses[status] = metrics.responses.get(status, 0) + 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            routes = sorted(self.routes.items())
+            lines += [
+                "# HELP http_requests_total Requests served, by route and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route), metrics in routes:
+                for status, count in sorted(metrics.responses.items()):
+                    lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            _histogram(lines, "http_request_duration_seconds", "Request latency.", [
+                (_labels(method=method, route=route), metrics.latency) for (method, route), metrics in routes
+            ])
+            _histogram(lines, "http_request_sql_statements", "SQL statements executed per request.", [
+                (_labels(method=method, route=route), metrics.statements) for (method, route), metrics in routes
+            ])
+            lines += [
+                "# HELP http_request_db_seconds_total Time spent executing SQL statements.",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            lines += [
+                f"http_request_db_seconds_total{_labels(method=method, route=route)} {metrics.db_seconds:.6f}"
+                for (method, route), metrics in routes
+            ]
+            lines += [
+                "# HELP http_request_pool_wait_seconds_total Time spent waiting for a pooled connection.",
+                "# TYPE http_request_pool_wait_seconds_total counter",
+            ]
+            lines += [
+                f"http_request_pool_wait_seconds_total{_labels(method=method, route=route)} {metrics.pool_wait:.6f}"
+                for (method, route), metrics in routes
+            ]
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels) -> str:
+    # Prometheus label set, values escaped
+    escaped = (
+        name + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _histogram(lines: list, name: str, help_text: str, series: list):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        base = labels[:-1] + "," if labels != "{}" else "{"
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{base}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{base}le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{labels} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+
+
+def render_pool_metrics() -> str:
+    """
+    Pool metrics of the application engines in the Prometheus text format.
+    """
+    lines = []
+    series = []
+    for name, metrics in list(pool_metrics.items()):
+        with metrics._lock:
+            histogram = Histogram(POOL_WAIT_BUCKETS)
+            histogram.buckets = list(metrics.wait_buckets)
+            histogram.sum = metrics.wait_total
+            histogram.count = sum(metrics.wait_buckets)
+            series.append((name, metrics.checkouts, metrics.timeouts, metrics.in_use, histogram))
+
+    _histogram(lines, "db_pool_checkout_wait_seconds", "Time spent waiting for (or opening) a pooled connection.", [
+        (_labels(pool=name), histogram) for name, _, _, _, histogram in series
+    ])
+    for metric, kind, help_text, index in (
+        ("db_pool_checkouts_total", "counter", "Connections checked out of the pool.", 1),
+        ("db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.", 2),
+        ("db_pool_connections_in_use", "gauge", "Connections currently checked out.", 3),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f"{metric}{_labels(pool=row[0])} {row[index]}" for row in series]
+    return "\n".join(lines) + "\n"
+
+
+def _log_slow_request(method: str, path: str, status: int, seconds: float, stats: RequestStats):
+    statements = "".join(
+        f"\n  {elapsed * 1000:8.2f}ms  {' '.join(statement.split())}" for statement, elapsed in stats.sql
+    )
+    if stats.statements > len(stats.sql):
+        statements += f"\n  ... {stats.statements - len(stats.sql)} more statements"
+    logger.warning(
+        "Slow request %s %s -> %d in %.1fms (sql=%d, db=%.1fms, pool_wait=%.1fms)%s",
+        method, path, status, seconds * 1000, stats.statements, stats.db_seconds * 1000, stats.pool_wait * 1000,
+        statements,
+    )
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording every HTTP request in `request_metrics`, keyed by
+    its route template (e.g. /participant/result/{quiz_id}), and logging
+    requests slower than SLOW_REQUEST_MS together with the SQL they ran.
+    """
+
+    def __init__(self, app, metrics: "RequestMetrics" = None):
+        self.app = app
+        self.metrics = metrics if metrics is not None else request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(capture_sql=SLOW_REQUEST_MS > 0)
+        token = current_request.set(stats)
+        status = 500  # Unless the app starts a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.observe(scope["method"], route, status, elapsed, stats)
+            if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+                _log_slow_request(scope["method"], scope["path"], status, elapsed, stats)
+
+
+# Request metrics of the application, served on GET /metrics
+request_metrics = RequestMetrics()
@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import logging
+import os
+import re
+import zlib
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+# Monthly partitions kept ready ahead of the current month (PostgreSQL, see migration 0007)
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+# Seconds between partition checks (0 = only once, shortly after startup)
+PARTITION_CHECK_INTERVAL = float(os.getenv("PARTITION_CHECK_INTERVAL", "3600"))
+# "auto": the app keeps partitions ready from one process (worker 0 of serve.py, or the
+# only process); "off": only `python -m utils.partitions` does, e.g. from cron
+PARTITION_MAINTENANCE = os.getenv("PARTITION_MAINTENANCE", "auto")
+
+# Partitioned tables, referenced table first; both are partitioned by submitted_at month
+PARTITIONED_TABLES = ("submissions", "submission_answers")
+# Advisory lock serializing partition changes (creation, archival) across workers
+PARTITION_LOCK_ID = 7_240_001
+
+PARTITION_BOUND = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})")
+
+
+class DuplicateSubmission(Exception):
+    """
+    Raised when the user already stored a submission under the same Idempotency-Key.
+    """
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    """
+    Whether `submissions` is a partitioned table (PostgreSQL after migration 0007).
+    """
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('submissions'))"
+    )).scalar()
+
+
+def list_partitions(conn: Connection, table: str = "submissions") -> Dict[date, str]:
+    """
+    Month -> partition name of the monthly partitions attached to `table`.
+    """
+    rows = conn.execute(text("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:table)
+    """), {"table": table})
+    partitions = {}
+    for name, bound in rows:
+        match = PARTITION_BOUND.search(bound or "")
+        if match:
+            partitions[date.fromisoformat(match[1])] = name
+    return partitions
+
+
+def create_partitions(conn: Connection, month: date):
+    """
+    Create and attach the partitions of `month` in both tables. Rows of that
+    month already in the DEFAULT partitions are moved into them first (answers
+    before submissions, so the foreign key holds at every step).
+    """
+    bounds = {"lo": datetime(month.year, month.month, 1), "hi": datetime.combine(add_months(month, 1), datetime.min.time())}
+    for table in PARTITIONED_TABLES:
+        conn.execute(text(f"CREATE TABLE {partition_name(table, month)} (LIKE {table} INCLUDING DEFAULTS)"))
+    for table in reversed(PARTITIONED_TABLES):
+        if conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": f"{table}_default"}).scalar():
+            conn.execute(text(f"""
+                WITH moved AS (
+                    DELETE FROM {table}_default WHERE submitted_at >= :lo AND submitted_at < :hi RETURNING *
+                )
+                INSERT INTO {partition_name(table, month)} SELECT * FROM moved
+            """), bounds)
+    for table in PARTITIONED_TABLES:
+        conn.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {partition_name(table, month)} "
+            f"FOR VALUES FROM ('{bounds['lo']}') TO ('{bounds['hi']}')"
+        ))
+
+
+def ensure_partitions(conn: Connection, months_ahead: int = PARTITION_PREMAKE_MONTHS, now: Optional[datetime] = None) -> List[str]:
+    """
+    Create the missing partitions from the current month to `months_ahead`
+    months later, inside the caller's transaction. Returns the months created
+    (as partition names of `submissions`); nothing to do when not partitioned.
+    """
+    if not is_partitioned(conn):
+        return []
+    conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": PARTITION_LOCK_ID})
+    existing = list_partitions(conn)
+    current = month_start(now or datetime.utcnow())
+    created = []
+    for month in (add_months(current, i) for i in range(months_ahead + 1)):
+        if month not in existing:
+            create_partitions(conn, month)
+            created.append(partition_name("submissions", month))
+    return created
+
+
+def lock_idempotency_keys(db: Session, keys: Iterable[Tuple[int, str]]):
+    """
+    Serialize the writers of the same (user_id, Idempotency-Key) until the
+    transaction ends, so the one that comes second sees the first one's row.
+    This is the only guard against storing a key twice, on every database: the
+    (user_id, idempotency_key) index is not unique, as unique indexes of a
+    partitioned table only hold within a partition. Callers look for the key
+    after taking the lock.
+    - PostgreSQL: one advisory lock per key, taken in sorted order.
+    - SQLite: the database write lock (one writer at a time), taken now
+      rather than at the first insert.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    if db.get_bind().dialect.name != "postgresql":
+        db.execute(text("UPDATE submissions SET idempotency_key = idempotency_key WHERE 0 = 1"))
+        return
+    for user_id, key in keys:
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(:user_id, :key)"),
+            {"user_id": user_id, "key": zlib.crc32(key.encode()) - 2 ** 31},
+        )
+
+
+def partition_stats(conn: Connection) -> dict:
+    """
+    Attached monthly partitions with their estimated rows, and the rows that
+    fell into the DEFAULT partition (should stay 0).
+    """
+    if not is_partitioned(conn):
+        return {"partitioned": False, "partitions": [], "default_rows": 0}
+    estimates = dict(conn.execute(text("""
+        SELECT c.relname, greatest(c.reltuples, 0)::bigint
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('submissions')
+    """)).all())
+    default_rows = 0
+    if conn.execute(text("SELECT to_regclass('submissions_default') IS NOT NULL")).scalar():
+        default_rows = conn.execute(text("SELECT count(*) FROM submissions_default")).scalar()
+    return {
+        "partitioned": True,
+        "partitions": [
+            {"month": month.isoformat(), "name": name, "estimated_submissions": estimates.get(name, 0)}
+            for month, name in sorted(list_partitions(conn).items())
+        ],
+        "default_rows": default_rows,
+    }
+
+
+class PartitionMaintainer:
+    """
+    Keeps PARTITION_PREMAKE_MONTHS monthly partitions ready: in the background
+    right after startup (startup itself does no database work), then every
+    `interval` seconds.
+    - Runs in one process of the host only: worker 0 of serve.py, or the app
+      when it is not started by serve.py. With `uvicorn --workers`, set
+      PARTITION_MAINTENANCE=off and run `python -m utils.partitions` from cron.
+    - Concurrent runs (e.g. several hosts) serialize on an advisory lock and find the work done.
+    A missed month is not fatal: its rows land in the DEFAULT partition and are
+    moved out when it is created.
+    """
+
+    def __init__(self, bind=engine, months_ahead: int = PARTITION_PREMAKE_MONTHS, interval: float = PARTITION_CHECK_INTERVAL):
+        self.bind = bind
+        self.months_ahead = months_ahead
+        self.interval = interval
+        self.created: List[str] = []
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def run(self) -> List[str]:
+        with self.bind.begin() as conn:
+            created = ensure_partitions(conn, self.months_ahead)
+        if created:
+            logger.info("Created partitions %s", ", ".join(created))
+        self.created.extend(created)
+        return created
+
+    async def _run_once(self):
+        try:
+            await run_in_threadpool(self.run)
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            logger.warning("Partition maintenance failed: %s", e)
+
+    @staticmethod
+    def enabled() -> bool:
+        # SERVE_WORKER_INDEX is set by serve.py in each worker, after the app was imported
+        return PARTITION_MAINTENANCE == "auto" and os.getenv("SERVE_WORKER_INDEX", "0") == "0"
+
+    async def start(self):
+        if self.bind.dialect.name != "postgresql" or self._task is not None or not self.enabled():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._run_once()
+            if self.interval <= 0:
+                return
+            await asyncio.sleep(self.interval)
+
+
+# Partition maintenance of this worker process (started by the app's lifespan)
+partition_maintainer = PartitionMaintainer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the coming months' partitions of the submission tables (PostgreSQL).")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_PREMAKE_MONTHS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    created = PartitionMaintainer(months_ahead=args.months_ahead).run()
+    print(f"Created {', '.join(created)}" if created else "Partitions are ready")
+
+
+if __name__ == "__main__":
+    main()
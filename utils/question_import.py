@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from models.question import Question
+from models.quiz import Quiz
+from schemas.question import QuestionCreate
+
+# Largest number of questions accepted by one import
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "10000"))
+# Largest payload accepted by one import, in bytes (checked while it is received)
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(16 * 1024 * 1024)))
+# Use COPY on PostgreSQL when the driver supports it (psycopg2 / psycopg 3 / asyncpg)
+IMPORT_USE_COPY = os.getenv("IMPORT_USE_COPY", "1") == "1"
+
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+
+
+class ImportPayloadError(ValueError):
+    """
+    Raised when the payload as a whole cannot be read (bad encoding, not a
+    JSON array, too many rows). The message is safe to return to the client.
+    """
+
+
+class ImportPayloadTooLarge(ImportPayloadError):
+    """
+    Raised as soon as a payload passes IMPORT_MAX_BYTES.
+    """
+
+
+async def read_payload(chunks: AsyncIterator[bytes], limit: int = IMPORT_MAX_BYTES) -> bytes:
+    """
+    Join the chunks of a request body or upload, giving up as soon as they
+    pass `limit` bytes rather than after buffering all of it.
+    """
+    data = bytearray()
+    async for chunk in chunks:
+        data += chunk
+        if len(data) > limit:
+            raise ImportPayloadTooLarge(f"Payload too large (at most {limit} bytes per import)")
+    return bytes(data)
+
+
+def detect_format(content_type: Optional[str], filename: Optional[str] = None) -> Optional[str]:
+    """
+    Guess the payload format from a file extension or a Content-Type.
+    """
+    if filename and "." in filename:
+        extension = filename.rsplit(".", 1)[1].lower()
+        if extension in ("jsonl", "ndjson"):
+            return "ndjson"
+        if extension in ("json", "csv"):
+            return extension
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        return "ndjson"
+    if content_type == "application/json":
+        return "json"
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+
+def parse_rows(data: bytes, fmt: str) -> List[Tuple[int, object]]:
+    """
+    Split a payload into (row number, raw row) pairs. Row numbers are 1-based
+    (CSV rows are counted after the header). A row that cannot be decoded is
+    returned as an ImportPayloadError so it is reported with the other row errors.
+    NDJSON and CSV stop at the first row over IMPORT_MAX_ROWS.
+    """
+    too_many = ImportPayloadError(f"Too many questions (at most {IMPORT_MAX_ROWS} per import)")
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportPayloadError("Payload is not valid UTF-8")
+
+    if fmt == "json":
+        try:
+            items = json.loads(text)
+        except ValueError as e:
+            raise ImportPayloadError(f"Invalid JSON: {e}")
+        if not isinstance(items, list):
+            raise ImportPayloadError("Expected a JSON array of questions")
+        rows = list(enumerate(items, start=1))
+
+    elif fmt == "ndjson":
+        rows = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            if len(rows) == IMPORT_MAX_ROWS:
+                raise too_many
+            try:
+                rows.append((number, json.loads(line)))
+            except ValueError as e:
+                rows.append((number, ImportPayloadError(f"Invalid JSON: {e}")))
+
+    else:  # CSV: quiz_id, statement, options (a JSON object), correct_answer
+        rows = []
+        for number, record in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            if len(rows) == IMPORT_MAX_ROWS:
+                raise too_many
+            row = {key: value for key, value in record.items() if key is not None and value not in (None, "")}
+            if "options" in row:
+                try:
+                    row["options"] = json.loads(row["options"])
+                except ValueError:
+                    rows.append((number, ImportPayloadError("options must be a JSON object")))
+                    continue
+            rows.append((number, row))
+
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise too_many
+    return rows
+
+
+def validate_rows(
+    db: Session,
+    rows: List[Tuple[int, object]],
+    created_by: int,
+    default_quiz_id: Optional[int] = None
+) -> Tuple[List[QuestionCreate], List[dict]]:
+    """
+    Validate every row and check quiz ownership with one query for the whole payload.
+    Returns the valid questions and the per-row errors ({"row", "errors"}).
+    """
+    questions = []
+    numbers = []
+    errors = []
+    for number, raw in rows:
+        if isinstance(raw, ImportPayloadError):
+            errors.append({"row": number, "errors": [str(raw)]})
+            continue
+        if not isinstance(raw, dict):
+            errors.append({"row": number, "errors": ["Expected an object"]})
+            continue
+        if default_quiz_id is not None:
+            raw = {"quiz_id": default_quiz_id, **raw}
+        try:
+            question = QuestionCreate(**raw)
+        except ValidationError as e:
+            errors.append({"row": number, "errors": [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ]})
+            continue
+        if question.correct_answer not in question.options:
+            errors.append({"row": number, "errors": ["correct_answer must be one of the options"]})
+            continue
+        questions.append(question)
+        numbers.append(number)
+
+    # Ownership of every referenced quiz, checked once
+    quiz_ids = {question.quiz_id for question in questions}
+    owned = set(db.execute(
+        select(Quiz.id).where(Quiz.id.in_(quiz_ids), Quiz.created_by == created_by)
+    ).scalars()) if quiz_ids else set()
+
+    valid = []
+    for number, question in zip(numbers, questions):
+        if question.quiz_id in owned:
+            valid.append(question)
+        else:
+            errors.append({"row": number, "errors": ["Invalid quiz or not your quiz"]})
+    errors.sort(key=lambda error: error["row"])
+    return valid, errors
+
+
+def _copy_questions(db: Session, questions: List[QuestionCreate]) -> bool:
+    """
+    Load the questions with COPY inside the session's transaction.
+    Returns False when the driver has no COPY support.
+    """
+    dbapi_connection = db.connection().connection.dbapi_connection
+    if db.get_bind().dialect.driver == "asyncpg":
+        # Behind run_sync: the raw asyncpg connection's binary COPY, awaited from the sync greenlet
+        await_only(dbapi_connection.driver_connection.copy_records_to_table(
+            "questions",
+            records=[(q.quiz_id, q.statement, json.dumps(q.options), q.correct_answer) for q in questions],
+            columns=["quiz_id", "statement", "options", "correct_answer"],
+        ))
+        return True
+    cursor = dbapi_connection.cursor()
+    statement = "COPY questions (quiz_id, statement, options, correct_answer) FROM STDIN"
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for q in questions:
+                writer.writerow((q.quiz_id, q.statement, json.dumps(q.options), q.correct_answer))
+            buffer.seek(0)
+            cursor.copy_expert(statement + " WITH (FORMAT csv)", buffer)
+            return True
+        if hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(statement) as copy:
+                for q in questions:
+                    copy.write_row((q.quiz_id, q.statement, json.dumps(q.options), q.correct_answer))
+            return True
+        return False
+    finally:
+        cursor.close()
+
+
+def insert_questions(db: Session, questions: List[QuestionCreate]) -> str:
+    """
+    Insert all questions in the current transaction (the caller commits).
+    Uses COPY on PostgreSQL when available, else one executemany that
+    SQLAlchemy batches into multi-row INSERTs. Returns the method used.
+    """
+    if not questions:
+        return "none"
+    if IMPORT_USE_COPY and db.get_bind().dialect.name == "postgresql" and _copy_questions(db, questions):
+        return "copy"
+    db.execute(insert(Question), [
+        {"quiz_id": q.quiz_id, "statement": q.statement, "options": q.options, "correct_answer": q.correct_answer}
+        for q in questions
+    ])
+    return "insert"
@@ -0,0 +1,356 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+# Token-bucket limits per route as "requests/seconds" (burst = requests, "0" = unlimited)
+RATE_LIMITS = {
+    "login": os.getenv("RATE_LIMIT_LOGIN", "10/60"),  # POST /auth/token, per client IP and username
+    "login_user": os.getenv("RATE_LIMIT_LOGIN_USER", "100/3600"),  # POST /auth/token, per username from any IP
+    "login_ip": os.getenv("RATE_LIMIT_LOGIN_IP", "0"),  # POST /auth/token, per client IP
+    "register_ip": os.getenv("RATE_LIMIT_REGISTER_IP", "0"),  # POST /auth/register, per client IP
+    "submit": os.getenv("RATE_LIMIT_SUBMIT", "30/60"),  # POST /participant/submit, per user ID (JWT claim)
+}
+# Per-subject overrides, e.g. "submit:42=120/60,login_user:loadtest=0"
+RATE_LIMIT_OVERRIDES = os.getenv("RATE_LIMIT_OVERRIDES", "")
+# "memory": buckets per worker process; "shared": one table in a memory-mapped file
+# shared by every worker on the host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Lock shards and tracked keys of the in-memory backend
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# File and number of slots of the shared backend
+RATE_LIMIT_SHARED_PATH = os.getenv(
+    "RATE_LIMIT_SHARED_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "quiz-api-ratelimit"),
+)
+RATE_LIMIT_SHARED_SLOTS = int(os.getenv("RATE_LIMIT_SHARED_SLOTS", "65536"))
+
+# Requests handled at once per worker before new ones wait (0 = no admission control)
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "0"))
+# Requests allowed to wait for a slot; beyond that they are refused at once
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "100"))
+# Milliseconds a request waits for a slot before it is refused
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "1000"))
+# Seconds a refused client is asked to wait
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Paths never refused (probes and scrapes must work under load)
+ADMISSION_EXEMPT_PATHS = ("/health", "/metrics")
+
+
+def parse_limit(spec: str) -> Optional[Tuple[float, float]]:
+    """
+    Parse "requests/seconds" into (capacity, refill rate per second); None for "0" or "".
+    """
+    if not spec or spec.strip() == "0":
+        return None
+    requests, _, seconds = spec.partition("/")
+    capacity = float(requests)
+    return capacity, capacity / float(seconds or 1)
+
+
+def refill(tokens: float, last: float, now: float, capacity: float, rate: float, cost: float) -> Tuple[float, float]:
+    """
+    Token-bucket step: returns (tokens left, seconds to wait). The request is
+    allowed when the wait is 0, and its cost is only taken in that case.
+    """
+    tokens = min(capacity, tokens + (now - last) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+def full_at(tokens: float, now: float, capacity: float, rate: float) -> float:
+    """
+    When a bucket is back to capacity. From then on it is the same as a new
+    one, so its key can be forgotten without resetting anybody's limit.
+    """
+    return now + (capacity - tokens) / rate
+
+
+# ------------------- Backends -------------------
+class MemoryBuckets:
+    """
+    Token buckets of this worker process, sharded over several locks so
+    concurrent threads rarely contend. Each shard keeps up to max_keys / shards
+    keys, in least recently used order.
+    - A full shard forgets its least recently used key once that bucket is
+      back to capacity.
+    - Until then new keys are refused (fails closed): rotating keys must not
+      reset the limits of the keys already tracked.
+    """
+
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.shards = [OrderedDict() for _ in range(shards)]  # key -> (tokens, last refill, full at)
+        self.locks = [threading.Lock() for _ in range(shards)]
+        self.max_keys = max(max_keys // shards, 1)
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        index = hash(key) % len(self.shards)
+        shard = self.shards[index]
+        with self.locks[index]:
+            now = time.monotonic()
+            if key in shard:
+                tokens, last, _ = shard.pop(key)
+            elif len(shard) >= self.max_keys:
+                _, _, oldest_full_at = next(iter(shard.values()))
+                if oldest_full_at > now:
+                    return oldest_full_at - now
+                shard.popitem(last=False)
+                tokens, last = capacity, now
+            else:
+                tokens, last = capacity, now
+            tokens, wait = refill(tokens, last, now, capacity, rate, cost)
+            shard[key] = (tokens, now, full_at(tokens, now, capacity, rate))
+            return wait
+
+
+class SharedMemoryBuckets:
+    """
+    Token buckets in a memory-mapped file (on /dev/shm by default), shared by
+    every worker process of the host however they were started.
+    - The file is an open-addressed table of (key hash, tokens, last refill,
+      full at) slots, grouped in buckets of BUCKET_SLOTS; a key lives in one bucket.
+    - A bucket is locked with an fcntl byte-range lock (across processes)
+      plus a thread lock (fcntl locks are per process).
+    - A new key takes an empty slot or one whose bucket is back to capacity.
+      When there is none, the key is refused until one frees up (fails
+      closed): rotating keys must not reset the limits of the keys already tracked.
+    Timestamps are CLOCK_MONOTONIC, which all processes of the host share.
+    """
+
+    SLOT = struct.Struct("<Qddd")
+    BUCKET_SLOTS = 8
+
+    def __init__(self, path: str = RATE_LIMIT_SHARED_PATH, slots: int = RATE_LIMIT_SHARED_SLOTS):
+        self.buckets = max(slots // self.BUCKET_SLOTS, 1)
+        self.bucket_size = self.SLOT.size * self.BUCKET_SLOTS
+        size = self.buckets * self.bucket_size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < size:
+            os.ftruncate(self.fd, size)  # New pages read as zeroes: empty slots
+        self.map = mmap.mmap(self.fd, size)
+        self.lock = threading.Lock()
+
+    def acquire(self, key: str, capacity: float, rate: float, cost: float = 1.0) -> float:
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        start = (key_hash % self.buckets) * self.bucket_size
+        with self.lock:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, self.bucket_size, start)
+            try:
+                now = time.monotonic()
+                slot, free, first_free_at = None, None, float("inf")
+                for offset in range(start, start + self.bucket_size, self.SLOT.size):
+                    slot_hash, tokens, last, slot_full_at = self.SLOT.unpack_from(self.map, offset)
+                    if slot_hash == key_hash:
+                        slot = offset
+                        break
+                    if free is None and (slot_hash == 0 or slot_full_at <= now):
+                        free = offset
+                    first_free_at = min(first_free_at, slot_full_at)
+                if slot is None:
+                    if free is None:
+                        return first_free_at - now
+                    slot, tokens, last = free, capacity, now
+
+                tokens, wait = refill(tokens, last, now, capacity, rate, cost)
+                self.SLOT.pack_into(self.map, slot, key_hash, tokens, now, full_at(tokens, now, capacity, rate))
+                return wait
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, self.bucket_size, start)
+
+
+# ------------------- Rate limiter -------------------
+class RateLimited(Exception):
+    """
+    Raised when a subject exceeded its limit on a route.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit exceeded")
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Applies the per-route limits of RATE_LIMITS (and per-subject overrides) on a
+    pluggable bucket backend: anything with `acquire(key, capacity, rate, cost)
+    -> seconds to wait` works, e.g. a Redis script for multi-host deployments.
+    """
+
+    def __init__(self, backend, limits: Dict[str, str] = None, overrides: str = RATE_LIMIT_OVERRIDES):
+        self.backend = backend
+        self.specs = dict(limits or RATE_LIMITS)
+        self.limits = {route: parse_limit(spec) for route, spec in self.specs.items()}
+        self.overrides = {}
+        for entry in filter(None, (item.strip() for item in overrides.split(","))):
+            target, _, spec = entry.partition("=")
+            route, _, subject = target.partition(":")
+            self.overrides[(route, subject)] = parse_limit(spec)
+        self.allowed = 0
+        self.limited: Dict[str, int] = {}
+
+    def check(self, route: str, subject, cost: float = 1.0):
+        """
+        Take `cost` tokens from the bucket of `subject` on `route`.
+        Raises RateLimited with the seconds until enough tokens are back.
+        """
+        subject = str(subject)
+        limit = self.overrides.get((route, subject), self.limits.get(route))
+        if limit is None:
+            return
+        wait = self.backend.acquire(f"{route}:{subject}", *limit, cost)
+        if wait > 0:
+            self.limited[route] = self.limited.get(route, 0) + 1
+            raise RateLimited(wait)
+        self.allowed += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "limits": self.specs,
+            "allowed": self.allowed,
+            "limited": dict(self.limited),
+        }
+
+
+def enforce(route: str, subject, cost: float = 1.0):
+    """
+    `rate_limiter.check` for route dependencies: answers 429 with Retry-After.
+    """
+    try:
+        rate_limiter.check(route, subject, cost)
+    except RateLimited as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(max(int(e.retry_after + 0.999), 1))},
+        )
+
+
+# ------------------- Admission control -------------------
+class AdmissionController:
+    """
+    ASGI middleware bounding the requests a worker handles at once.
+    - Up to `max_inflight` requests run; up to `max_queue` more wait at most
+      `queue_timeout_ms` for a slot.
+    - Anything beyond is refused immediately with 503 and Retry-After, so
+      overload turns into fast rejections instead of requests piling up on
+      the connection pool until its timeout.
+    Health probes and metrics scrapes are never refused.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_inflight: int = ADMISSION_MAX_INFLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout_ms: float = ADMISSION_QUEUE_TIMEOUT_MS,
+        retry_after: int = ADMISSION_RETRY_AFTER
+    ):
+        self.app = app
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.retry_after = retry_after
+        self.inflight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        admission_controllers.append(self)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_inflight <= 0 or scope["path"].startswith(ADMISSION_EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_inflight)
+
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                await self._reject(send)
+                return
+            self.waiting += 1
+            try:
+                admitted = await self._wait_for_slot()
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                await self._reject(send)
+                return
+        else:
+            await self._slots.acquire()
+
+        self.inflight += 1
+        self.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.inflight -= 1
+            self._slots.release()
+
+    async def _wait_for_slot(self) -> bool:
+        """
+        Wait at most `queue_timeout` for a slot; True once it is held.
+        The acquire runs as its own task behind a shield, so a timeout (or the
+        request being cancelled) as the slot is granted hands it back instead
+        of losing it, which wait_for on the acquire itself can do.
+        """
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), self.queue_timeout)
+            return True
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            acquire.cancel()
+            try:
+                await acquire
+            except asyncio.CancelledError:
+                pass
+            else:
+                self._slots.release()  # Granted before the cancellation reached it
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return False
+
+    async def _reject(self, send):
+        self.rejected += 1
+        body = json.dumps({"detail": "Server busy, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+# Admission controllers of the running app (filled in when the middleware is built)
+admission_controllers = []
+
+# Shared limiter used by the auth and participant routes
+rate_limiter = RateLimiter(SharedMemoryBuckets() if RATE_LIMIT_BACKEND == "shared" else MemoryBuckets())
@@ -0,0 +1,348 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import math
+import os
+import time
+from typing import List, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError, OperationalError, TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from database import DB_MODE, ThreadedSession, engine_options, get_session
+from utils.cache import LRUCache, shared_counters
+from utils.metrics import PoolMetrics, pool_metrics, attach_sql_metrics
+from utils.security import SECRET_KEY, get_current_participant
+
+logger = logging.getLogger(__name__)
+
+# Read replicas, comma separated (empty: every query goes to DATABASE_URL)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Same replicas for async mode (default: the URLs above through asyncpg)
+ASYNC_DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("ASYNC_DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Seconds between replica health checks
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+# Replication lag (PostgreSQL standbys) beyond which a replica is skipped (0 = never)
+DB_REPLICA_MAX_LAG_MS = float(os.getenv("DB_REPLICA_MAX_LAG_MS", "5000"))
+# Seconds a participant's reads stay on the primary after their own write, and
+# everyone's after an admin changes quizzes (read-your-writes)
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
+
+# Cookie carrying a participant's read-your-writes window to every worker process
+WRITE_MARKER_COOKIE = "read_primary_until"
+
+# Replication lag in milliseconds; 0 when the server is not a standby or has replayed everything it received
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) * 1000, 0)
+    END
+""")
+
+
+def replica_failed(error: Exception) -> bool:
+    """
+    Whether an error means the replica (not the query) failed: unreachable,
+    connection lost, or no pooled connection in time. Such reads are retried on the primary.
+    """
+    if isinstance(error, (OperationalError, PoolTimeout)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class Replica:
+    """
+    Engines (sync, and async in async mode) and health of one read replica.
+    """
+
+    def __init__(self, name: str, url: str, async_url: Optional[str] = None):
+        self.name = name
+        self.url = make_url(url)
+        pool_metrics[name] = PoolMetrics(name)
+        self.engine = create_engine(url, **engine_options(url, pool_metrics[name]))
+        pool_metrics[name].attach(self.engine)
+        attach_sql_metrics(self.engine)
+        self.sessions = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+
+        self.async_engine = None
+        self.async_sessions = None
+        if async_url is not None:
+            metrics = pool_metrics[f"{name}-async"] = PoolMetrics(f"{name}-async")
+            self.async_engine = create_async_engine(async_url, **engine_options(async_url, metrics, is_async=True))
+            metrics.attach(self.async_engine.sync_engine)
+            attach_sql_metrics(self.async_engine.sync_engine)
+            self.async_sessions = async_sessionmaker(self.async_engine, autoflush=False)
+
+        self.healthy = True  # Until a check or a query says otherwise
+        self.lag_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.failovers = 0
+        self.reads = 0
+
+    def check(self):
+        """
+        Ping the replica (and measure its lag on PostgreSQL); update `healthy`.
+        """
+        try:
+            with self.engine.connect() as conn:
+                if self.url.get_backend_name() == "postgresql":
+                    self.lag_ms = float(conn.execute(LAG_QUERY).scalar())
+                else:
+                    conn.execute(text("SELECT 1"))
+                    self.lag_ms = 0.0
+        except Exception as e:
+            if self.healthy:
+                logger.warning("Replica %s is down: %s", self.name, e)
+            self.healthy = False
+            self.last_error = str(e)
+            return
+
+        lagging = DB_REPLICA_MAX_LAG_MS > 0 and self.lag_ms > DB_REPLICA_MAX_LAG_MS
+        if lagging:
+            self.last_error = f"Replication lag {self.lag_ms:.0f}ms"
+            if self.healthy:
+                logger.warning("Replica %s lags %.0fms; reading from the primary", self.name, self.lag_ms)
+        elif not self.healthy:
+            logger.info("Replica %s is back", self.name)
+        self.healthy = not lagging
+
+    def session(self):
+        """
+        New session on the replica, with the same run_sync API as get_session's.
+        """
+        if self.async_sessions is not None:
+            return self.async_sessions()
+        return ThreadedSession(self.sessions())
+
+    def dispose(self, close: bool = True):
+        self.engine.dispose(close=close)
+        if self.async_engine is not None:
+            self.async_engine.sync_engine.dispose(close=close)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url.render_as_string(hide_password=True),
+            "healthy": self.healthy,
+            "lag_ms": self.lag_ms,
+            "last_error": self.last_error,
+            "reads": self.reads,
+            "failovers": self.failovers,
+        }
+
+
+class ReplicaRouter:
+    """
+    Picks the replica serving a read-only request.
+    - Healthy replicas are used round robin; a background task re-checks all of
+      them every `check_interval` seconds (reachable, lag under DB_REPLICA_MAX_LAG_MS).
+    - A replica whose query fails is taken out at once; the read is retried on the primary.
+    - Read-your-writes: after `mark_write(user_id, response)` that participant
+      reads from the primary for `sticky_seconds`; `mark_write()` does so for
+      everyone, in every worker process of the host (quiz content changed, and
+      caches must not refill from a stale replica). The participant's window is also set as a signed cookie
+      (WRITE_MARKER_COOKIE), so it holds on whichever worker process serves the
+      next request; the in-process record covers clients that drop cookies
+      while their keep-alive connection stays on one worker.
+    """
+
+    def __init__(self, replicas: List[Replica], check_interval: float = DB_REPLICA_CHECK_INTERVAL, sticky_seconds: float = DB_REPLICA_STICKY_SECONDS):
+        self.replicas = replicas
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self.sticky = LRUCache(100000, sticky_seconds)  # user_id -> True while their reads stay on the primary
+        self.fenced_until = 0.0  # Every read goes to the primary until then (monotonic)
+        self.primary_reads = 0
+        self._next = 0
+        self._checker: Optional[asyncio.Task] = None
+
+    def pick(self, user_id: Optional[int] = None, marker: Optional[str] = None) -> Optional[Replica]:
+        """
+        Replica for the next read of `user_id`, or None to read from the primary.
+        `marker` is the request's WRITE_MARKER_COOKIE, if any.
+        """
+        if not self.replicas or self.fenced() or (
+            user_id is not None and (self.sticky.get(user_id) is not None or written_recently(marker, user_id))
+        ):
+            self.primary_reads += 1
+            return None
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.healthy:
+                replica.reads += 1
+                return replica
+        self.primary_reads += 1
+        return None
+
+    def mark_write(self, user_id: Optional[int] = None, response: Optional[Response] = None):
+        if not self.replicas:
+            return
+        if user_id is None:
+            self.fenced_until = time.monotonic() + self.sticky_seconds
+            if shared_counters is not None:  # CLOCK_MONOTONIC is the same in every process of the host
+                shared_counters.raise_to("replicas:fenced_until", int(self.fenced_until * 1e9))
+            return
+        self.sticky.put(user_id, True, self.sticky.generation)
+        if response is not None:
+            until = math.ceil(time.time() + self.sticky_seconds)
+            response.set_cookie(
+                WRITE_MARKER_COOKIE, f"{until}.{_marker_signature(user_id, until)}",
+                max_age=math.ceil(self.sticky_seconds), path="/participant", httponly=True, samesite="lax",
+            )
+
+    def fenced(self) -> bool:
+        """
+        True while a quiz change sends every read to the primary.
+        """
+        now = time.monotonic()
+        return now < self.fenced_until or (
+            shared_counters is not None and now * 1e9 < shared_counters.get("replicas:fenced_until")
+        )
+
+    def mark_down(self, replica: Replica, error: Exception):
+        replica.failovers += 1
+        replica.last_error = str(error)
+        if replica.healthy:
+            logger.warning("Replica %s failed, reading from the primary: %s", replica.name, error)
+        replica.healthy = False  # Until the next health check
+
+    async def start(self):
+        if self.replicas and self._checker is None:
+            self._checker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+
+    async def _run(self):
+        while True:
+            for replica in self.replicas:
+                await run_in_threadpool(replica.check)
+            await asyncio.sleep(self.check_interval)
+
+    def dispose(self, close: bool = True):
+        for replica in self.replicas:
+            replica.dispose(close=close)
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [replica.stats() for replica in self.replicas],
+            "primary_reads": self.primary_reads,
+            "sticky_users": self.sticky.stats()["size"],
+            "fenced": self.fenced(),
+        }
+
+
+def _marker_signature(user_id: int, until: int) -> str:
+    return hmac.new(SECRET_KEY.encode(), f"{user_id}.{until}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def written_recently(marker: Optional[str], user_id: int) -> bool:
+    """
+    Whether a WRITE_MARKER_COOKIE value is this user's and still in its window.
+    """
+    if not marker:
+        return False
+    until, _, signature = marker.partition(".")
+    if not until.isdigit() or int(until) < time.time():
+        return False
+    return hmac.compare_digest(signature, _marker_signature(user_id, int(until)))
+
+
+class ReadSession:
+    """
+    Session of a read-only handler: `run_sync` runs on the replica, and runs the
+    function again on the primary session if the replica fails (connection lost,
+    pool timeout). Reads are side-effect free, so running them twice is safe.
+    """
+
+    def __init__(self, replica: Replica, primary):
+        self.replica = replica
+        self.primary = primary
+        self._replica_session = replica.session()
+
+    async def run_sync(self, fn, *args, **kwargs):
+        if self._replica_session is not None:
+            try:
+                return await self._replica_session.run_sync(fn, *args, **kwargs)
+            except (DBAPIError, PoolTimeout) as e:
+                if not replica_failed(e):
+                    raise
+                replica_router.mark_down(self.replica, e)
+                await self.close()
+        return await self.primary.run_sync(fn, *args, **kwargs)
+
+    async def close(self):
+        # Release the replica connection (the primary session belongs to get_session)
+        session, self._replica_session = self._replica_session, None
+        if session is not None:
+            try:
+                await session.close()
+            except Exception:
+                pass  # The connection is already broken
+
+
+def build_replicas() -> List[Replica]:
+    replicas = []
+    for i, url in enumerate(DATABASE_REPLICA_URLS):
+        async_url = None
+        if DB_MODE == "async":
+            async_url = ASYNC_DATABASE_REPLICA_URLS[i] if i < len(ASYNC_DATABASE_REPLICA_URLS) else (
+                make_url(url).set(drivername="postgresql+asyncpg")
+            )
+        replicas.append(Replica(f"replica{i}", url, async_url))
+    return replicas
+
+
+# Shared router of the replicas configured for this process
+replica_router = ReplicaRouter(build_replicas())
+
+
+async def read_or_primary(session, fn, *args, **kwargs):
+    """
+    `session.run_sync(fn)`, run again on the primary if a replica answered 404:
+    a write acknowledged moments ago (by any worker) may not have reached it
+    yet, e.g. when the client dropped the WRITE_MARKER_COOKIE.
+    """
+    try:
+        return await session.run_sync(fn, *args, **kwargs)
+    except HTTPException as e:
+        if e.status_code != 404 or not isinstance(session, ReadSession):
+            raise
+        return await session.primary.run_sync(fn, *args, **kwargs)
+
+
+# Dependency of read-only participant handlers (instead of get_session)
+async def get_read_session(
+    request: Request,
+    primary=Depends(get_session),
+    current_user: dict = Depends(get_current_participant)
+):
+    """
+    Yield a session with the awaitable `run_sync` API of get_session: on a
+    replica when one is healthy and the participant has no recent write,
+    otherwise the primary session (which only connects when used).
+    """
+    replica = replica_router.pick(current_user["id"], request.cookies.get(WRITE_MARKER_COOKIE))
+    if replica is None:
+        yield primary
+        return
+
+    session = ReadSession(replica, primary)
+    try:
+        yield session
+    finally:
+        await session.close()
@@ -0,0 +1,212 @@
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Integer, String, and_, column, func, not_, select, type_coerce, update, values
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Session
+
+from models.question import Question
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+
+# Submissions rescored per batch when an answer is corrected
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "5000"))
+
+# "key" validates answers against the cached answer key only; "sql" also runs a
+# set-based check in PostgreSQL against the stored JSONB options
+ANSWER_VALIDATION = os.getenv("ANSWER_VALIDATION", "key")
+
+# How new submissions store their answers: "rows" (one submission_answers row
+# per answer) or "packed" (one {question_id: option} map in
+# submissions.packed_answers, see migration 0008). Both layouts are always read.
+ANSWER_STORAGE = os.getenv("ANSWER_STORAGE", "rows")
+
+UNANSWERED = -1  # Option index of a missing or invalid answer
+NO_CORRECT_OPTION = -2  # Correct index of a question whose answer is not among its options
+
+
+class InvalidAnswers(ValueError):
+    """
+    Raised when a submission does not match the quiz's answer key.
+    The message is safe to return to the client.
+    """
+
+
+class AnswerKey:
+    """
+    Compiled scoring data of one quiz.
+    - `question_ids`: question order used by every array below.
+    - `option_index[i]`: option letter -> index for question i.
+    - `correct_index`: index of the correct option per question
+      (NO_CORRECT_OPTION if the stored answer is not one of the options).
+    Answers are encoded as an int array of option indices and scored by
+    comparing it with `correct_index` in one vectorized pass.
+    """
+
+    __slots__ = ("quiz_id", "question_ids", "positions", "option_index", "correct", "correct_index")
+
+    def __init__(self, quiz_id: int, questions: Sequence):
+        self.quiz_id = quiz_id
+        self.question_ids = tuple(q.id for q in questions)
+        self.positions = {question_id: i for i, question_id in enumerate(self.question_ids)}
+        self.option_index = tuple(
+            {option: i for i, option in enumerate(q.options or {})} for q in questions
+        )
+        self.correct = tuple(q.correct_answer for q in questions)
+        self.correct_index = np.array(
+            [index.get(correct, NO_CORRECT_OPTION) for index, correct in zip(self.option_index, self.correct)],
+            dtype=np.int16,
+        )
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def encode(self, answers: Dict[int, str]) -> np.ndarray:
+        """
+        Validate a {question_id: option} mapping and encode it in question order.
+        Raises InvalidAnswers if a question is missing, unknown or has an invalid option.
+        """
+        if len(answers) != len(self.question_ids) or not all(qid in answers for qid in self.question_ids):
+            raise InvalidAnswers("Answer all questions")
+
+        encoded = np.empty(len(self.question_ids), dtype=np.int16)
+        for i, question_id in enumerate(self.question_ids):
+            index = self.option_index[i].get(answers[question_id])
+            if index is None:
+                raise InvalidAnswers(f"Invalid answer for question {question_id}")
+            encoded[i] = index
+        return encoded
+
+    def score(self, answers: Dict[int, str]) -> float:
+        """
+        Validate and score one submission, returning the percentage score.
+        """
+        if not self.question_ids:
+            return 0.0
+        encoded = self.encode(answers)
+        return float(np.count_nonzero(encoded == self.correct_index)) / len(self.question_ids) * 100
+
+    def score_many(self, encoded: np.ndarray) -> np.ndarray:
+        """
+        Score a (submissions x questions) matrix of option indices at once.
+        """
+        if not self.question_ids:
+            return np.zeros(encoded.shape[0])
+        return np.count_nonzero(encoded == self.correct_index, axis=1) / len(self.question_ids) * 100
+
+
+def compile_answer_key(quiz_id: int, questions: Sequence) -> AnswerKey:
+    """
+    Build the answer key from Question rows or question snapshots.
+    """
+    return AnswerKey(quiz_id, questions)
+
+
+def pack_answers(answers: Sequence[Tuple[int, str]]) -> Dict[str, str]:
+    """
+    Packed form of (question_id, selected_answer) pairs: a JSON object keyed by
+    question ID. Keyed rather than aligned to the quiz's question order, so
+    stored submissions stay readable after questions are added or removed.
+    """
+    return {str(question_id): selected for question_id, selected in answers}
+
+
+def unpack_answers(packed: Optional[Dict[str, str]]) -> List[Tuple[int, str]]:
+    """
+    (question_id, selected_answer) pairs of a packed submission, by question ID.
+    """
+    return sorted((int(question_id), selected) for question_id, selected in (packed or {}).items())
+
+
+def validate_answers_sql(db: Session, quiz_id: int, answers: Dict[int, str]):
+    """
+    Validate a {question_id: option} mapping with one set-based query:
+    the answers are joined as a VALUES list against the quiz's questions and
+    checked with the JSONB key-existence operator (options ? selected).
+    Raises InvalidAnswers like AnswerKey.encode. Only runs on PostgreSQL;
+    other databases rely on the answer key alone.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+
+    quiz_questions = select(func.count()).where(Question.quiz_id == quiz_id).scalar_subquery()
+    if not answers:
+        if db.execute(select(quiz_questions)).scalar():
+            raise InvalidAnswers("Answer all questions")
+        return
+
+    answered = values(
+        column("question_id", Integer), column("selected_answer", String), name="answered"
+    ).data(list(answers.items()))
+    joined = answered.outerjoin(
+        Question, and_(Question.id == answered.c.question_id, Question.quiz_id == quiz_id)
+    )
+
+    # Answers to questions outside the quiz, and the first answer that is not an option
+    unknown = select(func.count()).select_from(joined).where(Question.id.is_(None)).scalar_subquery()
+    first_invalid = select(func.min(answered.c.question_id)).select_from(joined).where(
+        Question.id.is_not(None),
+        not_(type_coerce(Question.options, JSONB).has_key(answered.c.selected_answer))
+    ).scalar_subquery()
+
+    question_count, unknown_count, invalid_id = db.execute(
+        select(quiz_questions, unknown, first_invalid)
+    ).one()
+
+    if unknown_count or question_count != len(answers):
+        raise InvalidAnswers("Answer all questions")
+    if invalid_id is not None:
+        raise InvalidAnswers(f"Invalid answer for question {invalid_id}")
+
+
+def rescore_quiz(db: Session, quiz_id: int) -> int:
+    """
+    Recompute the score of every stored submission of a quiz against its
+    current questions, in batches of RESCORE_BATCH_SIZE submissions.
+    Returns the number of submissions rescored. The caller commits.
+    """
+    questions = db.query(Question).filter(Question.quiz_id == quiz_id).order_by(Question.id).all()
+    key = compile_answer_key(quiz_id, questions)
+    rescored = 0
+    after_id = 0
+
+    while True:
+        # Next batch of submission IDs, with their packed answers if any (keyset pagination)
+        batch = (
+            db.query(Submission.id, Submission.packed_answers)
+            .filter(Submission.quiz_id == quiz_id, Submission.id > after_id)
+            .order_by(Submission.id)
+            .limit(RESCORE_BATCH_SIZE)
+            .all()
+        )
+        if not batch:
+            break
+        submission_ids = [submission_id for submission_id, _ in batch]
+        after_id = submission_ids[-1]
+        rows = {submission_id: i for i, submission_id in enumerate(submission_ids)}
+
+        # Encode the stored answers of the batch into a matrix of option indices
+        encoded = np.full((len(submission_ids), len(key)), UNANSWERED, dtype=np.int16)
+        for row, (_, packed) in enumerate(batch):
+            for question_id, selected in unpack_answers(packed):
+                position = key.positions.get(question_id)
+                if position is not None:
+                    encoded[row, position] = key.option_index[position].get(selected, UNANSWERED)
+        answers = db.query(
+            SubmissionAnswer.submission_id, SubmissionAnswer.question_id, SubmissionAnswer.selected_answer
+        ).filter(SubmissionAnswer.submission_id.in_(submission_ids))  # This quiz's only, through the submission_id index
+        for submission_id, question_id, selected in answers:
+            row = rows[submission_id]
+            position = key.positions.get(question_id)
+            if position is not None:
+                encoded[row, position] = key.option_index[position].get(selected, UNANSWERED)
+
+        scores = key.score_many(encoded)
+        db.execute(update(Submission), [
+            {"id": submission_id, "score": float(score)}
+            for submission_id, score in zip(submission_ids, scores)
+        ])
+        rescored += len(submission_ids)
+
+    return rescored
@@ -1,15 +1,43 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
 
-# Secret key for JWT (replace with a more secure, environment-stored key in production)
-SECRET_KEY = "ff5667dc669c6a3bb3e230abb6e7ffd0fdc4a75bbabbeaf1a76345f45ea749dc"
+# Secret key for JWT (set JWT_SECRET_KEY, or JWT_KEYS for rotation, in production)
+SECRET_KEY = os.getenv("JWT_SECRET_KEY", "ff5667dc669c6a3bb3e230abb6e7ffd0fdc4a75bbabbeaf1a76345f45ea749dc")
 ALGORITHM = "HS256"
 
+# Signing keys by key ID ("kid1:secret1,kid2:secret2"). New tokens are signed with
+# JWT_ACTIVE_KID; tokens signed with any listed key stay valid, so a key can be
+# rotated by adding the new one, switching JWT_ACTIVE_KID, and removing the old
+# one once its tokens have expired.
+JWT_KEYS = dict(
+    entry.split(":", 1) for entry in os.getenv("JWT_KEYS", "").split(",") if entry
+) or {"default": SECRET_KEY}
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", next(iter(JWT_KEYS)))
+
+# JWT library used to verify tokens: "jose" (python-jose) or "pyjwt" (optional dependency)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+if JWT_BACKEND == "pyjwt":
+    import jwt as pyjwt  # Optional dependency: pip install pyjwt
+    TOKEN_ERRORS = (pyjwt.PyJWTError, KeyError)
+else:
+    TOKEN_ERRORS = (JWTError, KeyError)  # KeyError: token names an unknown key ID
+
+# Verified token claims kept in memory (0 disables the cache)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# bcrypt cost factor (log2 rounds); stored hashes with another cost are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 # Initialize a password hashing context using bcrypt
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 # OAuth2 scheme for handling authentication token (used in dependency injection)
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
@@ -22,6 +50,10 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt_context.verify(plain_password, hashed_password)
 
+# Function to verify a password and return a new hash if the stored one uses outdated cost parameters
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    return bcrypt_context.verify_and_update(plain_password, hashed_password)
+
 # Function to create a JWT access token for authentication
 def create_access_token(username: str, user_id: int, role: str, expires_delta: timedelta) -> str:
     # Create a dictionary with user details
@@ -31,17 +63,73 @@ def create_access_token(username: str, user_id: int, role: str, expires_delta: t
     expires = datetime.utcnow() + expires_delta
     encode["exp"] = expires  # Add expiration to the token payload
     
-    # Encode the payload using the secret key and return the token
-    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    # Encode the payload with the active key and name it in the header
+    return jwt.encode(encode, JWT_KEYS[JWT_ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": JWT_ACTIVE_KID})
+
+# Bounded LRU cache of verified claims, keyed by the token's SHA-256 digest
+class TokenCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # digest -> (kid, exp, payload)
+        self._lock = threading.Lock()
+
+    def get(self, digest: bytes):
+        with self._lock:
+            entry = self._entries.get(digest)
+            # Expired tokens and tokens signed with a since-removed key are misses
+            if entry is None or entry[1] <= time.time() or entry[0] not in JWT_KEYS:
+                self._entries.pop(digest, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, digest: bytes, kid: str, payload: dict):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = (kid, payload["exp"], payload)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+# Key named by a token's (unverified) kid; anything but a configured key ID is an invalid token
+def _signing_key(kid) -> str:
+    if not isinstance(kid, str) or kid not in JWT_KEYS:
+        raise KeyError(kid)  # In TOKEN_ERRORS: answered with 401
+    return JWT_KEYS[kid]
+
+# Verify a token's signature and expiry with the configured backend
+def _verify_token(token: str):
+    if JWT_BACKEND == "pyjwt":
+        kid = pyjwt.get_unverified_header(token).get("kid", JWT_ACTIVE_KID)
+        return kid, pyjwt.decode(token, _signing_key(kid), algorithms=[ALGORITHM], options={"require": ["exp"]})
+    kid = jwt.get_unverified_header(token).get("kid", JWT_ACTIVE_KID)
+    return kid, jwt.decode(token, _signing_key(kid), algorithms=[ALGORITHM], options={"require_exp": True})
 
 # Function to decode a JWT token and extract its payload
 def decode_access_token(token: str):
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return payload  # Already verified and not yet expired
+
     try:
-        # Decode the token using the secret key
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload  # Return decoded payload if valid
-    except JWTError:
-        return None  # Return None if the token is invalid or expired
+        # Decode the token using the key named in its header (tokens without a kid use the active key)
+        kid, payload = _verify_token(token)
+    except TOKEN_ERRORS:
+        return None  # Return None if the token is invalid, expired or signed with an unknown key
+
+    token_cache.put(digest, kid, payload)
+    return payload  # Return decoded payload if valid
 
 # Dependency function to get the current authenticated user from the JWT token
 async def get_current_user(token: str = Depends(oauth2_bearer)):
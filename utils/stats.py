@@ -0,0 +1,381 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, and_, case, delete, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.leaderboard_entry import LeaderboardEntry
+from models.question_stats import QuestionStats
+from models.quiz_score_count import QuizScoreCount
+from models.quiz_stats import QuizStats
+from models.submission import Submission
+from models.submission_answer import SubmissionAnswer
+from models.question import Question
+from models.user import User
+from utils.archive import archived_submissions
+from utils.scoring import unpack_answers
+
+HISTOGRAM_BUCKETS = 10  # Score histogram: 0-10, 10-20, ..., 90-100
+PACKED_BATCH_SIZE = 10000  # Packed submissions fetched per batch when rebuilding question stats
+
+
+class AttemptsExhausted(Exception):
+    """
+    Raised when a user already used all max_attempts submissions of a quiz.
+    """
+
+    def __init__(self, max_attempts: int):
+        super().__init__(f"Maximum number of attempts ({max_attempts}) reached")
+        self.max_attempts = max_attempts
+
+
+def _insert(db: Session, model):
+    """
+    INSERT supporting ON CONFLICT for the session's database (PostgreSQL or SQLite).
+    """
+    dialect = db.get_bind().dialect.name
+    return (postgresql if dialect == "postgresql" else sqlite).insert(model)
+
+
+def _update_best(
+    db: Session, quiz_id: int, user_id: int, score: float, submission_id: int, submitted_at: datetime, best: Counter,
+    max_attempts: Optional[int] = None
+) -> bool:
+    """
+    Record a user's new submission on the leaderboard and collect the changes
+    of the best-score counts in `best` ((quiz_id, score) -> delta). Like
+    rebuild_quiz_stats, the earliest submission wins ties.
+    The entry is locked while its attempts are counted, so concurrent submissions
+    of the same user can never exceed `max_attempts` (raises AttemptsExhausted).
+    Returns True if this is the user's first submission.
+    """
+    entry = db.execute(
+        select(LeaderboardEntry.best_score, LeaderboardEntry.submission_id, LeaderboardEntry.attempts)
+        .where(LeaderboardEntry.quiz_id == quiz_id, LeaderboardEntry.user_id == user_id)
+        .with_for_update()
+    ).first()
+
+    if entry is None:
+        inserted = db.execute(
+            _insert(db, LeaderboardEntry).values(
+                quiz_id=quiz_id, user_id=user_id, best_score=score,
+                submission_id=submission_id, achieved_at=submitted_at, attempts=1,
+            ).on_conflict_do_nothing()
+        ).rowcount
+        if inserted:
+            best[quiz_id, score] += 1
+            return True
+        # A concurrent first submission of the same user won the insert: treat as an update
+        return _update_best(db, quiz_id, user_id, score, submission_id, submitted_at, best, max_attempts)
+
+    if max_attempts is not None and entry.attempts >= max_attempts:
+        raise AttemptsExhausted(max_attempts)
+
+    values = {"attempts": LeaderboardEntry.attempts + 1}
+    if score > entry.best_score or (score == entry.best_score and submission_id < entry.submission_id):
+        values.update(best_score=score, submission_id=submission_id, achieved_at=submitted_at)
+        best[quiz_id, entry.best_score] -= 1
+        best[quiz_id, score] += 1
+    db.execute(
+        LeaderboardEntry.__table__.update()
+        .where(LeaderboardEntry.quiz_id == quiz_id, LeaderboardEntry.user_id == user_id)
+        .values(**values)
+    )
+    return False
+
+
+def record_submissions(
+    db: Session,
+    submissions: Sequence[Tuple[int, int, int, float, datetime, Sequence[Tuple[int, bool]]]],
+    max_attempts: Optional[Dict[int, int]] = None
+):
+    """
+    Fold new submissions into the quiz aggregates, inside the caller's transaction.
+    Each item is (submission_id, user_id, quiz_id, score, submitted_at, answers)
+    with `answers` holding (question_id, is_correct) pairs.
+    - Leaderboard rows are locked and updated one user at a time. A submission
+      beyond its quiz's limit in `max_attempts` (quiz_id -> attempts) raises
+      AttemptsExhausted; the caller rolls the transaction back.
+    - Counter changes are summed first and applied with one upsert per table,
+      so a batch costs a few statements more than a single submission.
+    - Rows are always touched in key order, which keeps concurrent writers
+      from deadlocking on each other's locks.
+    """
+    best = Counter()          # (quiz_id, score) -> change of users with this best score
+    scores = Counter()        # (quiz_id, score) -> new submissions with this score
+    totals = {}               # quiz_id -> [submissions, new participants, score sum]
+    questions = {}            # question_id -> [quiz_id, answered, correct]
+
+    for submission_id, user_id, quiz_id, score, submitted_at, answers in sorted(
+        submissions, key=lambda item: (item[2], item[1], item[0])
+    ):
+        first_attempt = _update_best(
+            db, quiz_id, user_id, score, submission_id, submitted_at, best, (max_attempts or {}).get(quiz_id)
+        )
+        scores[quiz_id, score] += 1
+        total = totals.setdefault(quiz_id, [0, 0, 0.0])
+        total[0] += 1
+        total[1] += int(first_attempt)
+        total[2] += score
+        for question_id, correct in answers:
+            counts = questions.setdefault(question_id, [quiz_id, 0, 0])
+            counts[1] += 1
+            counts[2] += int(correct)
+
+    score_keys = sorted(set(scores) | {key for key, delta in best.items() if delta})
+    if score_keys:
+        stmt = _insert(db, QuizScoreCount)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["quiz_id", "score"],
+                set_={
+                    "submissions": QuizScoreCount.submissions + stmt.excluded.submissions,
+                    "best": QuizScoreCount.best + stmt.excluded.best,
+                },
+            ),
+            [
+                {"quiz_id": quiz_id, "score": score, "submissions": scores[quiz_id, score], "best": best[quiz_id, score]}
+                for quiz_id, score in score_keys
+            ],
+        )
+
+    if totals:
+        stmt = _insert(db, QuizStats)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["quiz_id"],
+                set_={
+                    "submissions": QuizStats.submissions + stmt.excluded.submissions,
+                    "participants": QuizStats.participants + stmt.excluded.participants,
+                    "score_sum": QuizStats.score_sum + stmt.excluded.score_sum,
+                },
+            ),
+            [
+                {"quiz_id": quiz_id, "submissions": count, "participants": participants, "score_sum": score_sum}
+                for quiz_id, (count, participants, score_sum) in sorted(totals.items())
+            ],
+        )
+
+    _add_question_stats(db, questions)
+
+
+def _add_question_stats(db: Session, questions: Dict[int, list]):
+    """
+    Add per-question counts (question_id -> [quiz_id, answered, correct]) with one upsert.
+    """
+    if not questions:
+        return
+    stmt = _insert(db, QuestionStats)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["question_id"],
+            set_={
+                "answered": QuestionStats.answered + stmt.excluded.answered,
+                "correct": QuestionStats.correct + stmt.excluded.correct,
+            },
+        ),
+        [
+            {"question_id": question_id, "quiz_id": quiz_id, "answered": answered, "correct": correct}
+            for question_id, (quiz_id, answered, correct) in sorted(questions.items())
+        ],
+    )
+
+
+def record_submission(
+    db: Session,
+    submission_id: int,
+    user_id: int,
+    quiz_id: int,
+    score: float,
+    submitted_at: datetime,
+    answers: Sequence[Tuple[int, bool]],
+    max_attempts: Optional[int] = None
+):
+    """
+    Fold one new submission into the quiz aggregates (see record_submissions).
+    """
+    record_submissions(
+        db, [(submission_id, user_id, quiz_id, score, submitted_at, answers)],
+        {quiz_id: max_attempts} if max_attempts is not None else None,
+    )
+
+
+def rebuild_quiz_stats(db: Session, quiz_id: int):
+    """
+    Recompute all aggregates of a quiz from its stored submissions with
+    set-based statements (used after rescoring and to backfill). Packed
+    answers are decoded and counted in batches. Submissions of archived
+    months are read from their Parquet files and folded in afterwards, with
+    their archived scores. The caller commits.
+    """
+    for model in (LeaderboardEntry, QuizScoreCount, QuestionStats, QuizStats):
+        db.execute(delete(model).where(model.quiz_id == quiz_id))
+
+    # Best submission per user: highest score, earliest submission on ties
+    ranked = select(
+        Submission.quiz_id, Submission.user_id, Submission.score, Submission.id, Submission.submitted_at,
+        func.row_number().over(
+            partition_by=Submission.user_id, order_by=(Submission.score.desc(), Submission.id)
+        ).label("rank"),
+        func.count().over(partition_by=Submission.user_id).label("attempts"),
+    ).where(Submission.quiz_id == quiz_id).subquery()
+    db.execute(LeaderboardEntry.__table__.insert().from_select(
+        ["quiz_id", "user_id", "best_score", "submission_id", "achieved_at", "attempts"],
+        select(ranked.c.quiz_id, ranked.c.user_id, ranked.c.score, ranked.c.id, ranked.c.submitted_at, ranked.c.attempts)
+        .where(ranked.c.rank == 1),
+    ))
+
+    db.execute(QuizStats.__table__.insert().from_select(
+        ["quiz_id", "submissions", "participants", "score_sum"],
+        select(
+            Submission.quiz_id, func.count(), func.count(Submission.user_id.distinct()),
+            func.coalesce(func.sum(Submission.score), 0.0),
+        ).where(Submission.quiz_id == quiz_id).group_by(Submission.quiz_id),
+    ))
+
+    submission_counts = (
+        select(Submission.score, func.count().label("submissions"))
+        .where(Submission.quiz_id == quiz_id).group_by(Submission.score).subquery()
+    )
+    best_counts = (
+        select(LeaderboardEntry.best_score.label("score"), func.count().label("best"))
+        .where(LeaderboardEntry.quiz_id == quiz_id).group_by(LeaderboardEntry.best_score).subquery()
+    )
+    db.execute(QuizScoreCount.__table__.insert().from_select(
+        ["quiz_id", "score", "submissions", "best"],
+        select(
+            literal(quiz_id, Integer),
+            submission_counts.c.score,
+            submission_counts.c.submissions,
+            func.coalesce(best_counts.c.best, 0),
+        ).select_from(submission_counts.outerjoin(best_counts, best_counts.c.score == submission_counts.c.score)),
+    ))
+
+    db.execute(QuestionStats.__table__.insert().from_select(
+        ["question_id", "quiz_id", "answered", "correct"],
+        select(
+            Question.id, Question.quiz_id, func.count(),
+            func.sum(case((SubmissionAnswer.selected_answer == Question.correct_answer, 1), else_=0)),
+        )
+        .join(SubmissionAnswer, SubmissionAnswer.question_id == Question.id)
+        .join(Submission, and_(Submission.id == SubmissionAnswer.submission_id, Submission.quiz_id == quiz_id))
+        .where(Question.quiz_id == quiz_id)
+        .group_by(Question.id, Question.quiz_id),
+    ))
+
+    correct_answers = dict(db.execute(
+        select(Question.id, Question.correct_answer).where(Question.quiz_id == quiz_id)
+    ).all())
+
+    # Packed answers (ANSWER_STORAGE=packed) are counted here, the rows above
+    questions = {}
+    packed = db.execute(
+        select(Submission.packed_answers)
+        .where(Submission.quiz_id == quiz_id, Submission.packed_answers.is_not(None))
+        .execution_options(yield_per=PACKED_BATCH_SIZE)
+    ).scalars()
+    for answers in packed:
+        for question_id, selected in unpack_answers(answers):
+            if question_id in correct_answers:
+                counts = questions.setdefault(question_id, [quiz_id, 0, 0])
+                counts[1] += 1
+                counts[2] += int(selected == correct_answers[question_id])
+    _add_question_stats(db, questions)
+
+    for submissions in archived_submissions(db.connection(), quiz_id):
+        record_submissions(db, [
+            (
+                submission_id, user_id, quiz_id, score, submitted_at,
+                # Answers to questions deleted since are left out, as above
+                [(question_id, selected == correct_answers[question_id]) for question_id, selected in answers if question_id in correct_answers],
+            )
+            for submission_id, user_id, _, score, submitted_at, answers in submissions
+        ])
+
+
+def get_quiz_stats(db: Session, quiz_id: int) -> dict:
+    """
+    Read a quiz's statistics from the aggregate tables (no scan of submissions).
+    """
+    totals = db.get(QuizStats, quiz_id)
+    submissions = totals.submissions if totals else 0
+
+    histogram = [0] * HISTOGRAM_BUCKETS
+    for score, count in db.execute(
+        select(QuizScoreCount.score, QuizScoreCount.submissions).where(QuizScoreCount.quiz_id == quiz_id)
+    ):
+        histogram[min(int(score // (100 / HISTOGRAM_BUCKETS)), HISTOGRAM_BUCKETS - 1)] += count
+
+    questions = db.execute(
+        select(Question.id, func.coalesce(QuestionStats.answered, 0), func.coalesce(QuestionStats.correct, 0))
+        .outerjoin(QuestionStats, QuestionStats.question_id == Question.id)
+        .where(Question.quiz_id == quiz_id)
+        .order_by(Question.id)
+    ).all()
+
+    return {
+        "quiz_id": quiz_id,
+        "submissions": submissions,
+        "participants": totals.participants if totals else 0,
+        "mean_score": totals.score_sum / submissions if submissions else None,
+        "histogram": [
+            {"min_score": i * 100 / HISTOGRAM_BUCKETS, "max_score": (i + 1) * 100 / HISTOGRAM_BUCKETS, "submissions": count}
+            for i, count in enumerate(histogram)
+        ],
+        "questions": [
+            {"question_id": question_id, "answered": answered, "correct": correct,
+             "correct_rate": correct / answered if answered else None}
+            for question_id, answered, correct in questions
+        ],
+    }
+
+
+def get_attempts(db: Session, quiz_id: int, user_id: int) -> int:
+    """
+    Number of stored submissions of a user for a quiz (read from the leaderboard).
+    """
+    return db.execute(
+        select(LeaderboardEntry.attempts)
+        .where(LeaderboardEntry.quiz_id == quiz_id, LeaderboardEntry.user_id == user_id)
+    ).scalar() or 0
+
+
+def get_leaderboard(db: Session, quiz_id: int, user_id: Optional[int], limit: int) -> dict:
+    """
+    Top `limit` users by best score, plus the given user's best score and
+    percentile rank (share of participants with a lower best score).
+    """
+    top = db.execute(
+        select(LeaderboardEntry.user_id, User.username, LeaderboardEntry.best_score, LeaderboardEntry.achieved_at)
+        .join(User, User.id == LeaderboardEntry.user_id)
+        .where(LeaderboardEntry.quiz_id == quiz_id)
+        .order_by(LeaderboardEntry.best_score.desc(), LeaderboardEntry.achieved_at)
+        .limit(limit)
+    ).all()
+
+    mine = None
+    if user_id is not None:
+        entry = db.get(LeaderboardEntry, (quiz_id, user_id))
+        if entry is not None:
+            below, total = db.execute(
+                select(
+                    func.coalesce(func.sum(case((QuizScoreCount.score < entry.best_score, QuizScoreCount.best), else_=0)), 0),
+                    func.coalesce(func.sum(QuizScoreCount.best), 0),
+                ).where(QuizScoreCount.quiz_id == quiz_id)
+            ).one()
+            mine = {
+                "best_score": entry.best_score,
+                "percentile_rank": below / total * 100 if total else None,
+            }
+
+    return {
+        "quiz_id": quiz_id,
+        "top": [
+            {"rank": i + 1, "user_id": row.user_id, "username": row.username,
+             "best_score": row.best_score, "achieved_at": row.achieved_at}
+            for i, row in enumerate(top)
+        ],
+        "me": mine,
+    }
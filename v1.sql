@@ -1,42 +1,86 @@
--- Users table: Stores user information
-CREATE TABLE users (
-    id SERIAL PRIMARY KEY, -- Unique user ID
-    username VARCHAR UNIQUE NOT NULL, -- Unique username
-    hashed_password VARCHAR NOT NULL, -- Encrypted password
-    role VARCHAR CHECK (role IN ('admin', 'participant')) NOT NULL -- User role constraint
-);
-
--- Quizzes table: Stores quiz details
-CREATE TABLE quizzes (
-    id SERIAL PRIMARY KEY, -- Unique quiz ID
-    title VARCHAR NOT NULL, -- Quiz title
-    description VARCHAR NOT NULL, -- Quiz description
-    created_by INTEGER REFERENCES users(id) NOT NULL -- Creator (admin) of the quiz
-);
-
--- Questions table: Stores questions for quizzes
-CREATE TABLE questions (
-    id SERIAL PRIMARY KEY, -- Unique question ID
-    quiz_id INTEGER REFERENCES quizzes(id) NOT NULL, -- Associated quiz ID
-    statement VARCHAR NOT NULL, -- Question text
-    options JSON NOT NULL,  -- Available answer choices in JSON format
-    correct_answer VARCHAR NOT NULL -- Correct answer
-);
-
--- Submissions table: Stores quiz attempt details
-CREATE TABLE submissions (
-    id SERIAL PRIMARY KEY, -- Unique submission ID
-    user_id INTEGER REFERENCES users(id) NOT NULL, -- User who submitted the quiz
-    quiz_id INTEGER REFERENCES quizzes(id) NOT NULL, -- Associated quiz ID
-    score REAL NOT NULL,  -- Percentage score obtained
-    submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP -- Submission timestamp
-);
-
--- Submission Answers table: Stores individual answers for each submission
-CREATE TABLE submission_answers (
-    id SERIAL PRIMARY KEY, -- Unique submission answer ID
-    submission_id INTEGER REFERENCES submissions(id) NOT NULL, -- Associated submission ID
-    question_id INTEGER REFERENCES questions(id) NOT NULL, -- Question ID
-    selected_answer VARCHAR NOT NULL -- User's selected answer
-);
-
+-- Schema of migration revision 0005: after loading it, run `alembic stamp 0005`, then `alembic upgrade head`
+
+-- Users table: Stores user information
+CREATE TABLE users (
+    id SERIAL PRIMARY KEY, -- Unique user ID
+    username VARCHAR UNIQUE NOT NULL, -- Unique username
+    hashed_password VARCHAR NOT NULL, -- Encrypted password
+    role VARCHAR CHECK (role IN ('admin', 'participant')) NOT NULL -- User role constraint
+);
+
+-- Quizzes table: Stores quiz details
+CREATE TABLE quizzes (
+    id SERIAL PRIMARY KEY, -- Unique quiz ID
+    title VARCHAR NOT NULL, -- Quiz title
+    description VARCHAR NOT NULL, -- Quiz description
+    created_by INTEGER REFERENCES users(id) NOT NULL -- Creator (admin) of the quiz
+);
+
+-- Questions table: Stores questions for quizzes
+CREATE TABLE questions (
+    id SERIAL PRIMARY KEY, -- Unique question ID
+    quiz_id INTEGER REFERENCES quizzes(id) NOT NULL, -- Associated quiz ID
+    statement VARCHAR NOT NULL, -- Question text
+    options JSONB NOT NULL,  -- Available answer choices in JSON format (JSONB, GIN indexed)
+    correct_answer VARCHAR NOT NULL -- Correct answer
+);
+
+-- Submissions table: Stores quiz attempt details
+CREATE TABLE submissions (
+    id SERIAL PRIMARY KEY, -- Unique submission ID
+    user_id INTEGER REFERENCES users(id) NOT NULL, -- User who submitted the quiz
+    quiz_id INTEGER REFERENCES quizzes(id) NOT NULL, -- Associated quiz ID
+    score REAL NOT NULL,  -- Percentage score obtained
+    submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- Submission timestamp
+    ticket VARCHAR(32) -- Ingestion ticket (queued submissions only)
+);
+
+-- Submission Answers table: Stores individual answers for each submission
+CREATE TABLE submission_answers (
+    id SERIAL PRIMARY KEY, -- Unique submission answer ID
+    submission_id INTEGER REFERENCES submissions(id) NOT NULL, -- Associated submission ID
+    question_id INTEGER REFERENCES questions(id) NOT NULL, -- Question ID
+    selected_answer VARCHAR NOT NULL -- User's selected answer
+);
+
+-- Indexes for the hot lookup paths
+CREATE INDEX ix_questions_quiz_id ON questions (quiz_id); -- Questions of a quiz
+CREATE INDEX ix_submissions_quiz_id_user_id ON submissions (quiz_id, user_id, id); -- Latest attempt of a user, per-quiz scans
+CREATE UNIQUE INDEX ix_submissions_ticket ON submissions (ticket); -- Status of queued submissions
+CREATE INDEX ix_submission_answers_submission_id ON submission_answers (submission_id); -- Answers of a submission
+CREATE INDEX ix_questions_options ON questions USING GIN (options); -- Key lookups on answer choices
+
+-- Quiz statistics and leaderboard aggregates, maintained on every submission
+CREATE TABLE quiz_stats (
+    quiz_id INTEGER PRIMARY KEY REFERENCES quizzes(id) ON DELETE CASCADE, -- Associated quiz ID
+    submissions INTEGER NOT NULL, -- Number of submissions
+    participants INTEGER NOT NULL, -- Distinct users who submitted
+    score_sum REAL NOT NULL -- Sum of all scores (for the mean)
+);
+
+CREATE TABLE quiz_score_counts (
+    quiz_id INTEGER REFERENCES quizzes(id) ON DELETE CASCADE, -- Associated quiz ID
+    score REAL, -- Score (percentage)
+    submissions INTEGER NOT NULL, -- Submissions with this score
+    best INTEGER NOT NULL, -- Users whose best score this is
+    PRIMARY KEY (quiz_id, score)
+);
+
+CREATE TABLE question_stats (
+    question_id INTEGER PRIMARY KEY REFERENCES questions(id) ON DELETE CASCADE, -- Question ID
+    quiz_id INTEGER REFERENCES quizzes(id) ON DELETE CASCADE NOT NULL, -- Associated quiz ID
+    answered INTEGER NOT NULL, -- Submissions answering the question
+    correct INTEGER NOT NULL -- ... with the correct answer
+);
+
+CREATE TABLE leaderboard_entries (
+    quiz_id INTEGER REFERENCES quizzes(id) ON DELETE CASCADE, -- Associated quiz ID
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE, -- Participant
+    best_score REAL NOT NULL, -- Best score of the participant
+    submission_id INTEGER NOT NULL, -- Submission that achieved it
+    achieved_at TIMESTAMP NOT NULL, -- When it was achieved
+    PRIMARY KEY (quiz_id, user_id)
+);
+
+CREATE INDEX ix_question_stats_quiz_id ON question_stats (quiz_id); -- Per-question stats of a quiz
+CREATE INDEX ix_leaderboard_entries_rank ON leaderboard_entries (quiz_id, best_score DESC, achieved_at); -- Top-N of a quiz